@@ -1,10 +1,19 @@
 # ViewSets define the view behavior.
-from rest_framework import viewsets
+from rest_framework import pagination, viewsets
 
 from apps.accounts.models import User
 from apps.accounts.serializers import UserSerializer
 
 
+class UserCursorPagination(pagination.CursorPagination):
+    ordering = "pk"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
 class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    # Only the columns UserSerializer shows are read.
+    queryset = User.objects.only("id", "username", "email", "is_staff")
     serializer_class = UserSerializer
+    pagination_class = UserCursorPagination
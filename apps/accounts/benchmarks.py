@@ -0,0 +1,29 @@
+import random
+
+from django.test import Client
+
+from apps.accounts.models import User
+from apps.base.benchmarking import Benchmark, dataset, expect, register
+
+BATCH_SIZE = 2_000
+
+
+@dataset
+def seed_users(size: int, rand: random.Random) -> None:
+    users = (
+        User(username=f"user{n}", email=f"user{n}@example.com", password="!", is_staff=rand.random() < 0.05)
+        for n in range(size)
+    )
+    User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+
+@register
+def user_list(benchmark: Benchmark, size: int):
+    client = Client()
+    benchmark(lambda: expect(client.get("/api/accounts/users/"), 200))
+
+
+@register
+def user_list_large_page(benchmark: Benchmark, size: int):
+    client = Client()
+    benchmark(lambda: expect(client.get("/api/accounts/users/?page_size=500"), 200))
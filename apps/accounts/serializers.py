@@ -1,9 +1,35 @@
+from urllib.parse import quote
+
 from rest_framework import serializers
 
 from apps.accounts.models import User
 
+URL_PLACEHOLDER = "__lookup__"
+
+
+class TemplatedHyperlinkedIdentityField(serializers.HyperlinkedIdentityField):
+    """
+    A `HyperlinkedIdentityField` that reverses the URL once per serializer and builds the URL of every row by
+    replacing the lookup value in that template, instead of calling `reverse()` for each row.
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        lookup_value = getattr(obj, self.lookup_field)
+        if lookup_value in (None, ""):
+            return None
+        template = getattr(self, "_url_template", None)
+        if template is None or self._url_template_key != (view_name, request, format):
+            template = self.reverse(
+                view_name, kwargs={self.lookup_url_kwarg: URL_PLACEHOLDER}, request=request, format=format
+            )
+            self._url_template = template
+            self._url_template_key = (view_name, request, format)
+        return template.replace(URL_PLACEHOLDER, quote(str(lookup_value), safe=""))
+
 
 class UserSerializer(serializers.HyperlinkedModelSerializer):
+    serializer_url_field = TemplatedHyperlinkedIdentityField
+
     class Meta:
         model = User
         fields = ("url", "username", "email", "is_staff")
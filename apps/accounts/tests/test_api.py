@@ -0,0 +1,57 @@
+import time
+
+from django.test import TestCase
+
+from apps.accounts.models import User
+
+
+class UserListScalingTests(TestCase):
+    """
+    The user list reads a page with a fixed number of queries, and the cost of each row doesn't grow with the page.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f"user{n}", email=f"user{n}@example.com", password="!") for n in range(1_000)
+        )
+
+    def get_page(self, page_size: int):
+        response = self.client.get("/api/accounts/users/", {"page_size": page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), page_size)
+        return response
+
+    def time_per_row(self, page_size: int, repeat: int = 5) -> float:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.get_page(page_size)
+            timings.append(time.perf_counter() - start)
+        return min(timings) / page_size
+
+    def test_query_count_is_constant(self):
+        for page_size in (10, 100, 500):
+            with self.subTest(page_size=page_size), self.assertNumQueries(1):
+                self.get_page(page_size)
+
+    def test_only_serialized_columns_are_read(self):
+        with self.assertNumQueries(1) as context:
+            self.get_page(10)
+        sql = context.captured_queries[0]["sql"]
+        self.assertNotIn('"password"', sql)
+        self.assertNotIn('"last_login"', sql)
+
+    def test_urls_are_built_for_every_row(self):
+        results = self.get_page(10).json()["results"]
+        users = User.objects.order_by("pk")[:10]
+        self.assertEqual(
+            [row["url"] for row in results], [f"http://testserver/api/accounts/users/{user.pk}/" for user in users]
+        )
+
+    def test_time_per_row_does_not_grow_with_the_page(self):
+        self.get_page(10)
+        small = self.time_per_row(50)
+        large = self.time_per_row(500)
+        # Generous, as a page of 50 also pays for the request itself.
+        self.assertLess(large, small * 2)
@@ -0,0 +1,133 @@
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from django.utils.module_loading import autodiscover_modules
+
+from apps.base.profiling import profile
+
+# Benchmarks and datasets are registered by the `benchmarks` module of each app, see `autodiscover`.
+_benchmarks: Dict[str, Callable[["Benchmark", int], Any]] = {}
+_datasets: List[Callable[[int, random.Random], None]] = []
+
+
+def register(func: Callable[["Benchmark", int], Any]) -> Callable[["Benchmark", int], Any]:
+    """
+    Registers a benchmark. It is called with a `Benchmark`, which it calls with the code to time like the
+    `benchmark` fixture of pytest-benchmark, and the size of the dataset.
+    """
+    _benchmarks[func.__name__] = func
+    return func
+
+
+def dataset(func: Callable[[int, random.Random], None]) -> Callable[[int, random.Random], None]:
+    """
+    Registers a function that seeds the benchmark database with `size` rows, in registration order.
+    """
+    _datasets.append(func)
+    return func
+
+
+def autodiscover() -> None:
+    autodiscover_modules("benchmarks")
+
+
+def get_benchmarks() -> Dict[str, Callable[["Benchmark", int], Any]]:
+    return dict(_benchmarks)
+
+
+def seed(size: int, seed: int = 0) -> None:
+    rand = random.Random(seed)
+    for func in _datasets:
+        func(size, rand)
+
+
+def expect(response, status_code: int):
+    if response.status_code != status_code:
+        raise RuntimeError(f"Expected a {status_code} response, got {response.status_code}")
+    return response
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Returns the nearest rank percentile of the values.
+    """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Benchmark:
+    """
+    Times a function over `iterations` calls after `warmup` untimed ones. The queries are counted in one more call
+    so the profiling doesn't skew the timings. `setup` is called before every call and isn't timed.
+    """
+
+    def __init__(self, iterations: int = 50, warmup: int = 5):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.stats: Optional[Dict[str, Any]] = None
+
+    def __call__(self, func: Callable, *args: Any, setup: Optional[Callable[[], Any]] = None, **kwargs: Any) -> Any:
+        result = None
+        for _ in range(self.warmup):
+            if setup is not None:
+                setup()
+            result = func(*args, **kwargs)
+
+        timings = []
+        for _ in range(self.iterations):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        if setup is not None:
+            setup()
+        with profile() as request_profile:
+            result = func(*args, **kwargs)
+        summary = request_profile.summary()
+
+        self.stats = {
+            "iterations": self.iterations,
+            "min": round(min(timings), 3),
+            "mean": round(sum(timings) / len(timings), 3),
+            "p50": round(percentile(timings, 50), 3),
+            "p95": round(percentile(timings, 95), 3),
+            "p99": round(percentile(timings, 99), 3),
+            "max": round(max(timings), 3),
+            "queries": summary["queries"],
+            "duplicate_queries": summary["duplicate_queries"],
+        }
+        return result
+
+
+def run(names: List[str], size: int, iterations: int = 50, warmup: int = 5) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name in names:
+        benchmark = Benchmark(iterations, warmup)
+        _benchmarks[name](benchmark, size)
+        if benchmark.stats is None:
+            raise RuntimeError(f"Benchmark {name} never called the benchmark fixture")
+        results[name] = benchmark.stats
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Returns a message for each benchmark whose p50 or p95 is slower than the baseline by more than `tolerance`, a
+    fraction, or that runs more queries than the baseline.
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ("p50", "p95"):
+            if stats[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {stats[key]:.3f}ms > {base[key]:.3f}ms baseline")
+        if stats["queries"] > base["queries"]:
+            regressions.append(f"{name}: {stats['queries']} queries > {base['queries']} baseline")
+    return regressions
@@ -0,0 +1,398 @@
+import json
+import logging
+import math
+import os
+import pickle
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+CLEAR_ALL = "*"
+
+_missing = object()
+
+
+class StampedValue(NamedTuple):
+    """
+    A value stored by `TieredCache.get_or_set` with how long it took to compute and when it expires, for the
+    probabilistic early expiration.
+    """
+
+    value: Any
+    delta: float
+    expires_at: Optional[float]
+
+
+def unwrap(value: Any) -> Any:
+    return value.value if isinstance(value, StampedValue) else value
+
+
+class LocalTier:
+    """
+    A bounded LRU of pickled values with a TTL, shared by the threads of one process. Values are pickled like
+    `LocMemCache` does so callers can't mutate the cached copy.
+    """
+
+    def __init__(self, max_entries: int, timeout: float):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _missing
+            if entry[1] <= time.monotonic():
+                del self._data[key]
+                return _missing
+            self._data.move_to_end(key)
+        return pickle.loads(entry[0])
+
+    def set(self, key: str, value: Any, timeout: Optional[float] = None) -> None:
+        """
+        Keeps the value for the local timeout, or `timeout` seconds when that is shorter.
+        """
+        ttl = self.timeout if timeout is None else min(timeout, self.timeout)
+        if isinstance(value, StampedValue) and value.expires_at is not None:
+            ttl = min(ttl, value.expires_at - time.time())
+        if ttl <= 0:
+            self.delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (pickled, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache(BaseCache):
+    """
+    A cache backend that serves reads from a bounded LRU in each process in front of a shared remote backend,
+    normally `redis_cache.RedisCache`. Writes go to both tiers.
+
+    Other processes drop their local copy of a key when it's written: with `INVALIDATION` set to `pubsub` every write
+    is published on a redis channel that each process listens to, with `ttl` local copies are only kept for
+    `LOCAL_TIMEOUT` seconds, which bounds how stale they can get. The model version keys of `apps.base.choice_cache`
+    are written on every change, so the caches keyed by them are invalidated the same way.
+
+    `get_or_set` protects expensive values from stampedes: one thread per process and one process per key
+    recomputes a missing value while the others wait for it, and values are recomputed early with a probability
+    that grows as they approach their expiry, proportional to how long they took to compute.
+    """
+
+    def __init__(self, location: str, params: Dict[str, Any]):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        remote = dict(options["REMOTE"])
+        remote_params = {key: value for key, value in params.items() if key not in ("BACKEND", "LOCATION", "OPTIONS")}
+        remote_params["OPTIONS"] = remote.get("OPTIONS", {})
+        self.remote: BaseCache = import_string(remote["BACKEND"])(remote.get("LOCATION", ""), remote_params)
+        self.local = LocalTier(int(options.get("LOCAL_MAX_ENTRIES", 1000)), float(options.get("LOCAL_TIMEOUT", 5)))
+        self.invalidation = options.get("INVALIDATION", "pubsub")
+        self.lock_timeout = float(options.get("LOCK_TIMEOUT", 10))
+        self.early_expiration_beta = float(options.get("EARLY_EXPIRATION_BETA", 1))
+        self.channel = f"{params.get('KEY_PREFIX') or ''}:{INVALIDATION_CHANNEL}"
+        # Striped locks for the single flight recompute in this process.
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._pid: Optional[int] = None
+        self._sender_id = ""
+        self._start_lock = threading.Lock()
+
+    # Invalidation
+
+    def _get_redis_client(self) -> Any:
+        if self.invalidation != "pubsub" or not hasattr(self.remote, "get_master_client"):
+            return None
+        return self.remote.get_master_client()  # type: ignore
+
+    def _ensure_process(self) -> None:
+        """
+        Starts the invalidation listener the first time the cache is used in a process. The local tier is cleared
+        after a fork since the parent's listener doesn't run in the child.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.local.clear()
+            self._sender_id = uuid.uuid4().hex
+            client = self._get_redis_client()
+            if client is not None:
+                threading.Thread(target=self._listen, args=(client,), name="cache-invalidation", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _listen(self, client: Any) -> None:
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Writes made while this process wasn't subscribed were missed.
+                self.local.clear()
+                for message in pubsub.listen():
+                    self._handle_invalidation(message["data"])
+            except Exception:
+                logger.warning("Cache invalidation listener disconnected, retrying", exc_info=True)
+                self.local.clear()
+                time.sleep(1)
+
+    def _handle_invalidation(self, data: bytes) -> None:
+        message = json.loads(data)
+        if message["sender"] == self._sender_id:
+            return
+        if message["keys"] == CLEAR_ALL:
+            self.local.clear()
+        else:
+            for key in message["keys"]:
+                self.local.delete(key)
+
+    def _publish(self, keys: Any) -> None:
+        client = self._get_redis_client()
+        if client is not None:
+            client.publish(self.channel, json.dumps({"sender": self._sender_id, "keys": keys}))
+
+    def _get_timeout(self, timeout: Any) -> Optional[float]:
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else float(timeout)
+
+    # Django cache API
+
+    def _get_raw(self, key: str, version: Optional[int] = None) -> Any:
+        self._ensure_process()
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+        value = self.local.get(local_key)
+        if value is _missing:
+            value = self.remote.get(key, _missing, version=version)
+            if value is not _missing:
+                self.local.set(local_key, value)
+        return value
+
+    def get(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        value = self._get_raw(key, version)
+        return default if value is _missing else unwrap(value)
+
+    def get_many(self, keys: Iterable[str], version: Optional[int] = None) -> Dict[str, Any]:
+        self._ensure_process()
+        found = {}
+        misses = []
+        for key in keys:
+            value = self.local.get(self.make_key(key, version))
+            if value is _missing:
+                misses.append(key)
+            else:
+                found[key] = unwrap(value)
+        if misses:
+            for key, value in self.remote.get_many(misses, version=version).items():
+                self.local.set(self.make_key(key, version), value)
+                found[key] = unwrap(value)
+        return found
+
+    def has_key(self, key: str, version: Optional[int] = None) -> bool:
+        return self._get_raw(key, version) is not _missing
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> None:
+        self._ensure_process()
+        local_key = self.make_key(key, version)
+        self.remote.set(key, value, timeout, version=version)
+        self.local.set(local_key, value, self._get_timeout(timeout))
+        self._publish([local_key])
+
+    def add(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> bool:
+        self._ensure_process()
+        added = self.remote.add(key, value, timeout, version=version)
+        if added:
+            local_key = self.make_key(key, version)
+            self.local.set(local_key, value, self._get_timeout(timeout))
+            self._publish([local_key])
+        return added
+
+    def set_many(self, data: Dict[str, Any], timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> List:
+        self._ensure_process()
+        failed = self.remote.set_many(data, timeout, version=version) or []
+        local_keys = []
+        for key, value in data.items():
+            local_key = self.make_key(key, version)
+            local_keys.append(local_key)
+            if key not in failed:
+                self.local.set(local_key, value, self._get_timeout(timeout))
+        self._publish(local_keys)
+        return failed
+
+    def delete(self, key: str, version: Optional[int] = None) -> Any:
+        self._ensure_process()
+        local_key = self.make_key(key, version)
+        self.local.delete(local_key)
+        deleted = self.remote.delete(key, version=version)
+        self._publish([local_key])
+        return deleted
+
+    def delete_many(self, keys: Iterable[str], version: Optional[int] = None) -> None:
+        self._ensure_process()
+        keys = list(keys)
+        local_keys = [self.make_key(key, version) for key in keys]
+        for local_key in local_keys:
+            self.local.delete(local_key)
+        self.remote.delete_many(keys, version=version)
+        self._publish(local_keys)
+
+    def incr(self, key: str, delta: int = 1, version: Optional[int] = None) -> int:
+        self._ensure_process()
+        local_key = self.make_key(key, version)
+        self.local.delete(local_key)
+        value = self.remote.incr(key, delta, version=version)
+        self._publish([local_key])
+        return value
+
+    def decr(self, key: str, delta: int = 1, version: Optional[int] = None) -> int:
+        return self.incr(key, -delta, version=version)
+
+    def touch(self, key: str, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> bool:
+        self._ensure_process()
+        self.local.delete(self.make_key(key, version))
+        return self.remote.touch(key, timeout, version=version)
+
+    def clear(self) -> None:
+        self._ensure_process()
+        self.local.clear()
+        self.remote.clear()
+        self._publish(CLEAR_ALL)
+
+    def close(self, **kwargs: Any) -> None:
+        self.remote.close(**kwargs)
+
+    # Stampede protection
+
+    def _is_expiring(self, value: StampedValue) -> bool:
+        """
+        Probabilistic early expiration: recomputes before the expiry with a probability that grows as it gets
+        closer, and sooner for values that are slow to compute.
+        """
+        if value.expires_at is None or self.early_expiration_beta <= 0:
+            return False
+        return (
+            time.time() - value.delta * self.early_expiration_beta * math.log(1 - random.random()) >= value.expires_at
+        )
+
+    def get_or_set(self, key: str, default: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> Any:
+        value = self._get_raw(key, version)
+        if value is not _missing and not (isinstance(value, StampedValue) and self._is_expiring(value)):
+            return unwrap(value)
+        compute = default if callable(default) else lambda: default
+        stale = value
+
+        with self._key_locks[hash(self.make_key(key, version)) % len(self._key_locks)]:
+            # Another thread of this process may have recomputed it while this one waited for the lock.
+            value = self._get_raw(key, version)
+            if value is not _missing and (
+                stale is _missing or not isinstance(value, StampedValue) or value.expires_at != stale.expires_at
+            ):
+                return unwrap(value)
+
+            lock_key = f"{key}:lock"
+            token = uuid.uuid4().hex
+            # Redis expires keys in whole seconds, and redis_cache expires the key right away for a timeout of 0.
+            acquired = self.remote.add(lock_key, token, math.ceil(self.lock_timeout), version=version)
+            if not acquired:
+                # Another process is recomputing it. A value that is expiring early is still good to serve,
+                # otherwise wait for the other process up to the lock timeout before computing it here too, without
+                # the lock.
+                if stale is not _missing:
+                    return unwrap(stale)
+                deadline = time.monotonic() + self.lock_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    value = self.remote.get(key, _missing, version=version)
+                    if value is not _missing:
+                        self.local.set(self.make_key(key, version), value)
+                        return unwrap(value)
+            try:
+                start = time.perf_counter()
+                result = compute()
+                seconds = self._get_timeout(timeout)
+                expires_at = None if seconds is None else time.time() + seconds
+                self.set(key, StampedValue(result, time.perf_counter() - start, expires_at), timeout, version=version)
+            finally:
+                if acquired:
+                    self._release_lock(lock_key, token, version)
+            return result
+
+    def _release_lock(self, lock_key: str, token: str, version: Optional[int]) -> None:
+        """
+        Deletes the recompute lock only while it still holds `token`, as it may have expired during a slow recompute
+        and been taken by another process since.
+        """
+        get_client = getattr(self.remote, "get_master_client", None)
+        if get_client is None:
+            if self.remote.get(lock_key, version=version) == token:
+                self.remote.delete(lock_key, version=version)
+            return
+
+        from redis.exceptions import WatchError
+
+        key = self.remote.make_key(lock_key, version)
+        with get_client().pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                stored = pipe.get(key)
+                if stored is not None and self.remote.get_value(stored) == token:  # type: ignore
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+            except WatchError:
+                # The lock was taken over between the read and the delete.
+                pass
+
+
+def get_redis_client(alias: str = "default") -> Any:
+    """
+    Returns the redis client, and so the connection pool, of a cache on `redis_cache`, directly or behind a
+    `TieredCache`. Returns `None` for other backends.
+    """
+    backend = caches[alias]
+    backend = getattr(backend, "remote", backend)
+    if hasattr(backend, "get_master_client"):
+        return backend.get_master_client()
+    return None
+
+
+def get_or_compute(key: str, compute: Callable[[], Any], timeout: Any = DEFAULT_TIMEOUT, alias: str = "default") -> Any:
+    """
+    Returns the cached value of `key`, computing and caching it when it's missing. Uses the stampede protection of
+    `TieredCache` when the cache is one, other backends (and the `get_or_set` of `redis_cache`, which can return
+    `None` while another process holds the lock) compute it in every caller that misses.
+    """
+    backend = caches[alias]
+    if isinstance(backend, TieredCache):
+        return backend.get_or_set(key, compute, timeout)
+    value = backend.get(key, _missing)
+    if value is _missing:
+        value = compute()
+        backend.set(key, value, timeout)
+    # Values stored through a `TieredCache` before the cache was switched to another backend.
+    return unwrap(value)
@@ -0,0 +1,130 @@
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from django import forms
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from apps.base.cache import get_or_compute
+
+CACHE_KEY_PREFIX = "choices"
+
+VueOptions = List[Dict[str, str]]
+
+# Maps a model label to the (version, options) that this process last saw.
+_local_cache: Dict[str, Tuple[str, VueOptions]] = {}
+
+
+def get_version_key(model: Type[models.Model]) -> str:
+    return f"{CACHE_KEY_PREFIX}:{model._meta.label_lower}:version"
+
+
+def get_options_key(model: Type[models.Model], version: str) -> str:
+    return f"{CACHE_KEY_PREFIX}:{model._meta.label_lower}:{version}"
+
+
+def build_options(model: Type[models.Model]) -> VueOptions:
+    return [{"value": str(obj.pk), "name": str(obj)} for obj in model._default_manager.all()]
+
+
+def get_versions(*model_classes: Type[models.Model]) -> List[str]:
+    """
+    Returns the current cache version of each model with a single cache round trip. Other caches can include these in
+    their keys to be invalidated whenever a lookup model changes.
+    """
+    keys = [get_version_key(model) for model in model_classes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def get_options(model: Type[models.Model]) -> VueOptions:
+    """
+    Returns the `vue_options` list for every row of a lookup model.
+
+    The options are held in this process and in the Django cache under a version key. A save or delete of the model
+    bumps the version in the shared cache once it commits, so every worker rebuilds its copy on the next read.
+    """
+    label = model._meta.label_lower
+    version = get_versions(model)[0]
+
+    local = _local_cache.get(label)
+    if local is not None and local[0] == version:
+        return local[1]
+
+    options_key = get_options_key(model, version)
+    options = get_or_compute(options_key, lambda: build_options(model), None)
+    _local_cache[label] = (version, options)
+    return options
+
+
+def invalidate(model: Type[models.Model]) -> None:
+    _local_cache.pop(model._meta.label_lower, None)
+    cache.set(get_version_key(model), uuid.uuid4().hex, None)
+
+
+def _invalidate_handler(sender: Type[models.Model], using: str, **kwargs: Any) -> None:
+    # Bumped once the change is visible, or another worker could cache the old options under the new version.
+    transaction.on_commit(lambda: invalidate(sender), using=using)
+
+
+def _m2m_invalidate_handler(sender, instance, action, reverse, model, using, **kwargs) -> None:
+    if action in ("post_add", "post_remove", "post_clear"):
+        owner = model if reverse else type(instance)
+        transaction.on_commit(lambda: invalidate(owner), using=using)
+
+
+def connect_choice_cache(model: Type[models.Model]) -> None:
+    """
+    Bumps the version of the model once a save, delete or change of its M2M fields commits. Also used for models that
+    have no options, such as `Recipe`, as a cheap version for the `ETag` of pages that list them.
+    """
+    uid = f"choice_cache:{model._meta.label_lower}"
+    post_save.connect(_invalidate_handler, sender=model, dispatch_uid=uid)
+    post_delete.connect(_invalidate_handler, sender=model, dispatch_uid=uid)
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        m2m_changed.connect(_m2m_invalidate_handler, sender=through, dispatch_uid=f"{uid}:{through._meta.label_lower}")
+
+
+class CachedChoicesMixin:
+    """
+    Lets `apps.base.hybrid_forms.render_field` build the field options from the choice cache instead of iterating the
+    queryset. The cache always holds every row of the queryset model, so fields whose queryset or labels were changed
+    iterate their choices instead.
+    """
+
+    def uses_choice_cache(self) -> bool:
+        query = self.queryset.query  # type: ignore
+        return (
+            not query.has_filters()
+            and not query.is_sliced
+            and not query.order_by
+            and not query.extra_order_by
+            and type(self).label_from_instance is forms.ModelChoiceField.label_from_instance
+        )
+
+    def get_vue_options(self) -> Optional[VueOptions]:
+        if not self.uses_choice_cache():
+            return None
+        options = get_options(self.queryset.model)  # type: ignore
+        empty_label = getattr(self, "empty_label", None)
+        if empty_label is not None:
+            return [{"value": "", "name": empty_label}] + options
+        return options
+
+
+class CachedModelChoiceField(CachedChoicesMixin, forms.ModelChoiceField):
+    pass
+
+
+class CachedModelMultipleChoiceField(CachedChoicesMixin, forms.ModelMultipleChoiceField):
+    pass
@@ -0,0 +1,55 @@
+"""
+Precompressed siblings of static files: `name.css.br` and `name.css.gz` next to `name.css`, written by
+`apps.base.storage.PrecompressMixin` and served by `apps.base.views.serve_static` or S3.
+"""
+import gzip
+import io
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# The encodings of the precompressed siblings, in order of preference.
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".json", ".map", ".svg", ".txt", ".xml", ".html", ".ico", ".ttf", ".eot")
+# Smaller files gain less than the headers of the encoding cost.
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# The 12 characters of MD5 that `ManifestFilesMixin` adds before the extension.
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^/.]+$")
+
+
+def split_encoding(name: str) -> Tuple[str, Optional[str]]:
+    """
+    Returns the name of the file a precompressed sibling was made from, and its encoding.
+    """
+    for encoding, suffix in ENCODINGS.items():
+        if name.endswith(suffix):
+            return name[: -len(suffix)], encoding
+    return name, None
+
+
+def is_hashed(name: str) -> bool:
+    return bool(HASHED_NAME_RE.search(split_encoding(name)[0]))
+
+
+def get_available_encodings() -> List[str]:
+    return [encoding for encoding in ENCODINGS if encoding != "br" or brotli is not None]
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """
+    Returns the content in each encoding that makes it smaller. Runs in the worker processes of `PrecompressMixin`.
+    """
+    compressed = {}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(data, quality=11)
+    out = io.BytesIO()
+    # A fixed mtime keeps the output the same for the same content, so unchanged files aren't uploaded again.
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=9, mtime=0) as f:
+        f.write(data)
+    compressed["gzip"] = out.getvalue()
+    return {encoding: content for encoding, content in compressed.items() if len(content) < len(data) * 0.95}
@@ -0,0 +1,210 @@
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from django import forms
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.forms.boundfield import BoundField
+from django.forms.models import ModelChoiceIteratorValue
+from django.utils.safestring import SafeString, mark_safe
+
+WIDGET_TEMPLATE_PREFIX = "django/forms/widgets"
+HYBRID_TEMPLATE_PREFIX = "hybrid_forms/widgets"
+
+
+class FieldRenderPlan(NamedTuple):
+    """
+    The parts of a hybrid field that only depend on its widget class and template. They are computed once per process
+    by `get_field_plan`. The label, help text, choices and flags are read from the field on each render, as forms can
+    change them per instance.
+    """
+
+    template_name: str
+    widget_type: str
+    vue_multiple: bool
+
+
+_plan_cache: Dict[Tuple[type, str], FieldRenderPlan] = {}
+
+
+def get_field_plan(field: BoundField) -> FieldRenderPlan:
+    widget = field.field.widget
+    key = (type(widget), widget.template_name)
+    plan = _plan_cache.get(key)
+    if plan is None:
+        plan = FieldRenderPlan(
+            template_name=widget.template_name.replace(WIDGET_TEMPLATE_PREFIX, HYBRID_TEMPLATE_PREFIX),
+            widget_type=field.widget_type,
+            vue_multiple=getattr(widget, "allow_multiple_selected", False),
+        )
+        _plan_cache[key] = plan
+    return plan
+
+
+def has_choices(field: BoundField) -> bool:
+    return getattr(field.field.widget, "choices", None) is not None
+
+
+def clear_plan_cache() -> None:
+    _plan_cache.clear()
+
+
+def get_vue_value(field: BoundField, widget_type: str) -> Any:
+    value = field.value()
+    vue_value = value if value is not None else ""
+    if widget_type == "radioselect":
+        if vue_value == "":
+            vue_value = "unknown"
+    elif widget_type == "select":
+        vue_value = str(vue_value)
+    elif widget_type == "selectmultiple":
+        vue_value = [str(v) for v in vue_value]
+    if isinstance(vue_value, str):
+        vue_value = json.dumps(vue_value)
+    return vue_value
+
+
+def get_cached_options(field: BoundField) -> Optional[List[Dict[str, str]]]:
+    # Fields from `apps.base.choice_cache` serve their options without querying the database, unless they were changed.
+    return field.field.get_vue_options() if hasattr(field.field, "get_vue_options") else None
+
+
+def get_vue_options(field: BoundField) -> SafeString:
+    options = get_cached_options(field)
+    if options is not None:
+        return mark_safe(options)
+    return mark_safe(
+        [
+            {"value": str(v.value) if isinstance(v, ModelChoiceIteratorValue) else v, "name": n}
+            for v, n in field.field.widget.choices
+        ]
+    )
+
+
+def render_field(field: BoundField) -> SafeString:
+    """
+    Renders a bound field with its `hybrid_forms/widgets` template. This produces the same markup as rendering the
+    field through `field.as_widget()` with a patched widget, without mutating the widget or going through the widget
+    render stack.
+    """
+    plan = get_field_plan(field)
+    field.vue_value = get_vue_value(field, plan.widget_type)
+    if has_choices(field):
+        field.vue_options = get_vue_options(field)
+    field.vue_errors = [str(e) for e in field.form.errors.get(field.name, [])]
+    field.required = field.field.required
+    field.vue_multiple = plan.vue_multiple
+    field.hide_label = getattr(field, "hide_label", False)
+    field.input_type = getattr(field.field.widget, "input_type", "")
+    field.help_text = field.help_text or ""
+    context: Dict[str, Any] = {"field": field}
+    return mark_safe(field.form.renderer.render(plan.template_name, context))
+
+
+# The Vue component that renders each hybrid_forms widget template, used by the JSON form schema.
+TEMPLATE_COMPONENTS = {
+    "text.html": "TextInput",
+    "textarea.html": "TextAreaInput",
+    "select.html": "SelectInput",
+    "radio.html": "RadioGroupInput",
+    "number.html": "NumberInput",
+}
+
+
+def get_form_schema(form_class: Type[forms.BaseForm]) -> Dict[str, Any]:
+    """
+    Describes the fields of a form class for the Vue form components: the component to use, the label, help text,
+    choices and validation flags. It doesn't depend on the request, so it can be cached by the browser and CDN under
+    the version from `get_schema_version`.
+    """
+    form = form_class()
+    fields = []
+    for field in form:
+        plan = get_field_plan(field)
+        schema_field: Dict[str, Any] = {
+            "name": field.name,
+            "component": TEMPLATE_COMPONENTS.get(plan.template_name.rsplit("/", 1)[-1], "TextInput"),
+            "label": str(field.label),
+            "help_text": str(field.help_text or ""),
+            "required": field.field.required,
+            "disabled": field.field.disabled,
+            "multiple": plan.vue_multiple,
+            "input_type": getattr(field.field.widget, "input_type", ""),
+        }
+        for attr in ("max_length", "min_length", "max_value", "min_value"):
+            value = getattr(field.field, attr, None)
+            if value is not None:
+                schema_field[attr] = value
+        if has_choices(field):
+            options = get_cached_options(field)
+            if options is None:
+                options = [
+                    {"value": str(v.value) if isinstance(v, ModelChoiceIteratorValue) else v, "name": str(n)}
+                    for v, n in field.field.widget.choices
+                ]
+            schema_field["options"] = options
+        fields.append(schema_field)
+    return {"form": form_class.__name__, "fields": fields}
+
+
+def get_schema_version(schema: Dict[str, Any]) -> str:
+    return hashlib.md5(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def get_form_data(form: forms.BaseForm) -> Dict[str, Any]:
+    """
+    The per request part of a form rendered from its JSON schema: the current values, as the Vue components expect
+    them, and the errors.
+    """
+    values = {}
+    for field in form:
+        value = field.value()
+        widget_type = get_field_plan(field).widget_type
+        if widget_type == "radioselect":
+            value = {True: "true", False: "false", None: "unknown", "": "unknown"}.get(value, value)
+        elif widget_type == "select":
+            value = "" if value is None else str(value)
+        elif widget_type == "selectmultiple":
+            value = [str(v) for v in value or []]
+        elif value is None:
+            value = ""
+        values[field.name] = value
+    errors = {name: [str(e) for e in error_list] for name, error_list in form.errors.items()} if form.is_bound else {}
+    return {"values": values, "errors": errors}
+
+
+def validate_form_fields(form_class: Type[forms.BaseForm], data: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Validates only the fields in `data`, without cleaning the whole form. Each field goes through the form field's
+    `clean`, the form's `clean_<name>` method and, for model forms, the model field's `clean`, which is where
+    `PlainCharField`/`PlainTextField` strip HTML. Errors come back in the same shape as `vue_errors`.
+    """
+    form = form_class()
+    form.cleaned_data = {}
+    model = form._meta.model if isinstance(form, forms.BaseModelForm) else None
+    errors = {}
+    for name, raw_value in data.items():
+        field = form.fields.get(name)
+        if field is None or field.disabled:
+            continue
+        try:
+            value = field.clean(raw_value)
+            form.cleaned_data[name] = value
+            if hasattr(form, f"clean_{name}"):
+                value = getattr(form, f"clean_{name}")()
+                form.cleaned_data[name] = value
+            if model is not None:
+                try:
+                    model_field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    model_field = None
+                # Skipped like `ModelForm._get_validation_exclusions` skips them: relations were checked by the form
+                # field, and empty values of optional form fields are left to the model's defaults.
+                skipped = (not field.required and value in field.empty_values) or (
+                    model_field is not None and model_field.blank and value in model_field.empty_values
+                )
+                if model_field is not None and not model_field.is_relation and not skipped:
+                    model_field.clean(value, form.instance)
+        except ValidationError as e:
+            errors[name] = [str(message) for message in e.messages]
+    return errors
@@ -0,0 +1,24 @@
+from typing import List
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+
+
+class CeleryEmailBackend(BaseEmailBackend):
+    """
+    Queues outgoing email for `apps.base.tasks.send_emails` once the transaction commits, in batches of
+    `EMAIL_BATCH_SIZE` messages that are sent over one connection. The messages are sent inline when the broker is
+    unavailable.
+    """
+
+    def send_messages(self, email_messages: List[EmailMessage]) -> int:
+        from apps.base.tasks import delay_or_apply, send_emails, serialize_email
+
+        messages = [serialize_email(message) for message in email_messages if message.recipients()]
+        size = settings.EMAIL_BATCH_SIZE
+        for start in range(0, len(messages), size):
+            batch = messages[start : start + size]
+            transaction.on_commit(lambda batch=batch: delay_or_apply(send_emails, batch))
+        return len(messages)
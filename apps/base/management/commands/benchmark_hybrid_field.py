@@ -0,0 +1,84 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.forms.models import ModelChoiceIteratorValue
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from apps.base.hybrid_forms import clear_plan_cache, render_field
+
+
+def legacy_render_field(field):
+    """
+    The `hybrid_field` implementation that patched the widget on every call. Kept here as the baseline to compare the
+    render plan against.
+    """
+    field.vue_value = field.value() if field.value() is not None else ""
+    if field.widget_type == "radioselect":
+        if field.vue_value == "":
+            field.vue_value = "unknown"
+    elif field.widget_type == "select":
+        field.vue_value = str(field.vue_value)
+    elif field.widget_type == "selectmultiple":
+        field.vue_value = [str(v) for v in field.vue_value]
+    if isinstance(field.vue_value, str):
+        field.vue_value = json.dumps(field.vue_value)
+    choices = getattr(field.field.widget, "choices", None)
+    if choices is not None:
+        field.vue_options = mark_safe(
+            [{"value": str(v.value) if isinstance(v, ModelChoiceIteratorValue) else v, "name": n} for v, n in choices]
+        )
+    field.vue_errors = [str(e) for e in field.form.errors.get(field.name, [])]
+    field.required = field.field.required
+    field.vue_multiple = getattr(field.field.widget, "allow_multiple_selected", False)
+    field.hide_label = getattr(field, "hide_label", False)
+    widget = field.field.widget
+    widget.get_context = lambda name, value, attrs: {"field": field}
+    widget.template_name = widget.template_name.replace("django/forms/widgets", "hybrid_forms/widgets")
+    field.input_type = getattr(widget, "input_type", "")
+    field.help_text = field.help_text or ""
+    return mark_safe(field.as_widget())
+
+
+class Command(BaseCommand):
+    help = "Compares renders per second of the legacy hybrid_field implementation against the cached render plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--form", default="apps.recipes.forms.RecipeForm", help="Dotted path to the form class")
+        parser.add_argument("--iterations", type=int, default=500, help="Number of full form renders per run")
+        parser.add_argument("--bound", action="store_true", help="Render a bound form with empty data (with errors)")
+
+    def render_form(self, form_class, bound, render):
+        form = form_class(data={}) if bound else form_class()
+        return [render(field) for field in form]
+
+    def run(self, form_class, bound, render, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            self.render_form(form_class, bound, render)
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        try:
+            form_class = import_string(options["form"])
+        except ImportError as e:
+            raise CommandError(str(e))
+        bound = options["bound"]
+        iterations = options["iterations"]
+
+        clear_plan_cache()
+        legacy_html = self.render_form(form_class, bound, legacy_render_field)
+        plan_html = self.render_form(form_class, bound, render_field)
+        if legacy_html != plan_html:
+            for legacy, planned in zip(legacy_html, plan_html):
+                if legacy != planned:
+                    raise CommandError(f"Rendered HTML differs:\n{legacy}\n---\n{planned}")
+
+        fields = len(plan_html)
+        for name, render in (("legacy", legacy_render_field), ("render plan", render_field)):
+            elapsed = self.run(form_class, bound, render, iterations)
+            self.stdout.write(
+                f"{name:>12}: {iterations * fields / elapsed:10.0f} fields/s "
+                f"{iterations / elapsed:8.0f} forms/s ({elapsed:.3f}s for {iterations} forms of {fields} fields)"
+            )
@@ -0,0 +1,105 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.html import strip_tags as django_strip_tags
+
+from apps.base.utils.html import _strip_markup, strip_tags
+
+FUZZ_TOKENS = [
+    "Preheat the oven",
+    " to 350 degrees. ",
+    "Mix 1 < 2 cups",
+    " > ",
+    "\n",
+    "&amp;",
+    "&nbsp",
+    "&#39;",
+    "&",
+    "<",
+    ">",
+    "</",
+    "<!",
+    "<?",
+    "<b>",
+    "</b>",
+    '<p class="step">',
+    "</p>",
+    "<br/>",
+    "<br >",
+    "<img src=x onerror=alert(1)>",
+    "<a href='/recipes/1/' title=\"Toast\">",
+    "</a>",
+    "<script>",
+    "</script>",
+    "<style>",
+    "<!-- note -->",
+    "<![CDATA[x]]>",
+    "<!DOCTYPE html>",
+    "<?php ?>",
+    "<<b>>",
+    "<b <i>",
+    '"',
+    "'",
+    "=",
+    "/",
+]
+
+SAMPLES = {
+    "plain": "Whisk the eggs and sugar until pale, then fold in the flour. ",
+    "simple": "<p>Whisk the <b>eggs</b> and <em>sugar</em> until pale,<br/> then fold in the flour.</p>",
+    "complex": "<p>Whisk the eggs &amp; sugar <!-- slowly --> until 1 < 2, then fold in the flour.</p>",
+}
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def fuzz_corpus(count, seed):
+    rand = random.Random(seed)
+    return ["".join(rand.choice(FUZZ_TOKENS) for _ in range(rand.randint(1, 40))) for _ in range(count)]
+
+
+def recipe_corpus(limit):
+    from apps.recipes.models import Recipe
+
+    corpus = []
+    for values in Recipe.objects.values_list("name", "instructions", "ingredients")[:limit].iterator():
+        corpus.extend(value for value in values if value)
+    return corpus
+
+
+class Command(BaseCommand):
+    help = "Checks apps.base.utils.html.strip_tags against Django's strip_tags and compares their speed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fuzz", type=int, default=20_000, help="Number of fuzzed values to compare")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the fuzzed values")
+        parser.add_argument("--recipes", type=int, default=1_000, help="Number of recipes to add to the corpus")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of calls per timed sample")
+
+    def time(self, func, value, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(value)
+        return (time.perf_counter() - start) / repeat
+
+    def handle(self, *args, **options):
+        corpus = fuzz_corpus(options["fuzz"], options["seed"]) + recipe_corpus(options["recipes"])
+        for value in corpus:
+            expected = django_strip_tags(value)
+            if strip_tags(value) != expected:
+                raise CommandError(f"Output differs from django.utils.html.strip_tags for {value!r}")
+        self.stdout.write(f"{len(corpus)} values match django.utils.html.strip_tags")
+
+        repeat = options["repeat"]
+        self.stdout.write(f"{'input':>8} {'bytes':>8} {'django':>12} {'engine':>12} {'memoized':>12}")
+        for name, sample in SAMPLES.items():
+            for size in SIZES:
+                # Repeat whole samples so a tag is never cut in half.
+                value = sample * max(1, size // len(sample))
+                django_time = self.time(django_strip_tags, value, repeat)
+                engine_time = self.time(lambda v: (_strip_markup.cache_clear(), strip_tags(v)), value, repeat)
+                memo_time = self.time(strip_tags, value, repeat)
+                self.stdout.write(
+                    f"{name:>8} {len(value):>8} {django_time * 1e6:>10.1f}us {engine_time * 1e6:>10.1f}us "
+                    f"{memo_time * 1e6:>10.1f}us"
+                )
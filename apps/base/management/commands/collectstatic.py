@@ -0,0 +1,26 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+
+
+class Command(CollectStaticCommand):
+    """
+    Collects the static files within a batch of the storage when it supports one, as `StaticS3Storage` does to upload
+    the changed files in parallel.
+    """
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--refresh-upload-cache",
+            action="store_true",
+            help="List the bucket again instead of trusting the local cache of the uploaded files.",
+        )
+
+    def set_options(self, **options):
+        super().set_options(**options)
+        self.refresh_upload_cache = options["refresh_upload_cache"]
+
+    def collect(self):
+        if not hasattr(self.storage, "batch"):
+            return super().collect()
+        with self.storage.batch(refresh=self.refresh_upload_cache):
+            return super().collect()
@@ -0,0 +1,91 @@
+import json
+import platform
+import sqlite3
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from apps.base import benchmarking
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway database with synthetic recipes and users and benchmarks the views, form rendering and "
+        "field cleaning. Results are written as JSON and can be compared against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Benchmarks to run, all of them by default")
+        parser.add_argument("--size", type=int, default=1_000, help="Number of recipes and users to seed")
+        parser.add_argument("--iterations", type=int, default=50, help="Timed calls per benchmark")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed calls before the timed ones")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+        parser.add_argument("--output", help="File to write the JSON results to")
+        parser.add_argument("--compare", help="Baseline JSON results to compare against, fails on regressions")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline, as a fraction"
+        )
+        parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+
+    def handle(self, *args, **options):
+        benchmarking.autodiscover()
+        benchmarks = benchmarking.get_benchmarks()
+        if options["list"]:
+            for name in benchmarks:
+                self.stdout.write(name)
+            return
+        names = options["names"] or list(benchmarks)
+        unknown = sorted(set(names) - set(benchmarks))
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(unknown)}")
+        if options["iterations"] < 1 or options["size"] < 1:
+            raise CommandError("--iterations and --size must be at least 1")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)["results"]
+
+        # The test database is a new in-memory database on SQLite, and the test client needs its host allowed.
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                start = time.monotonic()
+                benchmarking.seed(options["size"], options["seed"])
+                self.stderr.write(f"Seeded {options['size']} rows in {time.monotonic() - start:.1f}s")
+                results = benchmarking.run(names, options["size"], options["iterations"], options["warmup"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.write_table(results)
+        output = {
+            "meta": {
+                "size": options["size"],
+                "iterations": options["iterations"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "sqlite": sqlite3.sqlite_version,
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(output, f, indent=2)
+                f.write("\n")
+
+        if baseline is not None:
+            regressions = benchmarking.compare(results, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def write_table(self, results):
+        self.stdout.write(f"{'benchmark':>24} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}")
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:>24} {stats['p50']:>7.2f}ms {stats['p95']:>7.2f}ms {stats['p99']:>7.2f}ms {stats['queries']:>8}"
+            )
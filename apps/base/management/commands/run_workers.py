@@ -0,0 +1,65 @@
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a celery worker per queue with the concurrency of TASK_QUEUE_CONCURRENCY, so a slow queue such as "
+        "email can't hold up the others. Stops every worker when one of them exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("queues", nargs="*", help="Queues to run workers for, all of them by default")
+        parser.add_argument("--loglevel", default="info")
+
+    def handle(self, *args, **options):
+        concurrency = settings.TASK_QUEUE_CONCURRENCY
+        queues = options["queues"] or list(concurrency)
+        unknown = set(queues) - set(concurrency)
+        if unknown:
+            raise CommandError(f"Unknown queues: {', '.join(sorted(unknown))}")
+
+        workers = []
+        for queue in queues:
+            command = [
+                sys.executable,
+                "-m",
+                "celery",
+                "-A",
+                "config",
+                "worker",
+                "-Q",
+                queue,
+                "-c",
+                str(concurrency[queue]),
+                "-n",
+                f"{queue}@%h",
+                "-l",
+                options["loglevel"],
+            ]
+            self.stdout.write(f"Starting {concurrency[queue]} worker processes for {queue}")
+            workers.append(subprocess.Popen(command))
+
+        def stop(signum, frame):
+            for worker in workers:
+                if worker.poll() is None:
+                    worker.send_signal(signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        try:
+            # Waits for the first worker to exit, then for the others to finish their tasks.
+            while all(worker.poll() is None for worker in workers):
+                time.sleep(1)
+        finally:
+            stop(None, None)
+            for worker in workers:
+                worker.wait()
+        codes = [worker.returncode for worker in workers]
+        if any(codes):
+            raise CommandError(f"Workers exited with {codes}")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.base.warmup import iter_template_names, warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        "Compiles every project template, as the workers do at startup in production template mode, and reports the "
+        "compile time of each one. Fails when a template doesn't compile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Templates to compile, all of the project's by default")
+        parser.add_argument("--all", action="store_true", help="Include the templates of third party apps")
+        parser.add_argument("--slowest", type=int, default=10, help="Number of slowest templates to list")
+
+    def handle(self, *args, **options):
+        names = options["names"] or list(iter_template_names(include_third_party=options["all"]))
+        timings = warm_templates(names)
+
+        if options["verbosity"] > 1:
+            for timing in timings:
+                self.stdout.write(f"{timing.duration:>9.2f}ms {timing.name}")
+        else:
+            for timing in sorted(timings, key=lambda t: t.duration, reverse=True)[: options["slowest"]]:
+                self.stdout.write(f"{timing.duration:>9.2f}ms {timing.name}")
+
+        total = sum(timing.duration for timing in timings)
+        self.stdout.write(f"Compiled {len(timings)} templates in {total:.2f}ms")
+        errors = [f"{timing.name}: {timing.error}" for timing in timings if timing.error]
+        if errors:
+            raise CommandError("Templates failed to compile:\n" + "\n".join(errors))
@@ -1,5 +1,6 @@
 from django.db.models import CharField, TextField
-from django.utils.html import strip_tags
+
+from apps.base.utils.html import strip_tags
 
 
 class PlainTextField(TextField):
@@ -7,6 +8,8 @@ class PlainTextField(TextField):
 
     def to_python(self, value):
         value = super().to_python(value)
+        if value is None:
+            return value
         return strip_tags(value)
 
 
@@ -15,4 +18,6 @@ class PlainCharField(CharField):
 
     def to_python(self, value):
         value = super().to_python(value)
+        if value is None:
+            return value
         return strip_tags(value)
@@ -0,0 +1,132 @@
+import base64
+import binascii
+from typing import Any, List, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.http import Http404, QueryDict
+
+CURSOR_AFTER = "a"
+CURSOR_BEFORE = "b"
+# The range of the BIGINT columns that keys are compared with, anything outside raises an error in the query.
+MAX_KEY = 2**63 - 1
+MIN_KEY = -(2**63)
+
+
+def encode_cursor(direction: str, key: int) -> str:
+    return base64.urlsafe_b64encode(f"{direction}:{key}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        direction, key = raw.split(":", 1)
+        if direction not in (CURSOR_AFTER, CURSOR_BEFORE):
+            raise ValueError(direction)
+        value = int(key)
+        if not MIN_KEY <= value <= MAX_KEY:
+            raise ValueError(key)
+        return direction, value
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404("Invalid cursor.")
+
+
+class CursorPage:
+    """
+    A page of a keyset paginated queryset. It has the parts of `django.core.paginator.Page` that make sense without
+    knowing the total number of rows.
+    """
+
+    def __init__(
+        self,
+        object_list: List[Any],
+        next_cursor: Optional[str],
+        previous_cursor: Optional[str],
+        query_params: QueryDict,
+        cursor_query_param: str,
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.query_params = query_params
+        self.cursor_query_param = cursor_query_param
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def _url(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        params = self.query_params.copy()
+        params[self.cursor_query_param] = cursor
+        return f"?{params.urlencode()}"
+
+    @property
+    def next_url(self) -> Optional[str]:
+        return self._url(self.next_cursor)
+
+    @property
+    def previous_url(self) -> Optional[str]:
+        return self._url(self.previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Replaces the OFFSET based pagination of `ListView` with keyset pagination on an indexed, unique integer column so
+    every page costs the same no matter how deep it is. The next/previous tokens encode the key of the last/first row
+    on the page, so they stay valid while rows are added or removed.
+
+    The total number of rows is only counted when `paginate_count` is set, since a COUNT(*) is a full scan on large
+    tables. It's then available as `total_count` in the context.
+    """
+
+    paginate_by = 50
+    cursor_field = "pk"
+    cursor_query_param = "cursor"
+    paginate_count = False
+
+    def get_cursor(self) -> Tuple[str, Optional[int]]:
+        token = self.request.GET.get(self.cursor_query_param)  # type: ignore
+        return decode_cursor(token) if token else (CURSOR_AFTER, None)
+
+    def paginate_queryset(self, queryset: QuerySet, page_size: int) -> Tuple[None, CursorPage, List[Any], bool]:
+        direction, key = self.get_cursor()
+        field = self.cursor_field
+
+        if direction == CURSOR_AFTER:
+            if key is not None:
+                queryset = queryset.filter(**{f"{field}__gt": key})
+            rows = list(queryset.order_by(field)[: page_size + 1])
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            has_next, has_previous = has_more, key is not None
+        else:
+            queryset = queryset.filter(**{f"{field}__lt": key})
+            rows = list(queryset.order_by(f"-{field}")[: page_size + 1])
+            has_more = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next, has_previous = True, has_more
+
+        next_cursor = encode_cursor(CURSOR_AFTER, getattr(rows[-1], field)) if rows and has_next else None
+        previous_cursor = encode_cursor(CURSOR_BEFORE, getattr(rows[0], field)) if rows and has_previous else None
+        query_params = self.request.GET.copy()  # type: ignore
+        query_params.pop(self.cursor_query_param, None)
+        page = CursorPage(rows, next_cursor, previous_cursor, query_params, self.cursor_query_param)
+        return None, page, rows, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)  # type: ignore
+        if self.paginate_count:
+            data["total_count"] = self.get_queryset().order_by().count()  # type: ignore
+        return data
@@ -0,0 +1,216 @@
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# The profile of the request being handled in this thread or task, if it is sampled.
+_current: "ContextVar[Optional[RequestProfile]]" = ContextVar("request_profile", default=None)
+
+# The most recent profiles of this process, newest last.
+_buffer: Deque[Dict[str, Any]] = deque(maxlen=settings.PROFILER_BUFFER_SIZE)
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class RequestProfile:
+    """
+    Collects the queries and timed blocks of a request. Queries are grouped by their SQL, which still has the
+    placeholders, so the same statement run for every row of a page shows up as one pattern with a high count.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.view_name = ""
+        self.status_code: Optional[int] = None
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.query_time = 0.0
+        self.patterns: Counter = Counter()
+        self.pattern_times: Counter = Counter()
+        self.executions: Counter = Counter()
+        self.blocks: Dict[str, List[float]] = {}
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_time += duration
+            self.patterns[sql] += 1
+            self.pattern_times[sql] += duration
+            self.executions[(sql, repr(params))] += 1
+
+    def add_block(self, name: str, duration: float) -> None:
+        block = self.blocks.setdefault(name, [0, 0.0])
+        block[0] += 1
+        block[1] += duration
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self.start
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns the profile as a JSON serializable dict. The times are in milliseconds.
+        """
+        threshold = settings.PROFILER_REPEATED_QUERY_THRESHOLD
+        return {
+            "path": self.path,
+            "view_name": self.view_name,
+            "status_code": self.status_code,
+            "duration": round(self.duration * 1000, 2),
+            "queries": sum(self.patterns.values()),
+            "query_time": round(self.query_time * 1000, 2),
+            "duplicate_queries": sum(count - 1 for count in self.executions.values()),
+            "repeated_queries": [
+                {"sql": sql, "count": count, "time": round(self.pattern_times[sql] * 1000, 2)}
+                for sql, count in self.patterns.most_common()
+                if count >= threshold
+            ],
+            "render_time": round(self.blocks.get("render", [0, 0.0])[1] * 1000, 2),
+            "blocks": {
+                name: {"count": count, "time": round(duration * 1000, 2)}
+                for name, (count, duration) in self.blocks.items()
+            },
+        }
+
+
+def get_current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+@contextmanager
+def profile(path: str = "") -> Iterator[RequestProfile]:
+    """
+    Profiles the queries on every database connection and the `timed` blocks run inside the block.
+    """
+    request_profile = RequestProfile(path)
+    token = _current.set(request_profile)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(request_profile.execute_wrapper))
+            yield request_profile
+    finally:
+        request_profile.stop()
+        _current.reset(token)
+
+
+def timed(name: str):
+    """
+    Adds the time of each call of the decorated function to the current profile under `name`. Without a profile the
+    function is called as is.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request_profile = _current.get()
+            if request_profile is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                request_profile.add_block(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def check_budget(summary: Dict[str, Any], budget: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    Returns a message for every value of the summary over its budget. The budget defaults to the one in
+    `PROFILER_BUDGETS` for the view name of the summary.
+    """
+    if budget is None:
+        budget = settings.PROFILER_BUDGETS.get(summary["view_name"], {})
+    return [f"{key} {summary[key]} > {limit}" for key, limit in budget.items() if summary[key] > limit]
+
+
+def record(request_profile: RequestProfile) -> Dict[str, Any]:
+    summary = request_profile.summary()
+    summary["overruns"] = check_budget(summary)
+    _buffer.append(summary)
+    logger.log(logging.WARNING if summary["overruns"] else logging.INFO, json.dumps(summary))
+    return summary
+
+
+def get_recent_profiles() -> List[Dict[str, Any]]:
+    return list(_buffer)
+
+
+@contextmanager
+def within_budget(view_name: str, keys: Optional[Iterable[str]] = None, **budget: float) -> Iterator[RequestProfile]:
+    """
+    Profiles the block and raises `BudgetExceeded` when it goes over the budget of the view in `PROFILER_BUDGETS`,
+    updated with the keyword arguments. Only the values in `keys` are checked when it's given. Meant for tests:
+
+        with within_budget("recipes:list", keys=("queries",)):
+            self.client.get(reverse("recipes:list"))
+    """
+    budget = {**settings.PROFILER_BUDGETS.get(view_name, {}), **budget}
+    if keys is not None:
+        budget = {key: limit for key, limit in budget.items() if key in keys}
+    with profile(view_name) as request_profile:
+        yield request_profile
+    request_profile.view_name = request_profile.view_name or view_name
+    overruns = check_budget(request_profile.summary(), budget)
+    if overruns:
+        raise BudgetExceeded(f"{view_name} is over budget: {', '.join(overruns)}")
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a `PROFILER_SAMPLE_RATE` share of the requests: the number and time of the queries, the statements that
+    were repeated, the template render time and the time of the `timed` template tags. The profiles go to the
+    `apps.base.profiling` logger, as warnings when the view is over its budget in `PROFILER_BUDGETS`, and to a ring
+    buffer of the last `PROFILER_BUFFER_SIZE` requests of the process.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_profile = _current.get()
+        if request_profile is not None:
+            # Already profiled by `within_budget`.
+            response = self.get_response(request)
+            self.finish(request, response, request_profile)
+            return response
+        if random.random() >= settings.PROFILER_SAMPLE_RATE:
+            return self.get_response(request)
+
+        with profile(request.path) as request_profile:
+            response = self.get_response(request)
+        self.finish(request, response, request_profile)
+        record(request_profile)
+        return response
+
+    def finish(self, request, response, request_profile: RequestProfile) -> None:
+        resolver_match = getattr(request, "resolver_match", None)
+        request_profile.view_name = resolver_match.view_name if resolver_match else ""
+        request_profile.status_code = response.status_code
+
+    def process_template_response(self, request, response):
+        request_profile = _current.get()
+        if request_profile is not None:
+            # The response is rendered right after the template response middleware.
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: request_profile.add_block("render", time.perf_counter() - start)
+            )
+        return response
@@ -0,0 +1,157 @@
+"""
+A redis session engine, used with `SESSION_ENGINE = "apps.base.sessions"`.
+
+Compared to `redis_sessions.session` it doesn't touch redis for requests without a session cookie, uses the
+connection pool of the redis cache (or a pool of its own sized from `CACHE_URL`), creates sessions with a single
+`SET NX` and skips the write when the session data didn't change. With `SESSION_ANONYMOUS_SIGNED_COOKIE` the
+sessions of anonymous visitors are kept in a signed cookie, like `django.contrib.sessions.backends.signed_cookies`,
+and only move to redis when a user logs in.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.base import VALID_KEY_CHARS, CreateError, SessionBase
+from django.core import signing
+from django.utils.crypto import get_random_string
+
+import redis
+
+from apps.base.cache import get_redis_client
+
+SIGNED_COOKIE_SALT = "apps.base.sessions"
+# Leaves room for the cookie name and attributes under the 4096 bytes browsers accept.
+MAX_SIGNED_COOKIE_SIZE = 3_800
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                options = settings.SESSION_REDIS
+                client = get_redis_client(options["cache_alias"]) if options.get("cache_alias") else None
+                if client is None:
+                    pool = redis.BlockingConnectionPool(
+                        host=options.get("host") or "localhost",
+                        port=options.get("port") or 6379,
+                        db=options.get("db", 0),
+                        password=options.get("password"),
+                        socket_timeout=float(options.get("socket_timeout", 20)),
+                        max_connections=options.get("max_connections", 50),
+                        timeout=options.get("pool_timeout", 20),
+                    )
+                    client = redis.Redis(connection_pool=pool)
+                _client = client
+    return _client
+
+
+def is_signed_key(session_key: Optional[str]) -> bool:
+    # Random session keys are lowercase letters and digits, signed values always contain the ":" separator.
+    return session_key is not None and ":" in session_key
+
+
+class SessionStore(SessionBase):
+    def __init__(self, session_key: Optional[str] = None):
+        super().__init__(session_key)
+        # The serialized data as it was loaded or last saved, to skip saving a session that didn't change. The
+        # encoded data can't be compared as its signature is timestamped.
+        self._stored_data: Optional[bytes] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        return get_client()
+
+    def get_stored_key(self, session_key: str) -> str:
+        prefix = settings.SESSION_REDIS.get("prefix")
+        return f"{prefix}:{session_key}" if prefix else session_key
+
+    def load(self) -> Dict[str, Any]:
+        if self.session_key is None:
+            return {}
+        if is_signed_key(self.session_key):
+            try:
+                return signing.loads(
+                    self.session_key,
+                    serializer=self.serializer,
+                    max_age=self.get_session_cookie_age(),
+                    salt=SIGNED_COOKIE_SALT,
+                )
+            except Exception:
+                # A bad signature, an expired cookie or a cookie signed while the fast path was off.
+                self._session_key = None
+                return {}
+        data = self.client.get(self.get_stored_key(self.session_key))
+        if data is None:
+            self._session_key = None
+            return {}
+        session = self.decode(data.decode())
+        self._stored_data = self.serializer().dumps(session)
+        return session
+
+    def exists(self, session_key: str) -> bool:
+        if is_signed_key(session_key):
+            return False
+        return bool(self.client.exists(self.get_stored_key(session_key)))
+
+    def use_signed_cookie(self, session: Dict[str, Any]) -> bool:
+        return getattr(settings, "SESSION_ANONYMOUS_SIGNED_COOKIE", False) and SESSION_KEY not in session
+
+    def create(self) -> None:
+        self._session_key = None
+        self.modified = True
+        if not self.use_signed_cookie(self._get_session(no_load=True)):
+            self._create_stored()
+
+    def _get_new_session_key(self) -> str:
+        # Uniqueness is checked by the `SET NX` in `_create_stored` instead of an `EXISTS` round trip.
+        return get_random_string(32, VALID_KEY_CHARS)
+
+    def _create_stored(self) -> None:
+        session = self._get_session(no_load=True)
+        data = self.encode(session)
+        while True:
+            session_key = self._get_new_session_key()
+            if self.client.set(self.get_stored_key(session_key), data, ex=self.get_expiry_age(), nx=True):
+                self._session_key = session_key
+                self._stored_data = self.serializer().dumps(session)
+                return
+
+    def save(self, must_create: bool = False) -> None:
+        session = self._get_session(no_load=must_create)
+        if self.use_signed_cookie(session):
+            signed = signing.dumps(session, compress=True, salt=SIGNED_COOKIE_SALT, serializer=self.serializer)
+            if len(signed) <= MAX_SIGNED_COOKIE_SIZE:
+                if self.session_key is not None and not is_signed_key(self.session_key):
+                    self.delete(self.session_key)
+                self._session_key = signed
+                return
+        if self.session_key is None or is_signed_key(self.session_key):
+            self._create_stored()
+            return
+
+        key = self.get_stored_key(self.session_key)
+        serialized = self.serializer().dumps(session)
+        if serialized == self._stored_data and not must_create:
+            # Only the expiry needs refreshing, e.g. with SESSION_SAVE_EVERY_REQUEST.
+            self.client.expire(key, self.get_expiry_age())
+            return
+        if not self.client.set(key, self.encode(session), ex=self.get_expiry_age(), nx=must_create):
+            raise CreateError
+        self._stored_data = serialized
+
+    def delete(self, session_key: Optional[str] = None) -> None:
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is None or is_signed_key(session_key):
+            return
+        self.client.delete(self.get_stored_key(session_key))
+
+    @classmethod
+    def clear_expired(cls) -> None:
+        # Redis expires the keys itself and signed cookies expire in the browser.
+        pass
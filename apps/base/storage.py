@@ -1,11 +1,291 @@
-from django.contrib.staticfiles.storage import ManifestFilesMixin
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin, ManifestStaticFilesStorage
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.files.base import ContentFile, File
 
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+from apps.base.compression import (
+    COMPRESSIBLE_EXTENSIONS,
+    ENCODINGS,
+    IMMUTABLE_CACHE_CONTROL,
+    MIN_COMPRESS_SIZE,
+    compress,
+    get_available_encodings,
+    is_hashed,
+    split_encoding,
+)
+
+
+def get_local_path(content: Any) -> Optional[str]:
+    """
+    Returns the path of a file opened from the local disk, such as the source files `collectstatic` copies.
+    """
+    name = getattr(getattr(content, "file", None), "name", None) or getattr(content, "name", None)
+    if isinstance(name, str) and os.path.isabs(name) and os.path.isfile(name):
+        return name
+    return None
+
+
+class ParallelUploadMixin:
+    """
+    Speeds up `collectstatic` on S3. Within `batch()`, which the project's `collectstatic` command opens:
+
+    - Files are uploaded by a pool of `STATICFILES_UPLOAD_WORKERS` threads instead of one at a time.
+    - Files whose MD5 matches the local cache of what is in the bucket aren't uploaded, and `exists` answers from
+      that cache instead of a HEAD request. The cache is seeded from one listing of the bucket when it's missing.
+    - Deletes are held until the end and dropped when the same content is saved again, as `collectstatic` and
+      `post_process` delete files before saving them.
+    - The MD5 of each local file is computed once, for both the hashed names and the upload check.
+    - `staticfiles.json` is uploaded last, once every file it references is in the bucket.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        # Set first, as `ManifestFilesMixin.__init__` opens the manifest.
+        self._batch = False
+        self._lock = threading.Lock()
+        self._local_md5: Dict[str, str] = {}
+        super().__init__(*args, **kwargs)
+
+    # The local cache of the bucket
+
+    def get_upload_cache_path(self) -> str:
+        return getattr(settings, "STATICFILES_UPLOAD_CACHE", str(settings.BASE_DIR.joinpath(".staticfiles-cache.json")))
+
+    def get_cache_scope(self) -> Dict[str, str]:
+        return {"bucket": self.bucket_name, "location": self.location}  # type: ignore
+
+    def load_upload_cache(self) -> Dict[str, str]:
+        try:
+            with open(self.get_upload_cache_path()) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return self.list_uploaded()
+        if cache.get("scope") != self.get_cache_scope():
+            return self.list_uploaded()
+        return cache["files"]
+
+    def list_uploaded(self) -> Dict[str, str]:
+        """
+        Returns the MD5 of every file in the bucket under the location, from the ETags. Files uploaded in parts have
+        another kind of ETag and are left out, so they are uploaded again once.
+        """
+        prefix = self._normalize_name("")  # type: ignore
+        prefix = prefix if prefix.endswith("/") or not prefix else prefix + "/"
+        uploaded = {}
+        for obj in self.bucket.objects.filter(Prefix=prefix):  # type: ignore
+            etag = obj.e_tag.strip('"')
+            if "-" not in etag:
+                uploaded[obj.key[len(prefix) :]] = etag
+        return uploaded
+
+    def save_upload_cache(self) -> None:
+        path = self.get_upload_cache_path()
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"scope": self.get_cache_scope(), "files": self._uploaded}, f)
+        os.replace(f"{path}.tmp", path)
+
+    @contextmanager
+    def batch(self, refresh: bool = False) -> Iterator[None]:
+        """
+        Holds the uploads, deletes and the manifest until the block ends. Nothing is written to the cache or the
+        manifest when an upload fails, so the next run retries it.
+        """
+        self._uploaded: Dict[str, str] = self.list_uploaded() if refresh else self.load_upload_cache()
+        self._deleted: Set[str] = set()
+        self._contents: Dict[str, Any] = {}
+        # The last upload of each name, which waits for the earlier ones.
+        self._uploads: Dict[str, Future] = {}
+        self._pending_manifest: Optional[bytes] = None
+        # The source files may have changed since an earlier batch of the same storage.
+        self._local_md5 = {}
+        workers = getattr(settings, "STATICFILES_UPLOAD_WORKERS", 16)
+        # Bounds the uploads read into memory but not sent yet. The content of files that aren't on the local disk is
+        # also kept in `_contents` until it's uploaded, so they are bounded too.
+        self._slots = threading.BoundedSemaphore(workers * 4)
+        self._batch = True
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                self._executor = executor
+                yield
+            for future in self._uploads.values():
+                future.result()
+            for name in self._deleted:
+                super().delete(name)  # type: ignore
+                self._uploaded.pop(name, None)
+            if self._pending_manifest is not None:
+                super()._save(self.manifest_name, ContentFile(self._pending_manifest))  # type: ignore
+            self.save_upload_cache()
+        finally:
+            self._batch = False
+            self._contents = {}
+
+    # Storage API
+
+    def get_md5(self, content: Any) -> str:
+        path = get_local_path(content)
+        if path is not None and path in self._local_md5:
+            return self._local_md5[path]
+        md5 = hashlib.md5()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            md5.update(chunk)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        if path is not None:
+            self._local_md5[path] = md5.hexdigest()
+        return md5.hexdigest()
+
+    def file_hash(self, name: str, content: Any = None) -> Optional[str]:
+        if content is None:
+            return None
+        return self.get_md5(content)[:12]
 
+    def exists(self, name: str) -> bool:
+        if not self._batch:
+            return super().exists(name)  # type: ignore
+        name = clean_name(name)
+        return name in self._uploaded and name not in self._deleted
 
-class StaticS3Storage(ManifestFilesMixin, S3Boto3Storage):
+    def delete(self, name: str) -> None:
+        if not self._batch:
+            return super().delete(name)  # type: ignore
+        self._deleted.add(clean_name(name))
+
+    def get_modified_time(self, name: str) -> Any:
+        if self._batch:
+            # `collectstatic` then deletes and saves the file, which only uploads it when its content changed.
+            raise NotImplementedError
+        return super().get_modified_time(name)  # type: ignore
+
+    def _open(self, name: str, mode: str = "rb") -> File:
+        # Read once, as an upload that finishes meanwhile drops the content.
+        content = self._contents.get(clean_name(name)) if self._batch else None
+        if content is not None:
+            return File(open(content, "rb")) if isinstance(content, str) else ContentFile(content, name)
+        return super()._open(name, mode)  # type: ignore
+
+    def _save(self, name: str, content: Any) -> str:
+        if not self._batch:
+            return super()._save(name, content)  # type: ignore
+        name = clean_name(name)
+        md5 = self.get_md5(content)
+        path = get_local_path(content)
+        self._deleted.discard(name)
+        previous = self._uploads.get(name)
+        # `ManifestFilesMixin` saves a hashed name again with its references adjusted, and the upload of another
+        # content may still be on its way.
+        if self._uploaded.get(name) == md5 and (previous is None or previous.done()):
+            # Already in the bucket, where `_open` reads the files that aren't on the local disk.
+            if path is not None:
+                self._contents[name] = path
+            else:
+                self._contents.pop(name, None)
+            return name
+
+        self._slots.acquire()
+        if path is not None:
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            data = content.read()
+        # Kept so `_open` can serve the file until it's uploaded: by path for local files, by content for the others.
+        self._contents[name] = path if path is not None else data
+
+        def upload() -> None:
+            try:
+                # Submitted earlier, so it already runs in another thread. The bucket keeps the last content saved.
+                if previous is not None:
+                    previous.result()
+                # The boto3 client behind the bucket resource is thread safe.
+                super(ParallelUploadMixin, self)._save(name, ContentFile(data, name))  # type: ignore
+                with self._lock:
+                    self._uploaded[name] = md5
+                    if self._contents.get(name) is data:
+                        del self._contents[name]
+            finally:
+                self._slots.release()
+
+        self._uploads[name] = self._executor.submit(upload)
+        return name
+
+    def save_manifest(self) -> None:
+        if not self._batch:
+            return super().save_manifest()  # type: ignore
+        payload = {"paths": self.hashed_files, "version": self.manifest_version}  # type: ignore
+        self._pending_manifest = json.dumps(payload).encode()
+
+
+class PrecompressMixin:
+    """
+    Writes `.br` (with the `brotli` package installed) and `.gz` siblings of the text files `collectstatic` collects,
+    compressed at the highest level by a process per core. With `ManifestFilesMixin` only the hashed names are
+    compressed, and the siblings of a hashed name that's already stored are kept as they are.
+    """
+
+    def post_process(self, paths: Dict[str, Any], dry_run: bool = False, **options: Any) -> Iterator[Any]:
+        yield from super().post_process(paths, dry_run, **options)  # type: ignore
+        if dry_run:
+            return
+
+        suffixes = [ENCODINGS[encoding] for encoding in get_available_encodings()]
+        names = []
+        contents = []
+        for path in paths:
+            name = self.hashed_files.get(self.hash_key(path)) if isinstance(self, ManifestFilesMixin) else path
+            if name is None or not name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            if is_hashed(name) and all(self.exists(name + suffix) for suffix in suffixes):  # type: ignore
+                continue
+            # Only the files whose references `ManifestFilesMixin` adjusts differ from the collected original, which
+            # is cheaper to read than a hashed name it didn't save again.
+            adjusted = isinstance(self, ManifestFilesMixin) and matches_patterns(path, self._patterns)
+            with self.open(name if adjusted else path) as f:  # type: ignore
+                content = f.read()
+            if len(content) >= MIN_COMPRESS_SIZE:
+                names.append(name)
+                contents.append(content)
+
+        if not names:
+            return
+        with ProcessPoolExecutor() as executor:
+            for name, compressed in zip(names, executor.map(compress, contents)):
+                for encoding, content in compressed.items():
+                    compressed_name = name + ENCODINGS[encoding]
+                    if self.exists(compressed_name):  # type: ignore
+                        self.delete(compressed_name)  # type: ignore
+                    self._save(compressed_name, ContentFile(content))  # type: ignore
+                    yield name, compressed_name, True
+
+
+class CompressedManifestStaticFilesStorage(PrecompressMixin, ManifestStaticFilesStorage):
+    pass
+
+
+class StaticS3Storage(PrecompressMixin, ParallelUploadMixin, ManifestFilesMixin, S3Boto3Storage):
     location = "static"
 
+    def get_object_parameters(self, name: str) -> Dict[str, str]:
+        params = super().get_object_parameters(name)
+        if is_hashed(name):
+            params["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+        original_name, encoding = split_encoding(name)
+        if encoding is not None:
+            params["ContentType"] = mimetypes.guess_type(original_name)[0] or "application/octet-stream"
+            params["ContentEncoding"] = encoding
+        return params
+
 
 class MediaS3Storage(ManifestFilesMixin, S3Boto3Storage):
     location = "media"
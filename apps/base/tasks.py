@@ -1,7 +1,154 @@
-from celery import shared_task
+"""
+Background work, run by the celery workers once the transaction that caused it commits.
 
+`enqueue_on_commit` coalesces the ids passed for a task during a transaction into one task message, and leaves out
+the ids that already wait in the queue for that task. Tasks that are enqueued this way use `CoalescedTask` as their
+base so an id can be enqueued again as soon as a worker starts on it.
+"""
+import base64
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
 
-@shared_task
-def add(x, y):
-    # Example task that can be removed
-    print(x + y)
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+
+from celery import Task, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from kombu.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+def get_pending_key(task_name: str, item: Any) -> str:
+    return f"tasks:pending:{task_name}:{item}"
+
+
+class CoalescedTask(Task):
+    """
+    Takes a list of ids as its first argument and releases them before running, so changes made while it runs are
+    handled by the next task.
+    """
+
+    def __call__(self, items: List[Any], *args: Any, **kwargs: Any) -> Any:
+        cache.delete_many([get_pending_key(self.name, item) for item in items])
+        return super().__call__(items, *args, **kwargs)
+
+
+def delay_or_apply(task: Task, *args: Any) -> None:
+    try:
+        task.delay(*args)
+    except OperationalError:
+        # The broker is unavailable, so the work isn't lost but slows this request down.
+        logger.exception("Enqueueing %s failed, running it inline", task.name)
+        task.apply(args)
+
+
+class PendingItems:
+    """
+    The `on_commit` callback of `enqueue_on_commit`, which holds the ids to send. Django drops it along with the ids
+    when a savepoint it was registered in rolls back.
+    """
+
+    def __init__(self, task: Task, items: Set[Any]):
+        self.task = task
+        self.items = items
+        self.done = False
+
+    def __call__(self) -> None:
+        self.done = True
+        timeout = settings.TASK_DEDUPLICATION_TIMEOUT
+        # `add` fails for the ids that are still waiting in the queue.
+        items = sorted(item for item in self.items if cache.add(get_pending_key(self.task.name, item), 1, timeout))
+        if items:
+            delay_or_apply(self.task, items)
+
+
+def enqueue_on_commit(task: Task, items: Iterable[Any], using: Optional[str] = None) -> None:
+    """
+    Runs `task` for the ids once the current transaction commits, or right away in autocommit mode. Calls for the same
+    task add to one message, unless they are made in a savepoint that the earlier calls weren't made in.
+    """
+    items = set(items)
+    if not items:
+        return
+    connection = transaction.get_connection(using)
+    savepoints = set(connection.savepoint_ids)
+    for sids, func in connection.run_on_commit:
+        # The savepoints of a callback that aren't open anymore were released, so it's dropped exactly when these ids
+        # should be. `captureOnCommitCallbacks` leaves the callbacks it ran registered.
+        if isinstance(func, PendingItems) and func.task.name == task.name and not func.done and sids >= savepoints:
+            func.items.update(items)
+            return
+    transaction.on_commit(PendingItems(task, items), using=using)
+
+
+def serialize_email(message: EmailMultiAlternatives) -> Dict[str, Any]:
+    attachments = []
+    for filename, content, mimetype in message.attachments:
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append([filename, base64.b64encode(content).decode(), mimetype])
+    return {
+        "subject": message.subject,
+        "body": message.body,
+        "from_email": message.from_email,
+        "to": message.to,
+        "cc": message.cc,
+        "bcc": message.bcc,
+        "reply_to": message.reply_to,
+        "headers": message.extra_headers,
+        "alternatives": getattr(message, "alternatives", []),
+        "attachments": attachments,
+        "content_subtype": message.content_subtype,
+    }
+
+
+def deserialize_email(data: Dict[str, Any]) -> EmailMultiAlternatives:
+    data = dict(data)
+    attachments = data.pop("attachments")
+    content_subtype = data.pop("content_subtype")
+    data["alternatives"] = [tuple(alternative) for alternative in data["alternatives"]]
+    message = EmailMultiAlternatives(**data)
+    message.content_subtype = content_subtype
+    for filename, content, mimetype in attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+@shared_task(bind=True, **settings.TASK_RETRY_POLICY)
+def send_emails(self: Task, messages: List[Dict[str, Any]]) -> int:
+    """
+    Sends a batch of messages queued by `apps.base.mail.CeleryEmailBackend` over one connection of
+    `EMAIL_DELIVERY_BACKEND`. Only the messages that failed are retried, so the others aren't sent twice.
+    """
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    sent = 0
+    failed = []
+    error = None
+    try:
+        connection.open()
+    except OSError:
+        # Each message tries to open it again, and is retried when that fails.
+        pass
+    try:
+        for message in messages:
+            try:
+                sent += connection.send_messages([deserialize_email(message)]) or 0
+            except OSError as e:
+                failed.append(message)
+                error = e
+    finally:
+        connection.close()
+
+    if failed:
+        logger.warning("Sending %d of %d messages failed, retrying them", len(failed), len(messages))
+        countdown = get_exponential_backoff_interval(
+            factor=int(self.retry_backoff),
+            retries=self.request.retries,
+            maximum=self.retry_backoff_max,
+            full_jitter=self.retry_jitter,
+        )
+        raise self.retry(args=(failed,), exc=error, countdown=countdown)
+    return sent
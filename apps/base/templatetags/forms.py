@@ -1,20 +1,23 @@
-import json
-
 from django import template
-from django.forms.models import ModelChoiceIteratorValue
-from django.forms.renderers import TemplatesSetting
+from django.forms.renderers import get_default_renderer
 from django.utils.safestring import mark_safe
 
+from apps.base.hybrid_forms import render_field
+from apps.base.profiling import timed
+
 register = template.Library()
 
 
 @register.simple_tag
+@timed("hybrid_form")
 def hybrid_form(form):
-    renderer = TemplatesSetting()
+    # The default renderer is created once per process, so the templates compiled by its engine are reused.
+    renderer = get_default_renderer()
     return mark_safe(renderer.render("hybrid_forms/base_form.html", {"form": form}))
 
 
 @register.simple_tag
+@timed("hybrid_field")
 def hybrid_field(field):
     """
     WARNING: We're using mark_safe in this example for simplicity and also because the model is either using
@@ -22,32 +25,10 @@ def hybrid_field(field):
     used in a XSS attach. Please be mindful of [security][1] whenever using mark_safe(). Using [bleach][2] is also
     a good way to sanitize and clean user data.
 
+    The template and widget type of the field come from a render plan that is cached per widget class and template,
+    see `apps.base.hybrid_forms.get_field_plan`.
+
     [1]: https://docs.djangoproject.com/en/3.2/topics/security/
     [2]: https://github.com/mozilla/bleach
     """
-    field.vue_value = field.value() if field.value() is not None else ""
-    if field.widget_type == "radioselect":
-        if field.vue_value == "":
-            field.vue_value = "unknown"
-    elif field.widget_type == "select":
-        field.vue_value = str(field.vue_value)
-    elif field.widget_type == "selectmultiple":
-        field.vue_value = [str(v) for v in field.vue_value]
-    if isinstance(field.vue_value, str):
-        field.vue_value = json.dumps(field.vue_value)
-    choices = getattr(field.field.widget, "choices", None)
-    if choices is not None:
-        field.vue_options = mark_safe(
-            [{"value": str(v.value) if isinstance(v, ModelChoiceIteratorValue) else v, "name": n} for v, n in choices]
-        )
-    field.vue_errors = [str(e) for e in field.form.errors.get(field.name, [])]
-    field.required = field.field.required
-    field.vue_multiple = getattr(field.field.widget, "allow_multiple_selected", False)
-    field.hide_label = getattr(field, "hide_label", False)
-    # Update widget properties to work with vue_widget templates
-    widget = field.field.widget
-    widget.get_context = lambda name, value, attrs: {"field": field}
-    widget.template_name = widget.template_name.replace("django/forms/widgets", "hybrid_forms/widgets")
-    field.input_type = getattr(widget, "input_type", "")
-    field.help_text = field.help_text or ""
-    return mark_safe(field.as_widget())
+    return render_field(field)
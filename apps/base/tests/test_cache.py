@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+
+from redis_cache import RedisCache
+
+from apps.base.cache import StampedValue, TieredCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+_server = None
+
+
+class FakeRedisCache(RedisCache):
+    """
+    `redis_cache.RedisCache` on the in-process redis server of the current test.
+    """
+
+    def create_client(self, server):
+        client = fakeredis.FakeRedis(server=_server)
+        client.connection_pool.connection_identifier = server
+        return client
+
+
+def wait_for(condition, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@skipIf(fakeredis is None, "fakeredis is not installed")
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        global _server
+        _server = fakeredis.FakeServer()
+
+    def make_cache(self, **options) -> TieredCache:
+        """
+        Returns a cache as another process would have it, with its own local tier and invalidation listener.
+        """
+        remote = {"BACKEND": "apps.base.tests.test_cache.FakeRedisCache", "LOCATION": "redis:6379"}
+        cache = TieredCache("", {"OPTIONS": {"REMOTE": remote, "LOCAL_TIMEOUT": 60, **options}})
+        cache._ensure_process()
+        return cache
+
+    def wait_for_listeners(self, cache: TieredCache, count: int) -> None:
+        # Publishing returns the number of subscribers that got the message.
+        message = json.dumps({"sender": "test", "keys": []})
+        client = cache.remote.get_master_client()
+        self.assertTrue(wait_for(lambda: client.publish(cache.channel, message) == count))
+
+    def test_writes_invalidate_other_processes(self):
+        first, second = self.make_cache(), self.make_cache()
+        self.wait_for_listeners(first, 2)
+        first.set("key", 1)
+        self.assertEqual(second.get("key"), 1)
+
+        first.set("key", 2)
+        self.assertTrue(wait_for(lambda: second.get("key") == 2))
+        first.delete("key")
+        self.assertTrue(wait_for(lambda: second.get("key") is None))
+
+    def test_local_copies_are_kept_without_pubsub(self):
+        first, second = self.make_cache(INVALIDATION="ttl"), self.make_cache(INVALIDATION="ttl")
+        first.set("key", 1)
+        self.assertEqual(second.get("key"), 1)
+        first.set("key", 2)
+        self.assertEqual(second.get("key"), 1)
+
+    def test_expiring_values_are_recomputed_early(self):
+        cache = self.make_cache()
+        # Took 10 seconds to compute and expires in 5.
+        cache.set("key", StampedValue("old", 10, time.time() + 5), 60)
+        with mock.patch("apps.base.cache.random.random", return_value=0):
+            self.assertEqual(cache.get_or_set("key", lambda: "new", 60), "old")
+        with mock.patch("apps.base.cache.random.random", return_value=0.99):
+            self.assertEqual(cache.get_or_set("key", lambda: "new", 60), "new")
+        self.assertEqual(cache.get("key"), "new")
+
+    def test_expiring_value_is_served_while_another_process_recomputes(self):
+        cache = self.make_cache()
+        cache.set("key", StampedValue("old", 10, time.time() + 5), 60)
+        cache.remote.add("key:lock", "other", 10)
+        with mock.patch("apps.base.cache.random.random", return_value=0.99):
+            self.assertEqual(cache.get_or_set("key", lambda: "new", 60), "old")
+
+    def test_lock_is_released_after_computing(self):
+        cache = self.make_cache()
+        self.assertEqual(cache.get_or_set("key", lambda: "value", 60), "value")
+        self.assertIsNone(cache.remote.get("key:lock"))
+
+    def test_lock_taken_over_by_another_process_is_kept(self):
+        cache = self.make_cache()
+
+        def compute():
+            # The lock expired during a slow compute and another process took it.
+            cache.remote.set("key:lock", "other", 10)
+            return "value"
+
+        self.assertEqual(cache.get_or_set("key", compute, 60), "value")
+        self.assertEqual(cache.remote.get("key:lock"), "other")
+
+    def test_waits_for_the_process_holding_the_lock(self):
+        cache, other = self.make_cache(), self.make_cache()
+        other.remote.add("key:lock", "other", 10)
+        threading.Timer(0.1, lambda: other.set("key", StampedValue("theirs", 1, None))).start()
+        compute = mock.Mock(return_value="ours")
+        self.assertEqual(cache.get_or_set("key", compute, 60), "theirs")
+        compute.assert_not_called()
+
+    def test_computes_without_the_lock_after_waiting(self):
+        cache = self.make_cache(LOCK_TIMEOUT=0.1)
+        cache.remote.add("key:lock", "other", 10)
+        self.assertEqual(cache.get_or_set("key", lambda: "value", 60), "value")
+        self.assertEqual(cache.remote.get("key:lock"), "other")
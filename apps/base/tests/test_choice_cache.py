@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+
+from apps.base.choice_cache import get_options, get_versions
+from apps.recipes.models import RecipeType
+
+
+class ChoiceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_options_are_rebuilt_after_a_save(self):
+        RecipeType.objects.create(name="Soup")
+        with self.captureOnCommitCallbacks(execute=True):
+            get_options(RecipeType)
+            RecipeType.objects.create(name="Stew")
+        self.assertIn("Stew", [option["name"] for option in get_options(RecipeType)])
+
+    def test_version_is_bumped_on_commit(self):
+        version = get_versions(RecipeType)[0]
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                RecipeType.objects.create(name="Stew")
+                # A read before the commit must not see a new version it could cache the old options under.
+                self.assertEqual(get_versions(RecipeType)[0], version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_versions(RecipeType)[0], version)
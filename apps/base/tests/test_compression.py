@@ -0,0 +1,95 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.base.compression import IMMUTABLE_CACHE_CONTROL, compress, get_available_encodings, split_encoding
+from apps.base.views import serve_static
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STYLESHEET = b"body { background: url('../img/logo.png'); }\n" + b"/* padding */\n" * 40
+
+
+class CompressTests(SimpleTestCase):
+    def test_only_smaller_encodings_are_kept(self):
+        compressed = compress(STYLESHEET)
+        self.assertEqual(sorted(compressed), sorted(get_available_encodings()))
+        self.assertEqual(gzip.decompress(compressed["gzip"]), STYLESHEET)
+        if brotli is not None:
+            self.assertEqual(brotli.decompress(compressed["br"]), STYLESHEET)
+        self.assertEqual(compress(os.urandom(1000)), {})
+
+    def test_output_is_stable(self):
+        self.assertEqual(compress(STYLESHEET), compress(STYLESHEET))
+
+    def test_split_encoding(self):
+        self.assertEqual(split_encoding("css/site.css.br"), ("css/site.css", "br"))
+        self.assertEqual(split_encoding("css/site.css.gz"), ("css/site.css", "gzip"))
+        self.assertEqual(split_encoding("css/site.css"), ("css/site.css", None))
+
+
+class CompressedStaticFilesTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source_root)
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        for path, content in [("css/site.css", STYLESHEET), ("img/logo.png", b"logo"), ("js/small.js", b"1;")]:
+            os.makedirs(os.path.join(self.source_root, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(self.source_root, path), "wb") as f:
+                f.write(content)
+
+        settings = override_settings(
+            STATICFILES_STORAGE="apps.base.storage.CompressedManifestStaticFilesStorage",
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STATICFILES_DIRS=[self.source_root],
+            STATIC_ROOT=self.static_root,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command("collectstatic", interactive=False, verbosity=0, stdout=StringIO())
+        self.css_name = staticfiles_storage.stored_name("css/site.css")
+
+    def get(self, path: str, accept_encoding: str = ""):
+        request = RequestFactory().get(f"/public/static/{path}", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return serve_static(request, path)
+
+    def test_hashed_text_files_are_precompressed(self):
+        with open(os.path.join(self.static_root, self.css_name), "rb") as f:
+            content = f.read()
+        with open(os.path.join(self.static_root, self.css_name + ".gz"), "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        self.assertEqual(os.path.isfile(os.path.join(self.static_root, self.css_name + ".br")), brotli is not None)
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, "css/site.css.gz")))
+        small_name = staticfiles_storage.stored_name("js/small.js")
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, small_name + ".gz")))
+
+    def test_the_accepted_encoding_is_served(self):
+        response = self.get(self.css_name, "gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br" if brotli is not None else "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.get(self.css_name, "gzip, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content))[:4], b"body")
+
+        response = self.get(self.css_name)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_unhashed_names_are_not_cached_for_long(self):
+        response = self.get("css/site.css", "gzip")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertNotEqual(response.get("Cache-Control"), IMMUTABLE_CACHE_CONTROL)
@@ -0,0 +1,16 @@
+from django.test import SimpleTestCase
+
+from apps.base.utils.env.env_urls import broker_url, cache_url
+
+
+class BrokerUrlTests(SimpleTestCase):
+    def test_cache_options_are_removed(self):
+        url = "redis://:secret@redis:6379/1?tiered=true&lock_timeout=3&max_connections=10"
+        self.assertEqual(cache_url(url)["BACKEND"], "apps.base.cache.TieredCache")
+        self.assertEqual(broker_url(url), "redis://:secret@redis:6379/1")
+
+    def test_other_options_are_kept(self):
+        self.assertEqual(
+            broker_url("rediss://redis:6380/0?tiered=true&ssl_cert_reqs=required"),
+            "rediss://redis:6380/0?ssl_cert_reqs=required",
+        )
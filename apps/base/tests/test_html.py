@@ -0,0 +1,85 @@
+from django.test import SimpleTestCase
+from django.utils.html import strip_tags as django_strip_tags
+from django.utils.translation import gettext_lazy
+
+from apps.base.management.commands.benchmark_strip_tags import SAMPLES, fuzz_corpus
+from apps.base.utils.html import _strip_markup, strip_tags
+
+CASES = [
+    # Malformed tags
+    "<b>bold",
+    "bold</b>",
+    "<b <i>text</i>",
+    "<<b>>text<</b>>",
+    "<p class='a>text</p>",
+    '<p class="a>text</p>',
+    "<a href=x title=>link</a>",
+    "<img src=x onerror=alert(1)>",
+    "<br/><br />< br><br/ >",
+    "a < b > c",
+    "1 <2> 3",
+    "<1>text</1>",
+    "<p\ttitle='x'\n>text</p\n>",
+    "<P>upper</P>",
+    # Nested tags
+    "<div><p>Mix <b>the <i>eggs</i></b></p></div>",
+    "<ul><li>One<li>Two</ul>",
+    "<<script>script>alert(1)<</script>/script>",
+    "<scr<script>ipt>alert(1)</script>",
+    "<style>p { color: red; }</style>Text",
+    "<textarea><b>kept</b></textarea>",
+    "<title>Toast</title>Text",
+    # Entities
+    "Eggs &amp; flour",
+    "&lt;b&gt;not a tag&lt;/b&gt;",
+    "<b>&nbsp;</b>&nbsp",
+    "&#39;quoted&#39; &#x27;hex&#x27; &unknown;",
+    "<b>Fish &amp; chips</b>",
+    # Comments, declarations and processing instructions
+    "<!-- comment -->Text",
+    "<!-- unclosed comment",
+    "Text <!-- unclosed <b>bold</b>",
+    "<!--> odd -->Text",
+    "<!---->Text",
+    "<![CDATA[x]]>Text",
+    "<!DOCTYPE html><p>Text</p>",
+    "<?php echo 1; ?>Text",
+    "<!",
+    "<?",
+    "</",
+    "<",
+    ">",
+    "",
+]
+
+
+class StripTagsTests(SimpleTestCase):
+    def assertStripsLikeDjango(self, value: str):
+        expected = django_strip_tags(value)
+        _strip_markup.cache_clear()
+        self.assertEqual(strip_tags(value), expected, value)
+        # Again from the memoized result, and through the markup path even when the fast path applies.
+        self.assertEqual(strip_tags(value), expected, value)
+        self.assertEqual(_strip_markup(value), expected, value)
+
+    def test_cases(self):
+        for value in CASES:
+            with self.subTest(value=value):
+                self.assertStripsLikeDjango(value)
+
+    def test_samples(self):
+        for value in SAMPLES.values():
+            self.assertStripsLikeDjango(value)
+            self.assertStripsLikeDjango(value * 50)
+
+    def test_fuzzed_values(self):
+        for value in fuzz_corpus(2_000, seed=0) + fuzz_corpus(2_000, seed=1):
+            self.assertStripsLikeDjango(value)
+
+    def test_plain_text_is_returned_as_is(self):
+        for value in ["Whisk the eggs", "1 < 2", "2 > 1", "a <-> b", "x < 3 and y > 4"]:
+            self.assertEqual(strip_tags(value), value)
+
+    def test_lazy_and_non_string_values(self):
+        self.assertEqual(strip_tags(gettext_lazy("<b>Recipes</b>")), "Recipes")
+        self.assertEqual(strip_tags(42), "42")
@@ -0,0 +1,77 @@
+from typing import List
+
+from django import forms
+from django.test import TestCase
+
+from apps.base.hybrid_forms import clear_plan_cache, render_field
+from apps.base.management.commands.benchmark_hybrid_field import legacy_render_field
+from apps.recipes.forms import RecipeForm
+from apps.recipes.models import DietType, MealTime, RecipeType
+
+
+class VariableRecipeForm(RecipeForm):
+    """
+    Changes the label, choices and widgets of its fields per instance, which a plan cached per field name misses.
+    """
+
+    def __init__(self, *args, variant: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        if variant:
+            self.fields["name"].label = "Title"
+            self.fields["name"].help_text = "What the recipe is called"
+            self.fields["name"].widget = forms.TextInput(attrs={"type": "search"})
+            self.fields["instructions"].required = True
+            self.fields["recipe_type"].queryset = RecipeType.objects.filter(name="Breakfast")
+            self.fields["is_diet_friendly"].widget = forms.RadioSelect(choices=[("true", "Yes"), ("false", "No")])
+            self.fields["ingredients"].widget = forms.Select(choices=[("eggs", "Eggs"), ("flour", "Flour")])
+
+
+class RenderPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = RecipeType.objects.create(name="Breakfast")
+        RecipeType.objects.create(name="Dessert")
+        cls.meal_time = MealTime.objects.create(name="Brunch")
+        DietType.objects.create(name="Paleo")
+
+    def setUp(self):
+        clear_plan_cache()
+
+    def render(self, render, form_class=RecipeForm, **kwargs) -> List[str]:
+        return [str(render(field)) for field in form_class(**kwargs)]
+
+    def assertRendersLikeLegacy(self, form_class=RecipeForm, **kwargs):
+        # Each render builds its own form, as the legacy render patches the widgets.
+        self.assertEqual(
+            self.render(render_field, form_class, **kwargs), self.render(legacy_render_field, form_class, **kwargs)
+        )
+
+    def test_unbound_form(self):
+        self.assertRendersLikeLegacy()
+
+    def test_bound_form_with_errors(self):
+        data = {"name": "", "recipe_type": "0", "meal_times": ["a"], "is_diet_friendly": "maybe"}
+        self.assertTrue(RecipeForm(data=data).errors)
+        self.assertRendersLikeLegacy(data=data)
+
+    def test_bound_valid_form(self):
+        data = {
+            "name": "Pancakes",
+            "instructions": "Mix & fry <b>well</b>",
+            "recipe_type": str(self.breakfast.pk),
+            "meal_times": [str(self.meal_time.pk)],
+            "is_diet_friendly": "true",
+        }
+        self.assertEqual(RecipeForm(data=data).errors, {})
+        self.assertRendersLikeLegacy(data=data)
+
+    def test_changes_per_instance_are_rendered(self):
+        # Warms the cache with the plain form before rendering the variant.
+        self.assertRendersLikeLegacy(VariableRecipeForm)
+        self.assertRendersLikeLegacy(VariableRecipeForm, variant=True)
+        self.assertRendersLikeLegacy(VariableRecipeForm, data={}, variant=True)
+        self.assertRendersLikeLegacy(VariableRecipeForm)
+
+        html = self.render(render_field, VariableRecipeForm, variant=True)
+        self.assertIn("Title", html[0])
+        self.assertNotIn("Dessert", html[3])
@@ -0,0 +1,51 @@
+import base64
+
+from django.http import Http404
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from apps.base.pagination import CURSOR_AFTER, CURSOR_BEFORE, MAX_KEY, MIN_KEY, decode_cursor, encode_cursor
+from apps.recipes.models import Recipe
+
+
+def encode_raw(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+class DecodeCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        for direction, key in [
+            (CURSOR_AFTER, 1),
+            (CURSOR_BEFORE, 12345),
+            (CURSOR_AFTER, MAX_KEY),
+            (CURSOR_AFTER, MIN_KEY),
+        ]:
+            self.assertEqual(decode_cursor(encode_cursor(direction, key)), (direction, key))
+
+    def test_invalid_cursors(self):
+        for token in ["", "!!", encode_raw("a"), encode_raw("x:1"), encode_raw("a:one"), encode_raw("a:1.5")]:
+            with self.subTest(token=token), self.assertRaises(Http404):
+                decode_cursor(token)
+
+    def test_keys_outside_the_bigint_range(self):
+        for key in [MAX_KEY + 1, MIN_KEY - 1, 10**100]:
+            with self.subTest(key=key), self.assertRaises(Http404):
+                decode_cursor(encode_cursor(CURSOR_AFTER, key))
+
+
+class KeysetPaginationTests(TestCase):
+    url = reverse("recipes:list")
+
+    @classmethod
+    def setUpTestData(cls):
+        Recipe.objects.create(name="Pancakes")
+
+    def test_huge_cursor_is_not_found(self):
+        for direction in (CURSOR_AFTER, CURSOR_BEFORE):
+            response = self.client.get(self.url, {"cursor": encode_cursor(direction, 10**30)})
+            self.assertEqual(response.status_code, 404)
+
+    def test_largest_cursor_is_an_empty_page(self):
+        response = self.client.get(self.url, {"cursor": encode_cursor(CURSOR_AFTER, MAX_KEY)})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Pancakes")
@@ -0,0 +1,167 @@
+import time
+from unittest import mock, skipIf
+
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends.base import CreateError
+from django.test import TestCase, override_settings
+from django.utils.crypto import get_random_string
+
+from apps.accounts.models import User
+from apps.base import sessions
+from apps.base.sessions import SessionStore, is_signed_key
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+@skipIf(fakeredis is None, "fakeredis is not installed")
+@override_settings(SESSION_ENGINE="apps.base.sessions", SESSION_REDIS={"prefix": "session"})
+class RedisSessionTestCase(TestCase):
+    """
+    Runs the session engine on an in-process redis server.
+    """
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        patcher = mock.patch.object(sessions, "_client", self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(SESSION_ANONYMOUS_SIGNED_COOKIE=False)
+class SessionStoreTests(RedisSessionTestCase):
+    def stored_keys(self):
+        return sorted(key.decode() for key in self.redis.keys())
+
+    def test_create_sets_a_new_key(self):
+        session = SessionStore()
+        session.create()
+        self.assertFalse(is_signed_key(session.session_key))
+        self.assertEqual(self.stored_keys(), [f"session:{session.session_key}"])
+        self.assertGreater(self.redis.ttl(f"session:{session.session_key}"), 0)
+        self.assertTrue(session.exists(session.session_key))
+
+    def test_create_picks_another_key_when_the_key_exists(self):
+        self.redis.set("session:" + "a" * 32, b"taken")
+        session = SessionStore()
+        session["cart"] = [1]
+        with mock.patch.object(SessionStore, "_get_new_session_key", side_effect=["a" * 32, "b" * 32]):
+            session.save()
+        self.assertEqual(session.session_key, "b" * 32)
+        self.assertEqual(self.redis.get("session:" + "a" * 32), b"taken")
+        self.assertEqual(SessionStore("b" * 32).load(), {"cart": [1]})
+
+    def test_must_create_fails_when_the_key_exists(self):
+        session = SessionStore()
+        session.create()
+        other = SessionStore(session.session_key)
+        other["cart"] = [1]
+        with self.assertRaises(CreateError):
+            other.save(must_create=True)
+        self.assertEqual(SessionStore(session.session_key).load(), {})
+
+    def test_unmodified_session_is_not_written(self):
+        session = SessionStore()
+        session["cart"] = [1]
+        session.save()
+
+        session = SessionStore(session.session_key)
+        self.assertEqual(session["cart"], [1])
+        with mock.patch.object(self.redis, "set", wraps=self.redis.set) as set_, mock.patch.object(
+            self.redis, "expire", wraps=self.redis.expire
+        ) as expire:
+            session.save()
+            set_.assert_not_called()
+            expire.assert_called_once()
+
+            session["cart"] = [1, 2]
+            session.save()
+            set_.assert_called_once()
+        self.assertEqual(SessionStore(session.session_key).load(), {"cart": [1, 2]})
+
+    def test_unknown_key_loads_an_empty_session(self):
+        session = SessionStore("x" * 32)
+        self.assertEqual(session.load(), {})
+        self.assertIsNone(session.session_key)
+
+    def test_flush_deletes_the_stored_session(self):
+        session = SessionStore()
+        session["cart"] = [1]
+        session.save()
+        session_key = session.session_key
+        session.flush()
+        self.assertIsNone(session.session_key)
+        self.assertEqual(self.stored_keys(), [])
+        self.assertFalse(session.exists(session_key))
+
+    def test_logout_deletes_the_stored_session(self):
+        user = User.objects.create_user("cook", "cook@example.com", "secret")
+        self.client.force_login(user)
+        session_key = self.client.cookies["sessionid"].value
+        self.assertEqual(self.stored_keys(), [f"session:{session_key}"])
+        self.assertEqual(SessionStore(session_key).load()[SESSION_KEY], str(user.pk))
+
+        self.client.logout()
+        self.assertEqual(self.stored_keys(), [])
+
+
+@override_settings(SESSION_ANONYMOUS_SIGNED_COOKIE=True)
+class SignedCookieSessionTests(RedisSessionTestCase):
+    def save_anonymous(self, **data) -> str:
+        session = SessionStore()
+        session.update(data)
+        session.save()
+        return session.session_key
+
+    def test_anonymous_sessions_are_kept_in_the_cookie(self):
+        session_key = self.save_anonymous(cart=[1])
+        self.assertTrue(is_signed_key(session_key))
+        with mock.patch.object(self.redis, "get") as get:
+            self.assertEqual(SessionStore(session_key).load(), {"cart": [1]})
+        get.assert_not_called()
+        self.assertFalse(SessionStore().exists(session_key))
+        self.assertEqual(self.redis.keys(), [])
+
+    def test_tampered_cookie_loads_an_empty_session(self):
+        session_key = self.save_anonymous(cart=[1])
+        tampered = session_key[:-1] + ("a" if session_key[-1] != "a" else "b")
+        session = SessionStore(tampered)
+        self.assertEqual(session.load(), {})
+        self.assertIsNone(session.session_key)
+
+    def test_expired_cookie_loads_an_empty_session(self):
+        session = SessionStore()
+        age = session.get_session_cookie_age()
+        with mock.patch("time.time", return_value=time.time() - age - 10):
+            session_key = self.save_anonymous(cart=[1])
+        session = SessionStore(session_key)
+        self.assertEqual(session.load(), {})
+        self.assertIsNone(session.session_key)
+
+    def test_oversized_session_is_stored(self):
+        # Random data so the cookie can't be compressed under the size limit.
+        session_key = self.save_anonymous(notes=get_random_string(6_000))
+        self.assertFalse(is_signed_key(session_key))
+        self.assertEqual(self.redis.keys(), [f"session:{session_key}".encode()])
+
+    def test_login_moves_the_session_to_redis_and_logout_deletes_it(self):
+        self.client.cookies["sessionid"] = self.save_anonymous(cart=[1])
+        user = User.objects.create_user("cook", "cook@example.com", "secret")
+        self.client.force_login(user)
+        session_key = self.client.cookies["sessionid"].value
+        self.assertFalse(is_signed_key(session_key))
+        self.assertEqual(self.redis.keys(), [f"session:{session_key}".encode()])
+        self.assertEqual(SessionStore(session_key).load()["cart"], [1])
+
+        self.client.logout()
+        self.assertEqual(self.redis.keys(), [])
+
+    def test_flush_of_a_signed_session_does_not_touch_redis(self):
+        session = SessionStore(self.save_anonymous(cart=[1]))
+        with mock.patch.object(self.redis, "delete") as delete:
+            session.flush()
+        delete.assert_not_called()
+        self.assertIsNone(session.session_key)
+        self.assertEqual(session.load(), {})
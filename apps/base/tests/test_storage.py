@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from typing import List
+from unittest import mock, skipIf
+
+from django.core.files.base import ContentFile, File
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from storages.backends.s3boto3 import S3Boto3Storage
+
+from apps.base.storage import StaticS3Storage
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+BUCKET = "static-bucket"
+s3_save = S3Boto3Storage._save
+STYLESHEET = b"body { background: url('../img/logo.png'); }\n" + b"/* padding */\n" * 40
+
+
+@skipIf(mock_aws is None, "moto is not installed")
+class StaticS3StorageTests(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        self.client = boto3.client("s3", region_name="us-east-1")
+        self.client.create_bucket(Bucket=BUCKET)
+
+        self.source_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source_root)
+        os.makedirs(os.path.join(self.source_root, "css"))
+        os.makedirs(os.path.join(self.source_root, "img"))
+        self.write("css/site.css", STYLESHEET)
+        self.write("img/logo.png", b"logo")
+        cache_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_root)
+        self.cache_path = os.path.join(cache_root, "upload-cache.json")
+
+        settings = override_settings(
+            STATICFILES_STORAGE="apps.base.storage.StaticS3Storage",
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            STATICFILES_DIRS=[self.source_root],
+            STATICFILES_UPLOAD_CACHE=self.cache_path,
+            STATICFILES_UPLOAD_WORKERS=2,
+            AWS_STORAGE_BUCKET_NAME=BUCKET,
+            AWS_S3_REGION_NAME="us-east-1",
+            AWS_ACCESS_KEY_ID="testing",
+            AWS_SECRET_ACCESS_KEY="testing",
+            AWS_DEFAULT_ACL=None,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write(self, path: str, content: bytes) -> str:
+        full_path = os.path.join(self.source_root, *path.split("/"))
+        with open(full_path, "wb") as f:
+            f.write(content)
+        return full_path
+
+    def list_bucket(self) -> List[str]:
+        return sorted(obj["Key"] for obj in self.client.list_objects_v2(Bucket=BUCKET).get("Contents", []))
+
+    def collectstatic(self) -> None:
+        call_command("collectstatic", interactive=False, verbosity=0, stdout=StringIO())
+
+    def test_only_changed_files_are_uploaded(self):
+        self.collectstatic()
+        keys = self.list_bucket()
+        self.assertIn("static/staticfiles.json", keys)
+        self.assertIn("static/css/site.css", keys)
+        self.assertIn("static/img/logo.png", keys)
+        hashed_css = [key for key in keys if key.startswith("static/css/site.") and key.endswith(".css")]
+        self.assertEqual(len(hashed_css), 2)
+        self.assertTrue(any(key.endswith(".css.gz") for key in keys))
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        with mock.patch.object(S3Boto3Storage, "_save", autospec=True, side_effect=s3_save) as save:
+            with mock.patch.object(S3Boto3Storage, "delete", autospec=True) as delete:
+                self.collectstatic()
+        self.assertEqual([call.args[1] for call in save.call_args_list], ["staticfiles.json"])
+        delete.assert_not_called()
+        self.assertEqual(self.list_bucket(), keys)
+
+        self.write("img/logo.png", b"new logo")
+        with mock.patch.object(S3Boto3Storage, "_save", autospec=True, side_effect=s3_save) as save:
+            self.collectstatic()
+        saved = [call.args[1] for call in save.call_args_list]
+        self.assertIn("img/logo.png", saved)
+        # The stylesheet references the logo by its hashed name, so it changes too.
+        self.assertTrue(any(name.startswith("css/site.") for name in saved))
+        self.assertEqual(saved[-1], "staticfiles.json")
+
+    def test_nothing_is_recorded_when_an_upload_fails(self):
+        def save(storage, name, content):
+            if name == "img/logo.png":
+                raise OSError("Upload failed")
+            return s3_save(storage, name, content)
+
+        with mock.patch.object(S3Boto3Storage, "_save", autospec=True, side_effect=save):
+            with self.assertRaises(OSError):
+                self.collectstatic()
+        self.assertNotIn("static/staticfiles.json", self.list_bucket())
+        self.assertFalse(os.path.exists(self.cache_path))
+
+        self.collectstatic()
+        self.assertIn("static/img/logo.png", self.list_bucket())
+        with open(self.cache_path) as f:
+            self.assertIn("img/logo.png", json.load(f)["files"])
+
+    def test_uploaded_content_is_dropped_from_memory(self):
+        storage = StaticS3Storage()
+        path = self.write("img/logo.png", b"logo")
+        with storage.batch():
+            storage.save("generated.txt", ContentFile(b"generated"))
+            with open(path, "rb") as f:
+                storage.save("img/logo.png", File(f))
+            for future in storage._uploads.values():
+                future.result()
+            self.assertNotIn("generated.txt", storage._contents)
+            # Local files are read again from the disk instead.
+            self.assertEqual(storage._contents["img/logo.png"], path)
+            with storage.open("generated.txt") as f:
+                self.assertEqual(f.read(), b"generated")
+            with storage.open("img/logo.png") as f:
+                self.assertEqual(f.read(), b"logo")
+        self.assertEqual(storage._contents, {})
+        self.assertEqual(self.list_bucket(), ["static/generated.txt", "static/img/logo.png"])
+
+    def test_the_last_content_saved_under_a_name_is_uploaded(self):
+        def save(storage, name, content):
+            if content.read() == b"first":
+                time.sleep(0.2)
+            content.seek(0)
+            return s3_save(storage, name, content)
+
+        storage = StaticS3Storage()
+        with mock.patch.object(S3Boto3Storage, "_save", autospec=True, side_effect=save):
+            with storage.batch():
+                storage.save("generated.txt", ContentFile(b"first"))
+                storage.save("generated.txt", ContentFile(b"second"))
+        body = self.client.get_object(Bucket=BUCKET, Key="static/generated.txt")["Body"].read()
+        self.assertEqual(body, b"second")
+        self.assertEqual(storage._uploaded["generated.txt"], hashlib.md5(b"second").hexdigest())
+
+    def test_deletes_are_held_until_the_end_of_the_batch(self):
+        self.client.put_object(Bucket=BUCKET, Key="static/old.txt", Body=b"old")
+        self.client.put_object(Bucket=BUCKET, Key="static/kept.txt", Body=b"kept")
+        storage = StaticS3Storage()
+        with storage.batch(refresh=True):
+            storage.delete("old.txt")
+            storage.delete("kept.txt")
+            self.assertFalse(storage.exists("old.txt"))
+            storage.save("kept.txt", ContentFile(b"kept"))
+            self.assertIn("static/old.txt", self.list_bucket())
+        self.assertEqual(self.list_bucket(), ["static/kept.txt"])
@@ -0,0 +1,128 @@
+from smtplib import SMTPServerDisconnected
+from typing import Any, List
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from celery import shared_task
+from celery.exceptions import Retry
+from kombu.exceptions import OperationalError
+
+from apps.base.tasks import CoalescedTask, enqueue_on_commit, get_pending_key, send_emails, serialize_email
+
+calls: List[List[Any]] = []
+
+
+@shared_task(base=CoalescedTask)
+def record(items: List[Any]) -> None:
+    calls.append(items)
+
+
+class FlakyEmailBackend(EmailBackend):
+    """
+    Fails once for each address in `failing`.
+    """
+
+    failing: List[str] = []
+
+    def send_messages(self, messages):
+        for message in messages:
+            for address in message.recipients():
+                if address in self.failing:
+                    self.failing.remove(address)
+                    raise SMTPServerDisconnected("Connection unexpectedly closed")
+        return super().send_messages(messages)
+
+
+class EnqueueOnCommitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        calls.clear()
+
+    def test_ids_are_sent_once_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(record, [2, 1])
+            enqueue_on_commit(record, [3, 2])
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [[1, 2, 3]])
+
+    def test_ids_waiting_in_the_queue_are_left_out(self):
+        cache.add(get_pending_key(record.name, 1), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(record, [1, 2])
+        self.assertEqual(calls, [[2]])
+        # A worker starting on the task releases its ids.
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(record, [2])
+        self.assertEqual(calls, [[2], [2]])
+
+    def test_ids_of_a_savepoint_that_rolls_back_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(record, [1])
+            try:
+                with transaction.atomic():
+                    enqueue_on_commit(record, [2])
+                    raise ValueError
+            except ValueError:
+                pass
+            with transaction.atomic():
+                enqueue_on_commit(record, [3])
+            enqueue_on_commit(record, [4])
+            with transaction.atomic():
+                enqueue_on_commit(record, [5])
+        self.assertEqual(calls, [[1, 4], [3], [5]])
+
+    def test_tasks_run_inline_when_the_broker_is_unavailable(self):
+        with mock.patch.object(record, "delay", side_effect=OperationalError("Broker unavailable")):
+            with self.assertLogs("apps.base.tasks", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    enqueue_on_commit(record, [1])
+        self.assertEqual(calls, [[1]])
+
+
+@override_settings(
+    EMAIL_BACKEND="apps.base.mail.CeleryEmailBackend",
+    EMAIL_DELIVERY_BACKEND="apps.base.tests.test_tasks.FlakyEmailBackend",
+    EMAIL_BATCH_SIZE=2,
+)
+class CeleryEmailBackendTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.failing = []
+
+    def send(self, *recipients: str) -> None:
+        messages = [mail.EmailMessage("Hi", "Hello", to=[recipient]) for recipient in recipients]
+        with self.captureOnCommitCallbacks(execute=True):
+            mail.get_connection().send_messages(messages)
+            self.assertEqual(mail.outbox, [])
+
+    def test_messages_are_sent_on_commit_in_batches(self):
+        with mock.patch.object(send_emails, "delay", wraps=send_emails.delay) as delay:
+            self.send("a@example.com", "b@example.com", "c@example.com")
+        self.assertEqual(delay.call_count, 2)
+        self.assertEqual(
+            [message.to for message in mail.outbox], [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+        )
+
+    def test_only_failed_messages_are_retried(self):
+        FlakyEmailBackend.failing = ["b@example.com"]
+        recipients = ["a@example.com", "b@example.com", "c@example.com"]
+        messages = [serialize_email(mail.EmailMessage("Hi", "Hello", to=[recipient])) for recipient in recipients]
+        with mock.patch.object(send_emails, "retry", side_effect=Retry) as retry:
+            with self.assertLogs("apps.base.tasks", "WARNING"), self.assertRaises(Retry):
+                send_emails(messages)
+        self.assertEqual(retry.call_args.kwargs["args"], ([messages[1]],))
+        self.assertIsInstance(retry.call_args.kwargs["exc"], SMTPServerDisconnected)
+        self.assertEqual([message.to for message in mail.outbox], [["a@example.com"], ["c@example.com"]])
+
+        self.assertEqual(send_emails(*retry.call_args.kwargs["args"]), 1)
+        self.assertEqual(mail.outbox[-1].to, ["b@example.com"])
+
+    def test_messages_are_sent_inline_when_the_broker_is_unavailable(self):
+        with mock.patch.object(send_emails, "delay", side_effect=OperationalError("Broker unavailable")):
+            with self.assertLogs("apps.base.tasks", "ERROR"):
+                self.send("a@example.com")
+        self.assertEqual([message.to for message in mail.outbox], [["a@example.com"]])
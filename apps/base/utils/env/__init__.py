@@ -13,3 +13,8 @@ def cache_url_parser(value):
 @env.parser_for("session_redis_url")
 def session_redis_url_parser(value):
     return env_urls.session_redis_url(value)
+
+
+@env.parser_for("broker_url")
+def broker_url_parser(value):
+    return env_urls.broker_url(value)
@@ -1,8 +1,22 @@
 import os
 from typing import Any, Dict
-from urllib.parse import ParseResult, parse_qs, urlparse
+from urllib.parse import ParseResult, parse_qs, urlencode, urlparse
 
 CACHE_URL_DEFAULT_KEY = "CACHE_URL"
+TRUE_VALUES = ("1", "true", "yes", "on")
+# The options of a cache URL that are read by `cache_url` and `session_redis_url` and not meant for the broker.
+CACHE_URL_OPTIONS = (
+    "tiered",
+    "local_max_entries",
+    "local_timeout",
+    "invalidation",
+    "lock_timeout",
+    "early_expiration_beta",
+    "max_connections",
+    "timeout",
+    "share_pool",
+    "session_prefix",
+)
 
 # TODO: switch to using lru_cache if you can figure out how to make it work with mypy
 _url_parse_cache: Dict[str, ParseResult] = {}
@@ -60,6 +74,20 @@ def cache_url(env_url: str = "") -> Dict[str, Any]:
         },
     }
 
+    # `?tiered=true` puts a per-process LRU in front of redis, see `apps.base.cache.TieredCache`.
+    if params.get("tiered", "").lower() in TRUE_VALUES:
+        rtn = {
+            "BACKEND": "apps.base.cache.TieredCache",
+            "OPTIONS": {
+                "REMOTE": rtn,
+                "LOCAL_MAX_ENTRIES": int(params.get("local_max_entries", 1000)),
+                "LOCAL_TIMEOUT": float(params.get("local_timeout", 5)),
+                "INVALIDATION": params.get("invalidation", "pubsub"),
+                "LOCK_TIMEOUT": float(params.get("lock_timeout", 10)),
+                "EARLY_EXPIRATION_BETA": float(params.get("early_expiration_beta", 1)),
+            },
+        }
+
     return rtn
 
 
@@ -76,6 +104,24 @@ def session_redis_url(env_url: str = "") -> Dict[str, Any]:
         "db": get_db(url.path),
         "password": url.password,
         "socket_timeout": params.get("timeout", 20),
+        "max_connections": int(params.get("max_connections", 50)),
+        "pool_timeout": int(params.get("timeout", 20)),
+        # `apps.base.sessions` uses the connection pool of this cache when it is on redis, `?share_pool=false` gives
+        # the sessions a pool of their own.
+        "cache_alias": "default" if params.get("share_pool", "true").lower() in TRUE_VALUES else None,
+        "prefix": params.get("session_prefix", ""),
     }
 
     return rtn
+
+
+def broker_url(env_url: str = "") -> str:
+    """
+    Returns the cache URL without the options of the cache backend and the sessions, which kombu doesn't accept.
+    """
+    if not env_url:
+        env_url = os.environ.get(env_url, CACHE_URL_DEFAULT_KEY)
+
+    url = parse_url(env_url)
+    params = {key: value for key, value in get_params(env_url).items() if key not in CACHE_URL_OPTIONS}
+    return url._replace(query=urlencode(params)).geturl()
@@ -0,0 +1,61 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+from django.utils.functional import keep_lazy_text
+from django.utils.html import strip_tags as django_strip_tags
+
+# Everything `html.parser.HTMLParser` could treat as markup starts with one of these.
+_markup_start_re = re.compile(r"<[a-zA-Z/!?]")
+
+_ws = r"[ \t\n\r\f]"
+_attr = rf"{_ws}+[a-zA-Z][-a-zA-Z0-9_:.]*(?:{_ws}*={_ws}*(?:\"[^\"<>]*\"|'[^'<>]*'|[^ \t\n\r\f\"'=<>`]+))?"
+_simple_tag_re = re.compile(rf"<(?:([a-zA-Z][a-zA-Z0-9]*)(?:{_attr})*{_ws}*/?|/([a-zA-Z][a-zA-Z0-9]*){_ws}*)>")
+
+# Elements whose content HTMLParser keeps as raw text, or may in newer Python versions.
+_raw_text_elements = frozenset(
+    ("script", "style", "textarea", "title", "xmp", "iframe", "noembed", "noframes", "noscript", "plaintext")
+)
+
+
+def _strip_simple_tags(value: str) -> Optional[str]:
+    """
+    Strips the tags from HTML that only uses plain start and end tags in a single pass. Returns None when the value
+    has anything HTMLParser treats specially (entities, comments, raw text elements, stray `<`) so the caller can fall
+    back to Django's `strip_tags`.
+    """
+    if "&" in value:
+        return None
+    names = []
+
+    def remove(match):
+        names.append((match.group(1) or match.group(2)).lower())
+        return ""
+
+    stripped = _simple_tag_re.sub(remove, value)
+    if "<" in stripped or not _raw_text_elements.isdisjoint(names):
+        return None
+    return stripped
+
+
+@lru_cache(maxsize=256)
+def _strip_markup(value: str) -> str:
+    stripped = _strip_simple_tags(value)
+    if stripped is None:
+        stripped = django_strip_tags(value)
+    return stripped
+
+
+@keep_lazy_text
+def strip_tags(value) -> str:
+    """
+    A drop in replacement for `django.utils.html.strip_tags` that returns the same output.
+
+    Values without anything that could be markup are returned as is without running the HTML parser. Values that only
+    use simple tags are stripped with a single regular expression pass, and the rest go through Django's
+    `strip_tags`. The results of both are memoized since the same values tend to be cleaned more than once.
+    """
+    value = str(value)
+    if "<" not in value or ">" not in value or _markup_start_re.search(value) is None:
+        return value
+    return _strip_markup(value)
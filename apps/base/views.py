@@ -1,13 +1,181 @@
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Any, Iterable, Optional, Set
+
+from django.conf import settings
 from django.contrib import messages
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
 from django.views import generic
+from django.views.static import serve
 
 from apps.accounts.models import User
+from apps.base.compression import ENCODINGS, IMMUTABLE_CACHE_CONTROL, is_hashed
+from apps.base.hybrid_forms import get_form_schema, get_schema_version, validate_form_fields
+from apps.base.profiling import get_recent_profiles
 
 from .forms import NameForm
 
 
+def get_accepted_encodings(header: str) -> Set[str]:
+    encodings = set()
+    for part in header.split(","):
+        encoding, _, params = part.partition(";")
+        quality = params.strip()
+        try:
+            if quality.startswith("q=") and float(quality[2:]) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def serve_static(request, path):
+    """
+    Serves the collected static files when they aren't on S3, picking the precompressed sibling written by
+    `PrecompressMixin` that the client accepts. Hashed names are cached for a year.
+    """
+    accepted = get_accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    for encoding, suffix in ENCODINGS.items():
+        if encoding in accepted and os.path.isfile(os.path.join(settings.STATIC_ROOT, path + suffix)):
+            break
+    else:
+        encoding, suffix = None, ""
+
+    response = serve(request, path + suffix, document_root=settings.STATIC_ROOT)
+    if encoding is not None:
+        response["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if is_hashed(path):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET and HEAD requests with a 304 when the client already has the current version of the page, without
+    rendering it. Views implement `get_etag_parts` and optionally `get_last_modified` with queries that are much cheaper
+    than rendering.
+
+    Pages of logged in users are only cached privately, and all pages vary on the cookie since they can show messages
+    and the user.
+    """
+
+    def get_etag_parts(self) -> Optional[Iterable[Any]]:
+        return None
+
+    def get_last_modified(self) -> Optional[int]:
+        return None
+
+    def get_etag(self) -> Optional[str]:
+        parts = self.get_etag_parts()
+        if parts is None:
+            return None
+        user = self.request.user  # type: ignore
+        parts = [user.pk if user.is_authenticated else "", *parts]
+        return quote_etag(hashlib.md5(":".join(str(part) for part in parts).encode()).hexdigest())
+
+    def dispatch(self, request, *args, **kwargs):
+        etag = last_modified = None
+        # Pages with pending messages have to be rendered so the messages are shown and used.
+        if request.method in ("GET", "HEAD") and not len(messages.get_messages(request)):
+            self.request, self.args, self.kwargs = request, args, kwargs
+            etag = self.get_etag()
+            last_modified = self.get_last_modified()
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return self.patch_response(not_modified)
+
+        response = super().dispatch(request, *args, **kwargs)  # type: ignore
+        if etag is not None and not response.has_header("ETag"):
+            response["ETag"] = etag
+        if last_modified is not None and not response.has_header("Last-Modified"):
+            response["Last-Modified"] = http_date(last_modified)
+        if etag is not None or last_modified is not None:
+            self.patch_response(response)
+        return response
+
+    def patch_response(self, response):
+        if self.request.user.is_authenticated:  # type: ignore
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+
+class FormSchemaView(generic.View):
+    """
+    Serves the JSON schema of `form_class` for the Vue form components. The schema version is part of the URL so the
+    response can be cached forever; requests for any other version are redirected to the current one.
+    """
+
+    form_class = None
+    url_name = ""
+    schema_max_age = 60 * 60 * 24 * 365
+
+    @classmethod
+    def get_schema(cls):
+        schema = get_form_schema(cls.form_class)
+        return schema, get_schema_version(schema)
+
+    @classmethod
+    def get_schema_url(cls) -> str:
+        return reverse(cls.url_name, kwargs={"version": cls.get_schema()[1]})
+
+    def get(self, request, version=None):
+        schema, current_version = self.get_schema()
+        if version != current_version:
+            response = redirect(self.url_name, version=current_version)
+            patch_cache_control(response, no_cache=True)
+            return response
+        response = JsonResponse({"version": current_version, **schema})
+        patch_cache_control(response, public=True, max_age=self.schema_max_age, immutable=True)
+        return response
+
+
+class FormValidationView(generic.View):
+    """
+    Validates some of the fields of `form_class` without rendering anything, so the Vue form components can show
+    errors as the user types. Takes a JSON body of `{"fields": {name: value}}` and answers with
+    `{"errors": {name: [messages]}}` for the fields that have errors.
+    """
+
+    form_class = None
+
+    def post(self, request, *args, **kwargs):
+        try:
+            fields = json.loads(request.body)["fields"]
+        except (ValueError, KeyError, TypeError):
+            return HttpResponseBadRequest("Expected a JSON object with a fields object.")
+        if not isinstance(fields, dict):
+            return HttpResponseBadRequest("Expected a JSON object with a fields object.")
+        return JsonResponse({"errors": validate_form_fields(self.form_class, fields)})
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class ProfilerView(generic.View):
+    """
+    Lists the request profiles kept by this process, newest first. `?over_budget=1` only lists the requests that went
+    over their budget.
+    """
+
+    def get(self, request, *args, **kwargs):
+        profiles = get_recent_profiles()[::-1]
+        if request.GET.get("over_budget"):
+            profiles = [summary for summary in profiles if summary["overruns"]]
+        return JsonResponse({"sample_rate": settings.PROFILER_SAMPLE_RATE, "profiles": profiles})
+
+
 class NameChange(generic.FormView):
     form_class = NameForm
     template_name = "account/name_change.html"
@@ -0,0 +1,85 @@
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.forms.renderers import get_default_renderer
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+HYBRID_WIDGET_DIR = "hybrid_forms/widgets"
+
+
+class TemplateTiming(NamedTuple):
+    name: str
+    duration: float
+    error: Optional[str]
+
+
+def get_template_dirs(include_third_party: bool = False) -> List[Path]:
+    """
+    Returns the template directories of the Django engine. Only the project's own are returned unless
+    `include_third_party` is set, third party apps ship templates, such as the admin's, that the site never renders.
+    """
+    engine = engines["django"]
+    dirs = [Path(d) for d in engine.dirs] + [Path(d) for d in get_app_template_dirs("templates")]
+    if not include_third_party:
+        base_dir = Path(settings.BASE_DIR).resolve()
+        dirs = [d for d in dirs if base_dir in d.resolve().parents]
+    return dirs
+
+
+def iter_template_names(include_third_party: bool = False) -> Iterator[str]:
+    """
+    Yields the name of every template under the template directories, hybrid form widgets first, in the order the
+    loaders would find them. Names found in more than one directory are only yielded once.
+    """
+    names = []
+    for template_dir in get_template_dirs(include_third_party):
+        for root, _dirs, files in os.walk(template_dir):
+            for filename in files:
+                if not filename.startswith("."):
+                    names.append(Path(root, filename).relative_to(template_dir).as_posix())
+    seen = set()
+    for name in sorted(names, key=lambda n: (not n.startswith(HYBRID_WIDGET_DIR), n)):
+        if name not in seen:
+            seen.add(name)
+            yield name
+
+
+def warm_templates(names: Optional[List[str]] = None) -> List[TemplateTiming]:
+    """
+    Compiles the templates through the engine, which keeps them when the cached loader is configured, and times each
+    one. Syntax errors, missing tag libraries and undecodable files are returned with the timing instead of raised
+    so every template is checked.
+    """
+    engine = engines["django"]
+    timings = []
+    for name in names if names is not None else iter_template_names():
+        start = time.perf_counter()
+        error = None
+        try:
+            engine.get_template(name)
+        except (TemplateSyntaxError, UnicodeDecodeError) as e:
+            # Unknown tag libraries list every registered library after the first line.
+            error = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+        timings.append(TemplateTiming(name, (time.perf_counter() - start) * 1000, error))
+    return timings
+
+
+def warm_worker() -> List[TemplateTiming]:
+    """
+    Prepares a worker before it takes requests: compiles the templates, creates the form renderer the hybrid form
+    tags share and populates the URL resolver. Raises `ImproperlyConfigured` when a template doesn't compile, so a
+    broken deploy fails at startup instead of on the first request to the page.
+    """
+    get_default_renderer()
+    get_resolver()._populate()
+    timings = warm_templates()
+    errors = [f"{timing.name}: {timing.error}" for timing in timings if timing.error]
+    if errors:
+        raise ImproperlyConfigured("Templates failed to compile:\n" + "\n".join(errors))
+    return timings
@@ -0,0 +1,61 @@
+from django.shortcuts import get_object_or_404
+
+from rest_framework import pagination, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from apps.recipes.models import Recipe
+from apps.recipes.serializers import FIELD_COLUMNS, FIELD_PREFETCH, FIELD_SELECT_RELATED, RecipeSerializer, parse_fields
+
+
+class RecipeCursorPagination(pagination.CursorPagination):
+    ordering = "pk"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class RecipeViewSet(viewsets.ModelViewSet):
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeSerializer
+    pagination_class = RecipeCursorPagination
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != "GET":
+            return queryset.select_related(*FIELD_SELECT_RELATED.values()).prefetch_related(*FIELD_PREFETCH.values())
+        fields = parse_fields(self.request.query_params.get("fields")) or list(RecipeSerializer.Meta.fields)
+        columns = {"id"}
+        for name in fields:
+            columns.update(FIELD_COLUMNS.get(name, ()))
+        select_related = [FIELD_SELECT_RELATED[name] for name in fields if name in FIELD_SELECT_RELATED]
+        prefetch = [FIELD_PREFETCH[name] for name in fields if name in FIELD_PREFETCH]
+        return queryset.select_related(*select_related).prefetch_related(*prefetch).only(*columns)
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["put", "patch"])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Updates several recipes at once from an array of objects that each include the recipe `id`.
+        """
+        if not isinstance(request.data, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+        try:
+            ids = [int(item["id"]) for item in request.data]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError({"non_field_errors": ["Every item needs an integer id."]})
+        recipes = self.get_queryset().in_bulk(ids)
+        instances = [recipes.get(pk) or get_object_or_404(Recipe, pk=pk) for pk in ids]
+        serializer = self.get_serializer(instances, data=request.data, many=True, partial=request.method == "PATCH")
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
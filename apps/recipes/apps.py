@@ -0,0 +1,22 @@
+from django.apps import AppConfig
+
+
+class RecipesConfig(AppConfig):
+    name = "apps.recipes"
+
+    def ready(self):
+        from apps.base.choice_cache import connect_choice_cache
+        from apps.recipes.facets import connect_facet_index
+        from apps.recipes.fragments import connect_row_cache
+        from apps.recipes.masks import connect_mask_sync
+        from apps.recipes.models import DietType, MealTime, Recipe, RecipeType
+        from apps.recipes.search import connect_search_index
+        from apps.recipes.signals import connect_cleared_recipes
+
+        for model in (RecipeType, MealTime, DietType, Recipe):
+            connect_choice_cache(model)
+        connect_cleared_recipes()
+        connect_row_cache()
+        connect_mask_sync()
+        connect_search_index()
+        connect_facet_index()
@@ -0,0 +1,142 @@
+import random
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client
+from django.urls import reverse
+
+from apps.base.benchmarking import Benchmark, dataset, expect, register
+from apps.base.utils.html import _strip_markup
+from apps.recipes.forms import RecipeForm
+from apps.recipes.masks import get_mask
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeSearchDocument, RecipeType
+from apps.recipes.search import build_documents
+
+BATCH_SIZE = 2_000
+WORDS = (
+    "chicken tomato basil garlic onion pepper salt butter flour sugar egg milk rice bean lemon thyme "
+    "oven pan bake whisk simmer chop stir roast grill serve"
+).split()
+MARKUP = ("<p>{}</p>", "<b>{}</b>", "{}<br/>", "<em>{}</em>", "{}")
+
+
+def words(rand: random.Random, count: int) -> str:
+    return " ".join(rand.choice(WORDS) for _ in range(count))
+
+
+def markup(rand: random.Random, sentences: int) -> str:
+    return "".join(rand.choice(MARKUP).format(words(rand, 8)) for _ in range(sentences))
+
+
+@dataset
+def seed_recipes(size: int, rand: random.Random) -> None:
+    """
+    Adds `size` recipes with the same shape as the real ones: up to two meal times and diet types each, and
+    instructions with some markup, which is stripped on save like the form does.
+    """
+    recipe_types = list(RecipeType.objects.values_list("pk", flat=True))
+    meal_times = list(MealTime.objects.values_list("pk", flat=True))
+    diet_types = list(DietType.objects.values_list("pk", flat=True))
+    instructions_field = Recipe._meta.get_field("instructions")
+    meal_times_through = Recipe.meal_times.through
+    diet_types_through = Recipe.diet_types.through
+
+    for start in range(1, size + 1, BATCH_SIZE):
+        recipes = []
+        meal_time_rows = []
+        diet_type_rows = []
+        for pk in range(start, min(start + BATCH_SIZE, size + 1)):
+            recipe_meal_times = rand.sample(meal_times, rand.randint(0, 2))
+            recipe_diet_types = rand.sample(diet_types, rand.randint(0, 2))
+            recipes.append(
+                Recipe(
+                    pk=pk,
+                    name=words(rand, 3).title(),
+                    instructions=instructions_field.clean(markup(rand, 5), None),
+                    ingredients=words(rand, 12),
+                    recipe_type_id=rand.choice(recipe_types + [None]),
+                    is_diet_friendly=rand.choice((True, False, None)),
+                    meal_times_mask=get_mask(recipe_meal_times),
+                    diet_types_mask=get_mask(recipe_diet_types),
+                )
+            )
+            meal_time_rows.extend(meal_times_through(recipe_id=pk, mealtime_id=value) for value in recipe_meal_times)
+            diet_type_rows.extend(diet_types_through(recipe_id=pk, diettype_id=value) for value in recipe_diet_types)
+        Recipe.objects.bulk_create(recipes)
+        meal_times_through.objects.bulk_create(meal_time_rows)
+        diet_types_through.objects.bulk_create(diet_type_rows)
+        RecipeSearchDocument.objects.bulk_create(build_documents([recipe.pk for recipe in recipes]))
+
+
+def get_form_data(rand: random.Random) -> dict:
+    return {
+        "name": words(rand, 3).title(),
+        "instructions": markup(rand, 5),
+        "ingredients": words(rand, 12),
+        "recipe_type": RecipeType.objects.values_list("pk", flat=True).first(),
+        "meal_times": list(MealTime.objects.values_list("pk", flat=True)[:2]),
+        "is_diet_friendly": "True",
+        "diet_types": list(DietType.objects.values_list("pk", flat=True)[:1]),
+    }
+
+
+@register
+def recipe_list(benchmark: Benchmark, size: int):
+    client = Client()
+    benchmark(lambda: expect(client.get(reverse("recipes:list")), 200))
+
+
+@register
+def recipe_list_cold(benchmark: Benchmark, size: int):
+    client = Client()
+    benchmark(lambda: expect(client.get(reverse("recipes:list")), 200), setup=cache.clear)
+
+
+@register
+def recipe_list_search(benchmark: Benchmark, size: int):
+    client = Client()
+    url = f"{reverse('recipes:list')}?q=chick+garl&meal_times=1&meal_times=2&is_diet_friendly=true"
+    benchmark(lambda: expect(client.get(url), 200))
+
+
+@register
+def recipe_create_get(benchmark: Benchmark, size: int):
+    client = Client()
+    benchmark(lambda: expect(client.get(reverse("recipes:create")), 200))
+
+
+@register
+def recipe_create_post(benchmark: Benchmark, size: int):
+    client = Client()
+    data = get_form_data(random.Random(0))
+    benchmark(lambda: expect(client.post(reverse("recipes:create"), data), 302))
+
+
+@register
+def recipe_update_get(benchmark: Benchmark, size: int):
+    client = Client()
+    url = reverse("recipes:update", args=(Recipe.objects.order_by("pk").values_list("pk", flat=True)[size // 2],))
+    benchmark(lambda: expect(client.get(url), 200))
+
+
+@register
+def recipe_update_post(benchmark: Benchmark, size: int):
+    client = Client()
+    url = reverse("recipes:update", args=(Recipe.objects.order_by("pk").values_list("pk", flat=True)[size // 2],))
+    data = get_form_data(random.Random(0))
+    benchmark(lambda: expect(client.post(url, data), 302))
+
+
+@register
+def hybrid_form_render(benchmark: Benchmark, size: int):
+    template = Template("{% load forms %}{% hybrid_form form %}")
+    recipe = Recipe.objects.order_by("pk")[size // 2]
+    benchmark(lambda: template.render(Context({"form": RecipeForm(instance=recipe)})))
+
+
+@register
+def recipe_field_cleaning(benchmark: Benchmark, size: int):
+    # The memoized results are cleared before every call so the stripping itself is timed.
+    field = Recipe._meta.get_field("instructions")
+    values = [markup(random.Random(n), 5) for n in range(100)]
+    benchmark(lambda: [field.clean(value, None) for value in values], setup=_strip_markup.cache_clear)
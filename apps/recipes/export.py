@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.db.models import QuerySet
+
+from apps.recipes.masks import get_pks
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeType
+
+EXPORT_COLUMNS = (
+    "id",
+    "name",
+    "instructions",
+    "ingredients",
+    "recipe_type",
+    "meal_times",
+    "is_diet_friendly",
+    "diet_types",
+)
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson", "jsonl": "application/x-ndjson"}
+DEFAULT_CHUNK_SIZE = 2_000
+CSV_SEPARATOR = "|"
+
+
+def get_names(model) -> Dict[int, str]:
+    return dict(model.objects.values_list("pk", "name"))
+
+
+def get_mask_names(names: Dict[int, str], mask: int) -> List[str]:
+    return [names[pk] for pk in get_pks(mask) if pk in names]
+
+
+def iter_recipe_chunks(
+    queryset: Optional[QuerySet] = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[dict]]:
+    """
+    Yields the recipes as lists of plain dicts, `chunk_size` rows at a time. Each chunk is read with its own keyset
+    query (`pk > last pk`) rather than one cursor, which MySQL would buffer whole on the client, and the meal times and
+    diet types come from the mask columns, so memory use only depends on the chunk size.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    recipe_types = get_names(RecipeType)
+    meal_times = get_names(MealTime)
+    diet_types = get_names(DietType)
+    rows = queryset.order_by("pk").values_list(
+        "pk",
+        "name",
+        "instructions",
+        "ingredients",
+        "recipe_type_id",
+        "meal_times_mask",
+        "is_diet_friendly",
+        "diet_types_mask",
+    )
+    last_pk = None
+    while True:
+        page = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+        yield [
+            {
+                "id": pk,
+                "name": name,
+                "instructions": instructions,
+                "ingredients": ingredients,
+                "recipe_type": recipe_types.get(recipe_type_id),
+                "meal_times": get_mask_names(meal_times, meal_times_mask),
+                "is_diet_friendly": is_diet_friendly,
+                "diet_types": get_mask_names(diet_types, diet_types_mask),
+            }
+            for (
+                pk,
+                name,
+                instructions,
+                ingredients,
+                recipe_type_id,
+                meal_times_mask,
+                is_diet_friendly,
+                diet_types_mask,
+            ) in chunk
+        ]
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return CSV_SEPARATOR.join(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else value
+
+
+def iter_csv(chunks: Iterable[List[dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    # The header goes out before the first query so the first byte doesn't wait on the database.
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row[column]) for column in EXPORT_COLUMNS] for row in chunk)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(chunks: Iterable[List[dict]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(json.dumps(row) + "\n" for row in chunk)
+
+
+def iter_gzip(data: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for part in data:
+        compressed = compressor.compress(part)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_recipes(
+    file_format: str = "csv",
+    gzip: bool = False,
+    queryset: Optional[QuerySet] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    chunks = iter_recipe_chunks(queryset, chunk_size)
+    text = iter_csv(chunks) if file_format == "csv" else iter_ndjson(chunks)
+    data = (part.encode("utf-8") for part in text)
+    return iter_gzip(data) if gzip else data
@@ -0,0 +1,252 @@
+import re
+import threading
+import time
+from itertools import takewhile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from apps.recipes.models import Recipe
+from apps.recipes.signals import get_changed_recipe_ids
+
+# The facets kept in memory, mapped to the column of their M2M through table.
+FACETS = {"meal_times": "mealtime_id", "diet_types": "diettype_id"}
+
+CACHE_KEY_PREFIX = "recipes:facets"
+SEQUENCE_KEY = f"{CACHE_KEY_PREFIX}:sequence"
+CHANGE_TIMEOUT = 60 * 60
+LOAD_CHUNK_SIZE = 10_000
+# A process that is further behind than this reloads the index instead of replaying the changes.
+MAX_REPLAY = 1_000
+# How long a logged change may be missing, because its process is still writing it, before the index is reloaded.
+MISSING_CHANGE_TIMEOUT = 5
+
+_nonzero_re = re.compile(rb"[^\x00]")
+_lock = threading.Lock()
+_index: Optional["FacetIndex"] = None
+
+if hasattr(int, "bit_count"):
+
+    def popcount(bitmap: int) -> int:
+        return bitmap.bit_count()
+
+else:
+
+    def popcount(bitmap: int) -> int:
+        return bin(bitmap).count("1")
+
+
+def to_bitmap(pks: Iterable[int]) -> int:
+    """
+    Returns the bitset of the primary keys as an integer, bit `pk` being set for each of them.
+    """
+    pks = list(pks)
+    if not pks:
+        return 0
+    # Setting the bits in a bytearray is linear, OR-ing them into an int would copy it for every key.
+    data = bytearray(max(pks) // 8 + 1)
+    for pk in pks:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, "little")
+
+
+def iter_pks(bitmap: int, after: Optional[int] = None, before: Optional[int] = None) -> Iterator[int]:
+    """
+    Yields the primary keys of a bitset in ascending order, or descending order when `before` is given. The bitset is
+    converted to bytes once and the empty bytes are skipped with a regular expression, since every operation on the
+    int itself costs as much as its size.
+    """
+    descending = before is not None
+    if descending:
+        bitmap &= (1 << before) - 1
+    elif after is not None:
+        bitmap = bitmap >> (after + 1) << (after + 1)
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    if descending:
+        data = data[::-1]
+    last = len(data) - 1
+    for match in _nonzero_re.finditer(data):
+        offset = match.start()
+        byte = data[offset]
+        if descending:
+            base = (last - offset) * 8
+            yield from (base + bit for bit in range(7, -1, -1) if byte >> bit & 1)
+        else:
+            base = offset * 8
+            yield from (base + bit for bit in range(8) if byte >> bit & 1)
+
+
+class FacetIndex:
+    """
+    A bitset of recipe ids per meal time and diet type. Filters are answered with integer AND/OR/NOT and counted with
+    a popcount, without touching the database. `universe` has every recipe id and is what NOT is relative to.
+    """
+
+    def __init__(self, universe: int, bitmaps: Dict[str, Dict[int, int]], sequence: int):
+        self.universe = universe
+        self.bitmaps = bitmaps
+        self.sequence = sequence
+        # When the first change after `sequence` was found missing.
+        self.missing_since: Optional[float] = None
+
+    @classmethod
+    def load(cls, sequence: int = 0) -> "FacetIndex":
+        universe = to_bitmap(Recipe.objects.values_list("pk", flat=True).iterator(chunk_size=LOAD_CHUNK_SIZE))
+        bitmaps = {}
+        for facet, column in FACETS.items():
+            groups: Dict[int, List[int]] = {}
+            rows = getattr(Recipe, facet).through.objects.values_list(column, "recipe_id")
+            for pk, recipe_id in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+                groups.setdefault(pk, []).append(recipe_id)
+            bitmaps[facet] = {pk: to_bitmap(recipe_ids) for pk, recipe_ids in groups.items()}
+        return cls(universe, bitmaps, sequence)
+
+    def refresh(self, recipe_ids: Iterable[int]) -> None:
+        """
+        Reloads the bits of the recipes from the database.
+        """
+        recipe_ids = list(set(recipe_ids))
+        if not recipe_ids:
+            return
+        clear = ~to_bitmap(recipe_ids)
+        existing = Recipe.objects.filter(pk__in=recipe_ids).values_list("pk", flat=True)
+        self.universe = (self.universe & clear) | to_bitmap(existing)
+        for facet, column in FACETS.items():
+            groups: Dict[int, List[int]] = {}
+            rows = getattr(Recipe, facet).through.objects.filter(recipe_id__in=recipe_ids)
+            for pk, recipe_id in rows.values_list(column, "recipe_id"):
+                groups.setdefault(pk, []).append(recipe_id)
+            bitmaps = self.bitmaps[facet]
+            for pk in set(bitmaps) | set(groups):
+                bitmap = (bitmaps.get(pk, 0) & clear) | to_bitmap(groups.get(pk, []))
+                if bitmap:
+                    bitmaps[pk] = bitmap
+                else:
+                    bitmaps.pop(pk, None)
+
+    def get(self, facet: str, pk: int) -> int:
+        return self.bitmaps[facet].get(pk, 0)
+
+    def any_of(self, facet: str, pks: Iterable[int]) -> int:
+        bitmap = 0
+        for pk in pks:
+            bitmap |= self.get(facet, pk)
+        return bitmap
+
+    def all_of(self, facet: str, pks: Iterable[int]) -> int:
+        bitmap = self.universe
+        for pk in pks:
+            bitmap &= self.get(facet, pk)
+        return bitmap
+
+    def none_of(self, facet: str, pks: Iterable[int]) -> int:
+        return self.universe & ~self.any_of(facet, pks)
+
+    def count(self, bitmap: int) -> int:
+        return popcount(bitmap)
+
+    def counts(self, facet: str, bitmap: Optional[int] = None) -> Dict[int, int]:
+        """
+        Returns the number of recipes in `bitmap`, or of every recipe, with each value of the facet.
+        """
+        if bitmap is None:
+            bitmap = self.universe
+        return {pk: popcount(values & bitmap) for pk, values in self.bitmaps[facet].items()}
+
+
+def get_sequence() -> int:
+    return cache.get(SEQUENCE_KEY, 0)
+
+
+def get_change_key(sequence: int) -> str:
+    return f"{CACHE_KEY_PREFIX}:change:{sequence}"
+
+
+def log_change(recipe_ids: Iterable[int]) -> None:
+    """
+    Records the recipes as changed so every process refreshes their bits on its next read. The sequence number is
+    reserved before the change is written, so readers can briefly see a sequence without its change.
+    """
+    cache.add(SEQUENCE_KEY, 0, None)
+    sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(get_change_key(sequence), list(set(recipe_ids)), CHANGE_TIMEOUT)
+
+
+def get_facet_index() -> FacetIndex:
+    """
+    Returns this process's facet index. It is loaded on first use and then caught up with the changes logged by every
+    process since. The changes are replayed up to the first missing one, which is retried on the next read, and the
+    index is reloaded when a change stays missing because it expired or its process died before writing it.
+    """
+    global _index
+    with _lock:
+        sequence = get_sequence()
+        if _index is not None and _index.sequence < sequence - MAX_REPLAY:
+            _index = None
+        elif _index is not None and _index.sequence < sequence:
+            numbers = range(_index.sequence + 1, sequence + 1)
+            changes = cache.get_many([get_change_key(n) for n in numbers])
+            found = list(takewhile(lambda n: get_change_key(n) in changes, numbers))
+            if found:
+                _index.refresh(recipe_id for n in found for recipe_id in changes[get_change_key(n)])
+                _index.sequence = found[-1]
+                _index.missing_since = None
+            if _index.sequence < sequence:
+                now = time.monotonic()
+                if _index.missing_since is None:
+                    _index.missing_since = now
+                elif now - _index.missing_since > MISSING_CHANGE_TIMEOUT:
+                    _index = None
+        elif _index is not None and _index.sequence > sequence:
+            # The cache was cleared.
+            _index = None
+        if _index is None:
+            _index = FacetIndex.load(sequence)
+        return _index
+
+
+def clear_facet_index() -> None:
+    global _index
+    with _lock:
+        _index = None
+
+
+def match_search(index: FacetIndex, meal_times: Tuple[int, ...] = (), diet_types: Tuple[int, ...] = ()) -> int:
+    """
+    Returns the bitset of the recipes with any of the meal times and all of the diet types, like `RecipeSearch`.
+    """
+    bitmap = index.all_of("diet_types", diet_types)
+    if meal_times:
+        bitmap &= index.any_of("meal_times", meal_times)
+    return bitmap
+
+
+def _on_commit_log_change(recipe_ids: Iterable[int]) -> None:
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        # Other processes read the database when they refresh, so the change is only logged once it's visible.
+        transaction.on_commit(lambda: log_change(recipe_ids))
+
+
+def _m2m_changed_handler(sender, instance, action, reverse, model, pk_set, **kwargs):
+    _on_commit_log_change(get_changed_recipe_ids(sender, instance, action, reverse, pk_set))
+
+
+def _post_save_handler(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _on_commit_log_change([instance.pk])
+
+
+def _post_delete_handler(sender, instance, **kwargs):
+    # The through rows are removed by the cascade without sending m2m_changed.
+    _on_commit_log_change([instance.pk])
+
+
+def connect_facet_index() -> None:
+    post_save.connect(_post_save_handler, sender=Recipe, dispatch_uid="facet_index:recipe")
+    post_delete.connect(_post_delete_handler, sender=Recipe, dispatch_uid="facet_index:recipe")
+    for through in (Recipe.meal_times.through, Recipe.diet_types.through):
+        uid = f"facet_index:{through._meta.label_lower}"
+        m2m_changed.connect(_m2m_changed_handler, sender=through, dispatch_uid=uid)
@@ -1,6 +1,7 @@
 from django import forms
 from django.forms import RadioSelect, Textarea
 
+from apps.base.choice_cache import CachedModelChoiceField, CachedModelMultipleChoiceField
 from apps.recipes.models import Recipe
 
 
@@ -21,4 +22,9 @@ class RecipeForm(forms.ModelForm):
             "is_diet_friendly",
             "diet_types",
         ]
+        field_classes = {
+            "recipe_type": CachedModelChoiceField,
+            "meal_times": CachedModelMultipleChoiceField,
+            "diet_types": CachedModelMultipleChoiceField,
+        }
         labels = {"is_diet_friendly": "Is this recipe diet friendly?", "diet_types": "What diet types are supported?"}
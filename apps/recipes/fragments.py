@@ -0,0 +1,74 @@
+from typing import Any, Iterable, List
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import SafeString, mark_safe
+
+from apps.base.choice_cache import get_versions
+from apps.recipes.masks import get_names
+from apps.recipes.models import MealTime, Recipe, RecipeType
+from apps.recipes.signals import get_changed_recipe_ids
+
+ROW_TEMPLATE = "recipes/recipe_list_row.html"
+ROW_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_row_queryset() -> QuerySet:
+    # Only reads the columns recipe_list.html shows, the text columns can be large. The meal times come from the mask
+    # column instead of the M2M table.
+    return Recipe.objects.select_related("recipe_type").only(
+        "id", "name", "updated_at", "meal_times_mask", "recipe_type__id", "recipe_type__name"
+    )
+
+
+def get_row_key(recipe: Recipe, lookup_versions: List[str]) -> str:
+    # The lookup versions make a rename of a recipe type or meal time invalidate every row that shows it.
+    version = int(recipe.updated_at.timestamp() * 1_000_000)
+    return f"recipes:row:{recipe.pk}:{version}:{':'.join(lookup_versions)}"
+
+
+def render_rows(recipes: Iterable[Recipe]) -> List[SafeString]:
+    """
+    Renders the `recipe_list.html` table rows of the recipes. The rows are read from the cache with one `get_many`
+    and only the misses are rendered. The meal times are read from the mask column of the row.
+    """
+    recipes = list(recipes)
+    lookup_versions = get_versions(RecipeType, MealTime)
+    keys = [get_row_key(recipe, lookup_versions) for recipe in recipes]
+    found = cache.get_many(keys)
+
+    misses = [recipe for recipe, key in zip(recipes, keys) if key not in found]
+    if misses:
+        for recipe in misses:
+            recipe.meal_time_names = get_names(MealTime, recipe.meal_times_mask)
+        rendered = {
+            get_row_key(recipe, lookup_versions): render_to_string(ROW_TEMPLATE, {"object": recipe})
+            for recipe in misses
+        }
+        cache.set_many(rendered, ROW_CACHE_TIMEOUT)
+        found.update(rendered)
+
+    return [mark_safe(found[key]) for key in keys]
+
+
+def touch_recipes(**filters: Any) -> None:
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def _m2m_changed_handler(sender, instance, action, reverse, model, pk_set, **kwargs):
+    recipe_ids = get_changed_recipe_ids(sender, instance, action, reverse, pk_set)
+    if recipe_ids:
+        touch_recipes(pk__in=recipe_ids)
+
+
+def _post_delete_handler(sender, instance, **kwargs):
+    cache.delete(get_row_key(instance, get_versions(RecipeType, MealTime)))
+
+
+def connect_row_cache() -> None:
+    for through in (Recipe.meal_times.through, Recipe.diet_types.through):
+        m2m_changed.connect(_m2m_changed_handler, sender=through, dispatch_uid=f"row_cache:{through._meta.label_lower}")
+    post_delete.connect(_post_delete_handler, sender=Recipe, dispatch_uid="row_cache:recipe")
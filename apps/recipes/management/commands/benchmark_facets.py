@@ -0,0 +1,146 @@
+import random
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
+
+from apps.recipes.facets import FacetIndex, iter_pks
+from apps.recipes.models import DietType, MealTime, Recipe
+
+BATCH_SIZE = 5_000
+
+
+class Rollback(Exception):
+    pass
+
+
+def get_pk(model, name):
+    return model.objects.get(name=name).pk
+
+
+class Command(BaseCommand):
+    help = "Compares the in-memory facet index with the equivalent ORM joins."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--create",
+            type=int,
+            default=0,
+            help="Number of synthetic recipes to add for the run. They are rolled back afterwards.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic recipes")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of runs per timed query")
+
+    def handle(self, *args, **options):
+        if options["create"] < 0:
+            raise CommandError("--create can't be negative")
+        try:
+            with transaction.atomic():
+                if options["create"]:
+                    self.create_recipes(options["create"], options["seed"])
+                self.benchmark(options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_recipes(self, count, seed):
+        rand = random.Random(seed)
+        meal_times = list(MealTime.objects.values_list("pk", flat=True))
+        diet_types = list(DietType.objects.values_list("pk", flat=True))
+        meal_times_through = Recipe.meal_times.through
+        diet_types_through = Recipe.diet_types.through
+        start = time.monotonic()
+        first_id = (Recipe.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+        for offset in range(0, count, BATCH_SIZE):
+            ids = range(first_id + offset, first_id + min(offset + BATCH_SIZE, count))
+            Recipe.objects.bulk_create(Recipe(pk=pk, name=f"Benchmark {pk}") for pk in ids)
+            meal_times_through.objects.bulk_create(
+                meal_times_through(recipe_id=pk, mealtime_id=value)
+                for pk in ids
+                for value in rand.sample(meal_times, rand.randint(0, 2))
+            )
+            diet_types_through.objects.bulk_create(
+                diet_types_through(recipe_id=pk, diettype_id=value)
+                for pk in ids
+                for value in rand.sample(diet_types, rand.randint(0, 2))
+            )
+        self.stdout.write(f"Created {count} recipes in {time.monotonic() - start:.1f}s")
+
+    def time(self, func, repeat):
+        result = func()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return result, (time.perf_counter() - start) / repeat
+
+    def benchmark(self, repeat):
+        dinner = get_pk(MealTime, MealTime.Choices.DINNER)
+        breakfast = get_pk(MealTime, MealTime.Choices.BREAKFAST)
+        brunch = get_pk(MealTime, MealTime.Choices.BRUNCH)
+        vegan = get_pk(DietType, DietType.Choices.VEGAN)
+        keto = get_pk(DietType, DietType.Choices.KETO)
+        paleo = get_pk(DietType, DietType.Choices.PALEO)
+        dairy_free = get_pk(DietType, DietType.Choices.DAIRY_FREE)
+        recipes = Recipe.objects.order_by()
+
+        start = time.perf_counter()
+        index = FacetIndex.load()
+        self.stdout.write(f"{index.count(index.universe)} recipes loaded in {time.perf_counter() - start:.2f}s")
+
+        queries = [
+            (
+                "Vegan AND Dinner",
+                lambda: recipes.filter(meal_times=dinner).filter(diet_types=vegan).count(),
+                lambda: index.count(index.get("diet_types", vegan) & index.get("meal_times", dinner)),
+            ),
+            (
+                "Keto AND Paleo",
+                lambda: recipes.filter(diet_types__in=[keto, paleo])
+                .values("pk")
+                .annotate(matches=Count("pk"))
+                .filter(matches=2)
+                .count(),
+                lambda: index.count(index.all_of("diet_types", [keto, paleo])),
+            ),
+            (
+                "(Breakfast OR Brunch) AND NOT Dairy Free",
+                lambda: recipes.filter(meal_times__in=[breakfast, brunch])
+                .exclude(diet_types=dairy_free)
+                .distinct()
+                .count(),
+                lambda: index.count(
+                    index.any_of("meal_times", [breakfast, brunch]) & index.none_of("diet_types", [dairy_free])
+                ),
+            ),
+            (
+                "Meal time counts of Vegan",
+                lambda: dict(
+                    MealTime.objects.annotate(recipes=Count("recipe", filter=Q(recipe__diet_types=vegan))).values_list(
+                        "pk", "recipes"
+                    )
+                ),
+                lambda: index.counts("meal_times", index.get("diet_types", vegan)),
+            ),
+            (
+                "First page of Vegan AND Dinner",
+                lambda: list(
+                    recipes.filter(meal_times=dinner)
+                    .filter(diet_types=vegan)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[:51]
+                ),
+                lambda: list(islice(iter_pks(index.get("diet_types", vegan) & index.get("meal_times", dinner)), 51)),
+            ),
+        ]
+
+        self.stdout.write(f"{'query':>42} {'orm':>10} {'bitmap':>10}")
+        for name, orm_query, bitmap_query in queries:
+            orm_result, orm_time = self.time(orm_query, repeat)
+            bitmap_result, bitmap_time = self.time(bitmap_query, repeat)
+            if isinstance(orm_result, dict):
+                bitmap_result = {pk: bitmap_result.get(pk, 0) for pk in orm_result}
+            if orm_result != bitmap_result:
+                raise CommandError(f"{name}: the ORM returned {orm_result} and the facet index {bitmap_result}")
+            self.stdout.write(f"{name:>42} {orm_time * 1000:>8.2f}ms {bitmap_time * 1000:>8.2f}ms")
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recipes.masks import find_stale_masks, sync_masks
+from apps.recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Checks the meal_times_mask and diet_types_mask columns of every recipe against the M2M tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rewrite the masks that don't match")
+        parser.add_argument("--batch-size", type=int, default=2_000, help="Number of recipes checked per batch")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        checked = stale_count = 0
+        last_id = 0
+        while True:
+            recipes = Recipe.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)
+            recipe_ids = list(recipes[:batch_size])
+            if not recipe_ids:
+                break
+            stale = find_stale_masks(recipe_ids)
+            for recipe_id, field, stored, expected in stale:
+                self.stderr.write(f"Recipe {recipe_id}: {field} mask is {stored}, expected {expected}")
+            if stale and options["fix"]:
+                for field in {field for _, field, _, _ in stale}:
+                    sync_masks(field, [recipe_id for recipe_id, name, _, _ in stale if name == field])
+            checked += len(recipe_ids)
+            stale_count += len(stale)
+            last_id = recipe_ids[-1]
+
+        message = f"Checked {checked} recipes, {stale_count} stale masks"
+        if stale_count and options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"{message} fixed"))
+        elif stale_count:
+            raise CommandError(f"{message}. Run with --fix to rewrite them.")
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.recipes.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_recipes
+
+
+class Command(BaseCommand):
+    help = "Exports every recipe as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv", help="Output format")
+        parser.add_argument("--gzip", action="store_true", help="Compress the output with gzip")
+        parser.add_argument("--output", default="-", help="File to write to, defaults to stdout")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read per query")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        output = options["output"]
+        start = time.monotonic()
+        written = 0
+        data = export_recipes(options["format"], gzip=options["gzip"], chunk_size=options["chunk_size"])
+        stream = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            for part in data:
+                stream.write(part)
+                written += len(part)
+        finally:
+            if output != "-":
+                stream.close()
+        elapsed = time.monotonic() - start
+        self.stderr.write(f"Wrote {written} bytes in {elapsed:.1f}s")
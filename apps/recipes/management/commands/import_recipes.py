@@ -0,0 +1,228 @@
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from apps.base.choice_cache import invalidate
+from apps.recipes.facets import log_change
+from apps.recipes.masks import get_mask
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeType
+from apps.recipes.search import index_recipes
+
+FORMATS = ("csv", "jsonl")
+ParsedRow = Tuple[Recipe, List[int], List[int]]
+TEXT_FIELDS = ("name", "instructions", "ingredients")
+
+
+def open_source(path: str):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def guess_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def read_rows(source, file_format: str) -> Iterator[Tuple[int, Dict[str, Any], Optional[str]]]:
+    """
+    Yields (line number, row, error) one at a time so files of any size can be imported in constant memory. Lines
+    that can't be read as a row have an error instead of a row.
+    """
+    if file_format == "csv":
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row, None
+    else:
+        for line_num, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_num, {}, f"Invalid JSON: {e}"
+                continue
+            if isinstance(row, dict):
+                yield line_num, row, None
+            else:
+                yield line_num, {}, f"Expected a JSON object, got {type(row).__name__}"
+
+
+class InsertedRowsMismatch(Exception):
+    pass
+
+
+def build_lookup(model) -> Dict[str, int]:
+    return {name.lower(): pk for pk, name in model.objects.values_list("pk", "name")}
+
+
+class Command(BaseCommand):
+    help = "Imports recipes from a CSV or JSONL file in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the file to import, optionally gzipped. Use - to read stdin.")
+        parser.add_argument("--format", choices=FORMATS, help="File format, guessed from the file extension by default")
+        parser.add_argument("--batch-size", type=int, default=1_000, help="Number of recipes per transaction")
+        parser.add_argument("--separator", default="|", help="Separator of the meal_times/diet_types CSV columns")
+        parser.add_argument("--progress-every", type=int, default=10_000, help="Rows between progress reports")
+        parser.add_argument("--strict", action="store_true", help="Stop at the first invalid row")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or guess_format(path)
+        self.batch_size = options["batch_size"]
+        self.separator = options["separator"]
+        self.strict = options["strict"]
+        if self.batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        self.recipe_types = build_lookup(RecipeType)
+        self.meal_times = build_lookup(MealTime)
+        self.diet_types = build_lookup(DietType)
+        self.model_fields = {name: Recipe._meta.get_field(name) for name in TEXT_FIELDS}
+        self.boolean_field = forms.NullBooleanField()
+
+        self.imported = self.errors = rows = 0
+        self.start = time.monotonic()
+        batch: List[ParsedRow] = []
+        progress_every = options["progress_every"]
+        try:
+            with open_source(path) as source:
+                for line_num, row, error in read_rows(source, file_format):
+                    rows += 1
+                    if error is not None:
+                        self.row_error(line_num, error)
+                        continue
+                    parsed = self.parse_row(line_num, row)
+                    if parsed is not None:
+                        batch.append(parsed)
+                    if len(batch) >= self.batch_size:
+                        self.write_batch(batch)
+                        batch = []
+                    if progress_every and rows % progress_every == 0:
+                        self.report(rows)
+                if batch:
+                    self.write_batch(batch)
+        except (OSError, csv.Error) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+        self.report(rows, final=True)
+
+    def report(self, rows: int, final: bool = False):
+        elapsed = time.monotonic() - self.start
+        rate = rows / elapsed if elapsed else 0
+        message = (
+            f"{rows} rows read, {self.imported} imported, {self.errors} invalid in {elapsed:.1f}s ({rate:.0f} rows/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(message) if final else message)
+
+    def row_error(self, line_num: int, message: str):
+        if self.strict:
+            raise CommandError(f"Line {line_num}: {message}")
+        self.errors += 1
+        self.stderr.write(f"Line {line_num}: {message}")
+
+    def split(self, value: Any) -> List[str]:
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = value.split(self.separator)
+        return [str(v).strip() for v in value if str(v).strip()]
+
+    def clean_text(self, field, value: Any) -> Optional[str]:
+        # Blank values are skipped like `Model.clean_fields` does, the rest get the same cleaning as the form,
+        # including the HTML stripping of the plain fields.
+        if field.blank and value in field.empty_values:
+            return None if field.null else ""
+        return field.clean(value, None)
+
+    def resolve(self, lookup: Dict[str, int], names: List[str], column: str) -> List[int]:
+        missing = [name for name in names if name.lower() not in lookup]
+        if missing:
+            raise ValidationError(f"Unknown {column}: {', '.join(missing)}")
+        return list(dict.fromkeys(lookup[name.lower()] for name in names))
+
+    def parse_row(self, line_num: int, row: Dict[str, Any]) -> Optional[ParsedRow]:
+        try:
+            values = {name: self.clean_text(field, row.get(name)) for name, field in self.model_fields.items()}
+            recipe_type_id = None
+            recipe_type = str(row.get("recipe_type") or "").strip()
+            if recipe_type:
+                recipe_type_id = self.resolve(self.recipe_types, [recipe_type], "recipe_type")[0]
+            meal_time_ids = self.resolve(self.meal_times, self.split(row.get("meal_times")), "meal_times")
+            diet_type_ids = self.resolve(self.diet_types, self.split(row.get("diet_types")), "diet_types")
+            is_diet_friendly = self.boolean_field.to_python(row.get("is_diet_friendly"))
+        except ValidationError as e:
+            self.row_error(line_num, "; ".join(e.messages))
+            return None
+        # The M2M rows are bulk inserted without m2m_changed, so the masks are set here.
+        recipe = Recipe(
+            recipe_type_id=recipe_type_id,
+            is_diet_friendly=is_diet_friendly,
+            meal_times_mask=get_mask(meal_time_ids),
+            diet_types_mask=get_mask(diet_type_ids),
+            **values,
+        )
+        return recipe, meal_time_ids, diet_type_ids
+
+    def create_recipes(self, batch: List[ParsedRow]):
+        recipes = [recipe for recipe, _, _ in batch]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+            return
+        try:
+            with transaction.atomic():
+                self.bulk_create_in_range(recipes)
+        except InsertedRowsMismatch:
+            # Another process inserted recipes at the same time, the rows were rolled back with the savepoint.
+            for recipe in recipes:
+                recipe.pk = None
+                recipe.save(force_insert=True)
+
+    def bulk_create_in_range(self, recipes: List[Recipe]):
+        """
+        Bulk inserts the recipes and reads back their primary keys, which backends without RETURNING (MySQL, SQLite)
+        don't set. A single insert takes consecutive ids unless other inserts run concurrently, which is detected by
+        comparing the names of the new rows.
+        """
+        last_pk = Recipe.objects.aggregate(last_pk=Max("pk"))["last_pk"] or 0
+        Recipe.objects.bulk_create(recipes)
+        rows = list(Recipe.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", "name"))
+        if [name for _, name in rows] != [recipe.name for recipe in recipes]:
+            raise InsertedRowsMismatch
+        for recipe, (pk, _) in zip(recipes, rows):
+            recipe.pk = pk
+            recipe._state.adding = False
+
+    def write_batch(self, batch: List[ParsedRow]):
+        meal_times_through = Recipe.meal_times.through
+        diet_types_through = Recipe.diet_types.through
+        with transaction.atomic():
+            self.create_recipes(batch)
+            meal_time_rows = []
+            diet_type_rows = []
+            for recipe, meal_time_ids, diet_type_ids in batch:
+                meal_time_rows.extend(meal_times_through(recipe_id=recipe.pk, mealtime_id=pk) for pk in meal_time_ids)
+                diet_type_rows.extend(diet_types_through(recipe_id=recipe.pk, diettype_id=pk) for pk in diet_type_ids)
+            meal_times_through.objects.bulk_create(meal_time_rows, batch_size=self.batch_size)
+            diet_types_through.objects.bulk_create(diet_type_rows, batch_size=self.batch_size)
+            # Bulk inserts send no signals, so the search documents, the facet index and the version behind the list
+            # ETag are updated here.
+            recipe_ids = [recipe.pk for recipe, _, _ in batch]
+            transaction.on_commit(lambda: index_recipes(recipe_ids))
+            transaction.on_commit(lambda: log_change(recipe_ids))
+            transaction.on_commit(lambda: invalidate(Recipe))
+        self.imported += len(batch)
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.base.choice_cache import invalidate
+from apps.recipes.models import Recipe, RecipeSearchDocument
+from apps.recipes.search import FTS_TABLE, build_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the recipe search index from scratch in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2_000, help="Number of recipes per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        start = time.monotonic()
+        indexed = 0
+        last_id = 0
+        while True:
+            recipes = Recipe.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)
+            batch = list(recipes[:batch_size])
+            if not batch:
+                break
+            indexed += self.write_batch(batch)
+            last_id = batch[-1]
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        invalidate(RecipeSearchDocument)
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} recipes in {elapsed:.1f}s"))
+
+    def write_batch(self, recipe_ids):
+        # The old documents are replaced in the same transaction, so searches never see the recipes missing. The
+        # documents of deleted recipes are already gone with the cascade.
+        with transaction.atomic():
+            RecipeSearchDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+            documents = RecipeSearchDocument.objects.bulk_create(build_documents(recipe_ids))
+        return len(documents)
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Tuple
+
+from django.db.models.signals import m2m_changed
+
+from apps.base.choice_cache import get_options
+from apps.recipes.models import MASK_BITS, Recipe
+from apps.recipes.signals import get_changed_recipe_ids
+
+# Maps each M2M field of `Recipe` to the column of its through table and the mask field that mirrors it.
+MASK_FIELDS = {"meal_times": ("mealtime_id", "meal_times_mask"), "diet_types": ("diettype_id", "diet_types_mask")}
+
+
+def get_bit(pk: int) -> int:
+    if not 0 < pk <= MASK_BITS:
+        raise ValueError(f"Primary key {pk} doesn't fit in a mask")
+    return 1 << (pk - 1)
+
+
+def get_mask(pks: Iterable[int]) -> int:
+    mask = 0
+    for pk in pks:
+        mask |= get_bit(pk)
+    return mask
+
+
+def get_pks(mask: int) -> List[int]:
+    return [bit + 1 for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+
+def get_names(model, mask: int) -> List[str]:
+    """
+    Returns the names of the lookup rows in the mask, in the same order as the M2M field lists them.
+    """
+    return [option["name"] for option in get_options(model) if mask & get_bit(int(option["value"]))]
+
+
+def get_masks(field: str, recipe_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Returns the mask of an M2M field of `Recipe` for each of the recipes that have any rows, read from the through
+    table.
+    """
+    column, _ = MASK_FIELDS[field]
+    through = getattr(Recipe, field).through
+    masks: Dict[int, int] = {}
+    for recipe_id, pk in through.objects.filter(recipe_id__in=recipe_ids).values_list("recipe_id", column):
+        masks[recipe_id] = masks.get(recipe_id, 0) | get_bit(pk)
+    return masks
+
+
+def sync_masks(field: str, recipe_ids: Iterable[int]) -> None:
+    """
+    Copies an M2M field of the recipes into its mask column. The recipes are updated with one query per distinct mask.
+    """
+    recipe_ids = list(set(recipe_ids))
+    if not recipe_ids:
+        return
+    masks = get_masks(field, recipe_ids)
+    groups: Dict[int, List[int]] = {}
+    for recipe_id in recipe_ids:
+        groups.setdefault(masks.get(recipe_id, 0), []).append(recipe_id)
+    _, mask_field = MASK_FIELDS[field]
+    for mask, ids in groups.items():
+        Recipe.objects.filter(pk__in=ids).update(**{mask_field: mask})
+
+
+def find_stale_masks(recipe_ids: List[int]) -> List[Tuple[int, str, int, int]]:
+    """
+    Returns (recipe id, field, stored mask, expected mask) for each mask of the recipes that doesn't match the M2M.
+    """
+    stale = []
+    mask_fields = [mask_field for _, mask_field in MASK_FIELDS.values()]
+    stored = {row[0]: row[1:] for row in Recipe.objects.filter(pk__in=recipe_ids).values_list("pk", *mask_fields)}
+    for index, field in enumerate(MASK_FIELDS):
+        expected = get_masks(field, recipe_ids)
+        for recipe_id, masks in stored.items():
+            if masks[index] != expected.get(recipe_id, 0):
+                stale.append((recipe_id, field, masks[index], expected.get(recipe_id, 0)))
+    return stale
+
+
+def _m2m_changed_handler(sender, instance, action, reverse, model, pk_set, **kwargs):
+    recipe_ids = get_changed_recipe_ids(sender, instance, action, reverse, pk_set)
+    if not recipe_ids:
+        return
+    field = next(name for name in MASK_FIELDS if getattr(Recipe, name).through is sender)
+    if reverse:
+        sync_masks(field, recipe_ids)
+        return
+    mask_field = MASK_FIELDS[field][1]
+    mask = get_masks(field, [instance.pk]).get(instance.pk, 0)
+    Recipe.objects.filter(pk=instance.pk).update(**{mask_field: mask})
+    # Keep the instance in step so a later save() doesn't write the old mask back.
+    setattr(instance, mask_field, mask)
+
+
+def connect_mask_sync() -> None:
+    for field in MASK_FIELDS:
+        through = getattr(Recipe, field).through
+        m2m_changed.connect(_m2m_changed_handler, sender=through, dispatch_uid=f"masks:{through._meta.label_lower}")
@@ -0,0 +1,80 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:37
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = "recipes_recipesearchdocument"
+FTS_TABLE = f"{TABLE}_fts"
+
+SQLITE_FORWARDS = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, body, content='{TABLE}', content_rowid='recipe_id')",
+    f"""CREATE TRIGGER {TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, body) VALUES (new.recipe_id, new.name, new.body);
+    END""",
+    f"""CREATE TRIGGER {TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, body) VALUES ('delete', old.recipe_id, old.name, old.body);
+    END""",
+    f"""CREATE TRIGGER {TABLE}_au AFTER UPDATE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, body) VALUES ('delete', old.recipe_id, old.name, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, name, body) VALUES (new.recipe_id, new.name, new.body);
+    END""",
+]
+SQLITE_BACKWARDS = [
+    f"DROP TRIGGER IF EXISTS {TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+FULL_TEXT_SQL = {
+    "sqlite": (SQLITE_FORWARDS, SQLITE_BACKWARDS),
+    "mysql": (
+        [f"CREATE FULLTEXT INDEX {TABLE}_fulltext ON {TABLE} (name, body)"],
+        [f"DROP INDEX {TABLE}_fulltext ON {TABLE}"],
+    ),
+    "postgresql": (
+        [f"CREATE INDEX {TABLE}_fulltext ON {TABLE} USING GIN (to_tsvector('simple', name || ' ' || body))"],
+        [f"DROP INDEX IF EXISTS {TABLE}_fulltext"],
+    ),
+}
+
+
+def run_full_text_sql(forwards):
+    def run(apps, schema_editor):
+        statements = FULL_TEXT_SQL.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for statement in statements[0 if forwards else 1]:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeSearchDocument",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="recipes.recipe",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("body", models.TextField(blank=True)),
+                ("recipe_type_id", models.IntegerField(db_index=True, null=True)),
+                ("meal_times_mask", models.BigIntegerField(default=0)),
+                ("diet_types_mask", models.BigIntegerField(default=0)),
+                ("is_diet_friendly", models.BooleanField(db_index=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(run_full_text_sql(True), run_full_text_sql(False)),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:54
+from django.db import migrations, models
+
+BATCH_SIZE = 2_000
+# The masks are signed 64 bit integers.
+MASK_BITS = 63
+
+
+def backfill_masks(apps, schema_editor):
+    """
+    Fills in the masks from the M2M tables in batches of recipes, with one UPDATE per distinct mask in a batch.
+    """
+    recipe_model = apps.get_model("recipes.Recipe")
+    fields = (("meal_times", "mealtime_id", "meal_times_mask"), ("diet_types", "diettype_id", "diet_types_mask"))
+    for model_name in ("MealTime", "DietType"):
+        if apps.get_model("recipes", model_name).objects.filter(pk__gt=MASK_BITS).exists():
+            raise RuntimeError(f"{model_name} has primary keys above {MASK_BITS}, which don't fit in the recipe masks")
+    last_id = 0
+    while True:
+        recipe_ids = list(
+            recipe_model.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:BATCH_SIZE]
+        )
+        if not recipe_ids:
+            return
+        for field, column, mask_field in fields:
+            through = getattr(recipe_model, field).through
+            masks = {}
+            for recipe_id, pk in through.objects.filter(recipe_id__in=recipe_ids).values_list("recipe_id", column):
+                masks[recipe_id] = masks.get(recipe_id, 0) | 1 << (pk - 1)
+            groups = {}
+            for recipe_id, mask in masks.items():
+                groups.setdefault(mask, []).append(recipe_id)
+            for mask, ids in groups.items():
+                recipe_model.objects.filter(pk__in=ids).update(**{mask_field: mask})
+        last_id = recipe_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="diet_types_mask",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="meal_times_mask",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:20
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_masks"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="diettype",
+            constraint=models.CheckConstraint(check=models.Q(pk__lte=63), name="recipes_diettype_pk_fits_in_mask"),
+        ),
+        migrations.AddConstraint(
+            model_name="mealtime",
+            constraint=models.CheckConstraint(check=models.Q(pk__lte=63), name="recipes_mealtime_pk_fits_in_mask"),
+        ),
+    ]
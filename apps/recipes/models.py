@@ -1,8 +1,12 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
 
 from apps.base.model_fields import PlainCharField, PlainTextField
 
+# The masks of `Recipe` are signed 64 bit integers, so lookup rows with a primary key above this can't be stored in them.
+MASK_BITS = 63
+
 
 class BaseListModel(models.Model):
     name = PlainCharField(max_length=100)
@@ -23,7 +27,26 @@ class RecipeType(BaseListModel):
         APPETIZER = "Appetizer"
 
 
-class MealTime(BaseListModel):
+class MaskedListModel(BaseListModel):
+    """
+    A lookup model that `Recipe` also stores as a bitmask of the primary keys, which limits it to `MASK_BITS` rows.
+    """
+
+    class Meta:
+        abstract = True
+        constraints = [
+            models.CheckConstraint(check=models.Q(pk__lte=MASK_BITS), name="%(app_label)s_%(class)s_pk_fits_in_mask")
+        ]
+
+    def clean(self):
+        super().clean()
+        if self._state.adding:
+            last_pk = type(self)._default_manager.aggregate(last_pk=models.Max("pk"))["last_pk"] or 0
+            if last_pk >= MASK_BITS:
+                raise ValidationError(f"No more than {MASK_BITS} {self._meta.verbose_name_plural} can be added.")
+
+
+class MealTime(MaskedListModel):
     class Choices(models.TextChoices):
         BREAKFAST = "Breakfast"
         BRUNCH = "Brunch"
@@ -31,7 +54,7 @@ class MealTime(BaseListModel):
         DINNER = "Dinner"
 
 
-class DietType(BaseListModel):
+class DietType(MaskedListModel):
     class Choices(models.TextChoices):
         KETO = "Keto"
         PALEO = "Paleo"
@@ -47,9 +70,33 @@ class Recipe(models.Model):
     meal_times = models.ManyToManyField("recipes.MealTime", blank=True)
     is_diet_friendly = models.BooleanField(null=True)
     diet_types = models.ManyToManyField("recipes.DietType", blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Copies of the M2M fields as bitmasks of the primary keys, kept in sync by `apps.recipes.masks`.
+    meal_times_mask = models.BigIntegerField(default=0, editable=False)
+    diet_types_mask = models.BigIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
     def get_absolute_url(self):
         return reverse("recipes:update", args=(self.pk,))
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    A denormalized copy of a recipe for search, kept up to date by `apps.recipes.search`. The meal times and diet
+    types are stored as bitmasks of their primary keys so filters and facet counts don't join the M2M tables.
+    """
+
+    recipe = models.OneToOneField(
+        "recipes.Recipe", primary_key=True, related_name="search_document", on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=100)
+    body = models.TextField(blank=True)
+    recipe_type_id = models.IntegerField(null=True, db_index=True)
+    meal_times_mask = models.BigIntegerField(default=0)
+    diet_types_mask = models.BigIntegerField(default=0)
+    is_diet_friendly = models.BooleanField(null=True, db_index=True)
+
+    def __str__(self):
+        return self.name
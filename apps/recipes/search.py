@@ -0,0 +1,262 @@
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Count, F, FloatField, Q, QuerySet, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import QueryDict
+
+from apps.base.cache import get_or_compute
+from apps.base.choice_cache import get_options, get_versions, invalidate
+from apps.base.tasks import enqueue_on_commit
+from apps.recipes.masks import MASK_BITS, get_bit, get_mask, get_masks
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeSearchDocument, RecipeType
+from apps.recipes.signals import get_changed_recipe_ids
+
+FACET_CACHE_TIMEOUT = 60 * 5
+FTS_TABLE = f"{RecipeSearchDocument._meta.db_table}_fts"
+# The largest value of an `AutoField`, larger ids raise an error in the query.
+MAX_PK = 2**31 - 1
+
+_token_re = re.compile(r"\w+")
+
+
+def parse_pk(value: str, max_pk: int) -> Optional[int]:
+    """
+    Returns the primary key in a query parameter, or None unless it's an integer from 1 to `max_pk`.
+    """
+    # `isdigit` also accepts characters such as "²" that `int` rejects.
+    if not value.isdecimal() or len(value) > len(str(max_pk)):
+        return None
+    pk = int(value)
+    return pk if 0 < pk <= max_pk else None
+
+
+def get_body(*values: Optional[str]) -> str:
+    return "\n".join(value for value in values if value)
+
+
+def build_documents(recipe_ids: List[int]) -> List[RecipeSearchDocument]:
+    """
+    Builds the search documents of the recipes with three queries, one for the recipes and one per M2M table.
+    """
+    meal_times = get_masks("meal_times", recipe_ids)
+    diet_types = get_masks("diet_types", recipe_ids)
+    rows = Recipe.objects.filter(pk__in=recipe_ids).values_list(
+        "pk", "name", "ingredients", "instructions", "recipe_type_id", "is_diet_friendly"
+    )
+    return [
+        RecipeSearchDocument(
+            recipe_id=pk,
+            name=name,
+            body=get_body(ingredients, instructions),
+            recipe_type_id=recipe_type_id,
+            meal_times_mask=meal_times.get(pk, 0),
+            diet_types_mask=diet_types.get(pk, 0),
+            is_diet_friendly=is_diet_friendly,
+        )
+        for pk, name, ingredients, instructions, recipe_type_id, is_diet_friendly in rows
+    ]
+
+
+def index_recipes(recipe_ids: Iterable[int]) -> None:
+    """
+    Replaces the search documents of the recipes. The rows are deleted and inserted rather than updated so the full
+    text index triggers see every change.
+    """
+    recipe_ids = list(set(recipe_ids))
+    if not recipe_ids:
+        return
+    documents = build_documents(recipe_ids)
+    with transaction.atomic():
+        RecipeSearchDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSearchDocument.objects.bulk_create(documents)
+    invalidate(RecipeSearchDocument)
+
+
+class RecipeSearch(NamedTuple):
+    """
+    The search of the recipe list. The meal times match recipes with any of them and the diet types match recipes
+    with all of them.
+    """
+
+    text: str = ""
+    recipe_type: Optional[int] = None
+    meal_times: Tuple[int, ...] = ()
+    diet_types: Tuple[int, ...] = ()
+    is_diet_friendly: Optional[bool] = None
+
+    @classmethod
+    def from_query_params(cls, params: QueryDict) -> "RecipeSearch":
+        def to_pks(values: List[str]) -> Tuple[int, ...]:
+            pks = (parse_pk(value, MASK_BITS) for value in values)
+            return tuple(sorted({pk for pk in pks if pk is not None}))
+
+        is_diet_friendly = {"true": True, "false": False}.get(params.get("is_diet_friendly", ""))
+        return cls(
+            text=" ".join(_token_re.findall(params.get("q", "")))[:200],
+            recipe_type=parse_pk(params.get("recipe_type", ""), MAX_PK),
+            meal_times=to_pks(params.getlist("meal_times")),
+            diet_types=to_pks(params.getlist("diet_types")),
+            is_diet_friendly=is_diet_friendly,
+        )
+
+    def __bool__(self):
+        return self != RecipeSearch()
+
+    def is_facet_only(self) -> bool:
+        """
+        Whether the search only filters on meal times and diet types, which the in-memory facet index can answer.
+        """
+        return bool(self) and self._replace(meal_times=(), diet_types=()) == RecipeSearch()
+
+
+def filter_text(queryset: QuerySet, text: str, prefix: str = "") -> QuerySet:
+    """
+    Filters the documents, or the recipes with `prefix="search_document__"`, on every word of `text` as a prefix
+    using the full text index of the database.
+    """
+    tokens = _token_re.findall(text)
+    if not tokens:
+        return queryset
+    vendor = connection.vendor
+    if vendor == "sqlite":
+        match = " ".join(f'"{token}"*' for token in tokens)
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        return queryset.filter(**{f"{prefix}recipe_id__in": RawSQL(sql, [match])})
+    if vendor in ("mysql", "postgresql"):
+        table = connection.ops.quote_name(RecipeSearchDocument._meta.db_table)
+        if vendor == "mysql":
+            sql = f"MATCH ({table}.name, {table}.body) AGAINST (%s IN BOOLEAN MODE)"
+            match = RawSQL(sql, [" ".join(f"+{token}*" for token in tokens)], output_field=FloatField())
+            lookup = {"search_match__gt": 0}
+        else:
+            sql = f"to_tsvector('simple', {table}.name || ' ' || {table}.body) @@ to_tsquery('simple', %s)"
+            match = RawSQL(sql, [" & ".join(f"{token}:*" for token in tokens)], output_field=BooleanField())
+            lookup = {"search_match": True}
+        # The document table has to be joined before the raw SQL can reference it.
+        queryset = queryset.filter(**{f"{prefix}name__isnull": False})
+        return queryset.alias(search_match=match).filter(**lookup)
+    for token in tokens:
+        queryset = queryset.filter(Q(**{f"{prefix}name__icontains": token}) | Q(**{f"{prefix}body__icontains": token}))
+    return queryset
+
+
+def filter_facets(queryset: QuerySet, search: RecipeSearch) -> QuerySet:
+    """
+    Filters the documents or the recipes, which both have the recipe type and the mask columns, on everything but the
+    text of the search.
+    """
+    if search.recipe_type is not None:
+        queryset = queryset.filter(recipe_type_id=search.recipe_type)
+    if search.is_diet_friendly is not None:
+        queryset = queryset.filter(is_diet_friendly=search.is_diet_friendly)
+    if search.meal_times:
+        mask = get_mask(search.meal_times)
+        queryset = queryset.alias(meal_times_match=F("meal_times_mask").bitand(mask)).exclude(meal_times_match=0)
+    if search.diet_types:
+        mask = get_mask(search.diet_types)
+        queryset = queryset.alias(diet_types_match=F("diet_types_mask").bitand(mask)).filter(diet_types_match=mask)
+    return queryset
+
+
+def filter_search(queryset: QuerySet, search: RecipeSearch) -> QuerySet:
+    return filter_facets(filter_text(queryset, search.text), search)
+
+
+def filter_recipes(queryset: QuerySet, search: RecipeSearch) -> QuerySet:
+    # Only the text search needs the document table, the rest is read from the recipe row.
+    if not search:
+        return queryset
+    return filter_facets(filter_text(queryset, search.text, prefix="search_document__"), search)
+
+
+def count_facets(search: RecipeSearch) -> Dict[str, Dict[str, int]]:
+    documents = filter_search(RecipeSearchDocument.objects.all(), search)
+    # Summing the masked bit and dividing by it counts the documents that have it, so every meal time and diet type
+    # is counted in the same scan.
+    bits: Dict[str, Tuple[str, str, int]] = {}
+    for column, model in (("meal_times", MealTime), ("diet_types", DietType)):
+        for option in get_options(model):
+            bits[f"{column}_{option['value']}"] = (column, option["value"], get_bit(int(option["value"])))
+    aggregates = {alias: Sum(F(f"{column}_mask").bitand(bit)) for alias, (column, _, bit) in bits.items()}
+    totals = documents.aggregate(
+        diet_friendly=Count("pk", filter=Q(is_diet_friendly=True)),
+        not_diet_friendly=Count("pk", filter=Q(is_diet_friendly=False)),
+        **aggregates,
+    )
+
+    counts: Dict[str, Dict[str, int]] = {
+        "meal_times": {},
+        "diet_types": {},
+        "is_diet_friendly": {"true": totals["diet_friendly"], "false": totals["not_diet_friendly"]},
+    }
+    for alias, (column, value, bit) in bits.items():
+        counts[column][value] = (totals[alias] or 0) // bit
+    rows = documents.order_by().values_list("recipe_type_id").annotate(count=Count("pk"))
+    counts["recipe_type"] = {str(recipe_type_id): count for recipe_type_id, count in rows if recipe_type_id}
+    return counts
+
+
+def get_facets(search: RecipeSearch) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns the options of each facet of the recipe list with the number of recipes matching the search that have
+    them. The counts are cached until the next change to the search index.
+    """
+    versions = get_versions(RecipeSearchDocument, RecipeType, MealTime, DietType)
+    search_key = hashlib.md5(repr(tuple(search)).encode()).hexdigest()
+    key = f"recipes:facets:{':'.join(versions)}:{search_key}"
+    counts = get_or_compute(key, lambda: count_facets(search), FACET_CACHE_TIMEOUT)
+
+    selected = {
+        "recipe_type": {str(search.recipe_type)},
+        "meal_times": {str(pk) for pk in search.meal_times},
+        "diet_types": {str(pk) for pk in search.diet_types},
+        "is_diet_friendly": {str(search.is_diet_friendly).lower()},
+    }
+    facets = {}
+    for column, model in (("recipe_type", RecipeType), ("meal_times", MealTime), ("diet_types", DietType)):
+        facets[column] = [
+            {**option, "count": counts[column].get(option["value"], 0), "selected": option["value"] in selected[column]}
+            for option in get_options(model)
+        ]
+    facets["is_diet_friendly"] = [
+        {
+            "value": value,
+            "name": name,
+            "count": counts["is_diet_friendly"][value],
+            "selected": value in selected["is_diet_friendly"],
+        }
+        for value, name in (("true", "Yes"), ("false", "No"))
+    ]
+    return facets
+
+
+def _index_on_commit(recipe_ids: Iterable[int]) -> None:
+    from apps.recipes.tasks import update_recipes
+
+    enqueue_on_commit(update_recipes, recipe_ids)
+
+
+def _post_save_handler(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _index_on_commit([instance.pk])
+
+
+def _post_delete_handler(sender, instance, using, **kwargs):
+    # The document itself is removed by the cascade. Bumped once that's visible, like `apps.base.choice_cache`.
+    transaction.on_commit(lambda: invalidate(RecipeSearchDocument), using=using)
+
+
+def _m2m_changed_handler(sender, instance, action, reverse, model, pk_set, **kwargs):
+    _index_on_commit(get_changed_recipe_ids(sender, instance, action, reverse, pk_set))
+
+
+def connect_search_index() -> None:
+    post_save.connect(_post_save_handler, sender=Recipe, dispatch_uid="search_index:recipe")
+    post_delete.connect(_post_delete_handler, sender=Recipe, dispatch_uid="search_index:recipe")
+    for through in (Recipe.meal_times.through, Recipe.diet_types.through):
+        uid = f"search_index:{through._meta.label_lower}"
+        m2m_changed.connect(_m2m_changed_handler, sender=through, dispatch_uid=uid)
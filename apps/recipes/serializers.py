@@ -0,0 +1,112 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+
+from rest_framework import serializers
+
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeType
+
+# The model columns and related lookups each serializer field needs, used to trim the SQL to the requested fields.
+FIELD_COLUMNS = {
+    "id": ("id",),
+    "name": ("name",),
+    "instructions": ("instructions",),
+    "ingredients": ("ingredients",),
+    "recipe_type": ("recipe_type", "recipe_type__id", "recipe_type__name"),
+    "is_diet_friendly": ("is_diet_friendly",),
+    "updated_at": ("updated_at",),
+}
+FIELD_SELECT_RELATED = {"recipe_type": "recipe_type"}
+FIELD_PREFETCH = {
+    "meal_times": models.Prefetch("meal_times", queryset=MealTime.objects.only("id", "name")),
+    "diet_types": models.Prefetch("diet_types", queryset=DietType.objects.only("id", "name")),
+}
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data: Iterable[Recipe]) -> List[Dict[str, Any]]:
+        # Read only lists are built straight from the instances instead of calling every field's to_representation.
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        readers = self.child.get_readers()
+        return [{name: reader(instance) for name, reader in readers} for instance in iterable]
+
+    def update(self, instances: List[Recipe], validated_data: List[Dict[str, Any]]) -> List[Recipe]:
+        with transaction.atomic():
+            return [self.child.update(instance, attrs) for instance, attrs in zip(instances, validated_data)]
+
+    def create(self, validated_data: List[Dict[str, Any]]) -> List[Recipe]:
+        with transaction.atomic():
+            return super().create(validated_data)
+
+
+class RecipeSerializer(serializers.ModelSerializer):
+    recipe_type = serializers.SlugRelatedField(
+        slug_field="name", queryset=RecipeType.objects.all(), required=False, allow_null=True
+    )
+    meal_times = serializers.SlugRelatedField(
+        slug_field="name", queryset=MealTime.objects.all(), many=True, required=False
+    )
+    diet_types = serializers.SlugRelatedField(
+        slug_field="name", queryset=DietType.objects.all(), many=True, required=False
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            "id",
+            "name",
+            "instructions",
+            "ingredients",
+            "recipe_type",
+            "meal_times",
+            "is_diet_friendly",
+            "diet_types",
+            "updated_at",
+        )
+        read_only_fields = ("updated_at",)
+        list_serializer_class = RecipeListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        requested = parse_fields(request.query_params.get("fields")) if request is not None else None
+        # Sparse fieldsets only apply to the output, writes always accept every field.
+        if requested is not None and request.method == "GET":
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+    def validate(self, attrs):
+        # DRF doesn't call `Model.full_clean`, so strip the HTML of the plain fields the way the form does, and check
+        # what is left, as markup alone strips to a blank value.
+        errors = {}
+        for name in ("name", "instructions", "ingredients"):
+            if attrs.get(name) is not None:
+                try:
+                    attrs[name] = Recipe._meta.get_field(name).clean(attrs[name], None)
+                except DjangoValidationError as e:
+                    errors[name] = e.messages
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def get_readers(self):
+        readers = []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in ("meal_times", "diet_types"):
+                readers.append((name, lambda instance, name=name: [obj.name for obj in getattr(instance, name).all()]))
+            elif name == "recipe_type":
+                readers.append((name, lambda instance: instance.recipe_type.name if instance.recipe_type else None))
+            elif name == "updated_at":
+                readers.append((name, lambda instance, field=field: field.to_representation(instance.updated_at)))
+            else:
+                readers.append((name, lambda instance, name=name: getattr(instance, name)))
+        return readers
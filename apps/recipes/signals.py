@@ -0,0 +1,39 @@
+"""
+Bookkeeping shared by the `m2m_changed` receivers of the M2M fields of `Recipe`, which all need the ids of the recipes
+whose rows changed.
+"""
+from typing import Iterable, List, Optional
+
+from django.db.models.signals import m2m_changed
+
+from apps.recipes.models import Recipe
+
+CHANGED_ACTIONS = ("post_add", "post_remove", "post_clear")
+
+
+def get_changed_recipe_ids(sender, instance, action: str, reverse: bool, pk_set: Optional[Iterable[int]]) -> List[int]:
+    """
+    Returns the ids of the recipes whose M2M rows changed for the `post_*` actions of `m2m_changed`, and an empty list
+    for the others.
+    """
+    if action not in CHANGED_ACTIONS:
+        return []
+    if not reverse:
+        return [instance.pk]
+    if action == "post_clear":
+        return instance.__dict__.get("_cleared_recipe_ids", {}).get(sender, [])
+    return list(pk_set or ())
+
+
+def _pre_clear_handler(sender, instance, action, reverse, **kwargs):
+    # A reverse clear doesn't pass the recipe ids, so they are read once for every receiver before the rows are removed.
+    if action == "pre_clear" and reverse:
+        filters = {instance._meta.model_name: instance}
+        recipe_ids = list(sender.objects.filter(**filters).values_list("recipe_id", flat=True))
+        instance.__dict__.setdefault("_cleared_recipe_ids", {})[sender] = recipe_ids
+
+
+def connect_cleared_recipes() -> None:
+    for through in (Recipe.meal_times.through, Recipe.diet_types.through):
+        uid = f"cleared_recipes:{through._meta.label_lower}"
+        m2m_changed.connect(_pre_clear_handler, sender=through, dispatch_uid=uid)
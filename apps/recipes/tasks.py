@@ -0,0 +1,30 @@
+from typing import List
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import QueryDict
+
+from celery import shared_task
+
+from apps.base.tasks import CoalescedTask
+from apps.recipes.fragments import get_row_queryset, render_rows
+from apps.recipes.search import RecipeSearch, get_facets, index_recipes
+
+
+@shared_task(base=CoalescedTask, autoretry_for=(DatabaseError,), **settings.TASK_RETRY_POLICY)
+def update_recipes(recipe_ids: List[int]) -> None:
+    """
+    Updates what's derived from the saved recipes: their search documents, then the caches the recipe list reads.
+    """
+    index_recipes(recipe_ids)
+    warm_recipe_caches.delay(recipe_ids)
+
+
+@shared_task(autoretry_for=(DatabaseError,), **settings.TASK_RETRY_POLICY)
+def warm_recipe_caches(recipe_ids: List[int]) -> None:
+    """
+    Renders the list rows of the recipes and the facet counts of the unfiltered list, which the indexing invalidated,
+    so the next visitor of the list doesn't wait for them.
+    """
+    render_rows(get_row_queryset().filter(pk__in=recipe_ids))
+    get_facets(RecipeSearch.from_query_params(QueryDict()))
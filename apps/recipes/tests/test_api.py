@@ -0,0 +1,125 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.accounts.models import User
+from apps.recipes.models import MealTime, Recipe, RecipeType
+
+
+class RecipeAPITests(TestCase):
+    list_url = reverse("recipe-list")
+    bulk_url = reverse("recipe-bulk")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("cook", "cook@example.com", "secret")
+        cls.recipe_type = RecipeType.objects.create(name="Soup course")
+        cls.meal_times = [MealTime.objects.create(name="Early"), MealTime.objects.create(name="Late")]
+        cls.recipe = Recipe.objects.create(name="Pancakes", instructions="Fry")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def detail_url(self, recipe: Recipe) -> str:
+        return reverse("recipe-detail", args=(recipe.pk,))
+
+    def send(self, method: str, url: str, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, content_type="application/json")
+
+    def test_create(self):
+        data = {
+            "name": "<b>Tomato</b> soup",
+            "instructions": "<p>Simmer</p>",
+            "recipe_type": "Soup course",
+            "meal_times": ["Early", "Late"],
+            "is_diet_friendly": True,
+        }
+        response = self.send("post", self.list_url, data)
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe = Recipe.objects.get(pk=response.json()["id"])
+        self.assertEqual(recipe.name, "Tomato soup")
+        self.assertEqual(recipe.instructions, "Simmer")
+        self.assertEqual(recipe.recipe_type, self.recipe_type)
+        self.assertEqual(set(recipe.meal_times.all()), set(self.meal_times))
+        self.assertEqual(response.json()["meal_times"], ["Early", "Late"])
+
+    def test_create_many(self):
+        response = self.send("post", self.list_url, [{"name": "Soup"}, {"name": "Stew"}])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([recipe["name"] for recipe in response.json()], ["Soup", "Stew"])
+        self.assertTrue(Recipe.objects.filter(name="Stew").exists())
+
+    def test_update(self):
+        response = self.send("patch", self.detail_url(self.recipe), {"name": "<i>Crepes</i>", "meal_times": ["Late"]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Crepes")
+        self.assertEqual(self.recipe.instructions, "Fry")
+        self.assertEqual(list(self.recipe.meal_times.all()), [self.meal_times[1]])
+
+        response = self.send("put", self.detail_url(self.recipe), {"name": "Waffles"})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Waffles")
+
+    def test_bulk_update(self):
+        other = Recipe.objects.create(name="Toast")
+        data = [{"id": self.recipe.pk, "name": "Crepes"}, {"id": other.pk, "is_diet_friendly": False}]
+        response = self.send("patch", self.bulk_url, data)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).name, "Crepes")
+        self.assertIs(Recipe.objects.get(pk=other.pk).is_diet_friendly, False)
+
+    def test_validation_errors(self):
+        cases = [
+            ({"name": "<b></b>"}, "name"),
+            ({}, "name"),
+            ({"name": "x" * 101}, "name"),
+            ({"name": "Soup", "recipe_type": "Unknown"}, "recipe_type"),
+            ({"name": "Soup", "meal_times": ["Unknown"]}, "meal_times"),
+        ]
+        for data, field in cases:
+            with self.subTest(data=data):
+                response = self.send("post", self.list_url, data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json())
+        self.assertEqual(Recipe.objects.count(), 1)
+
+        response = self.send("patch", self.detail_url(self.recipe), {"name": "<br>"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("name", response.json())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Pancakes")
+
+    def test_bulk_validation_errors(self):
+        response = self.send("patch", self.bulk_url, [{"id": self.recipe.pk, "name": "Crepes"}, {"name": "Stew"}])
+        self.assertEqual(response.status_code, 400)
+        response = self.send("patch", self.bulk_url, {"id": self.recipe.pk})
+        self.assertEqual(response.status_code, 400)
+        response = self.send("patch", self.bulk_url, [{"id": self.recipe.pk, "name": "Crepes"}, {"id": 0}])
+        self.assertEqual(response.status_code, 404)
+        other = Recipe.objects.create(name="Toast")
+        data = [{"id": self.recipe.pk, "name": "Crepes"}, {"id": other.pk, "name": "<b></b>"}]
+        response = self.send("patch", self.bulk_url, data)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).name, "Pancakes")
+
+    def test_anonymous_users_can_only_read(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.list_url).status_code, 200)
+        self.assertEqual(self.client.get(self.detail_url(self.recipe)).status_code, 200)
+        requests = [
+            ("post", self.list_url, {"name": "Soup"}),
+            ("patch", self.detail_url(self.recipe), {"name": "Soup"}),
+            ("put", self.detail_url(self.recipe), {"name": "Soup"}),
+            ("delete", self.detail_url(self.recipe), None),
+            ("patch", self.bulk_url, [{"id": self.recipe.pk, "name": "Soup"}]),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                self.assertEqual(self.send(method, url, data).status_code, 403)
+        self.assertEqual(list(Recipe.objects.values_list("name", flat=True)), ["Pancakes"])
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(self.list_url, {"fields": "id,name"})
+        self.assertEqual(response.json()["results"], [{"id": self.recipe.pk, "name": "Pancakes"}])
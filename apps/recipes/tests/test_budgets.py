@@ -0,0 +1,80 @@
+from django.test import TestCase
+from django.urls import resolve, reverse
+
+from apps.base.profiling import BudgetExceeded, within_budget
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeType
+from apps.recipes.views import RecipeFormSchemaView
+
+# Only the counts are checked, as the times depend on the machine running the tests.
+COUNTS = ("queries", "duplicate_queries")
+
+
+class ViewBudgetTests(TestCase):
+    """
+    The views stay within their `PROFILER_BUDGETS` with a full page of recipes, which catches N+1 queries.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        meal_times = list(MealTime.objects.all())
+        diet_types = list(DietType.objects.all())
+        recipe_type = RecipeType.objects.first()
+        for i in range(30):
+            recipe = Recipe.objects.create(name=f"Recipe {i}", recipe_type=recipe_type, is_diet_friendly=i % 2 == 0)
+            recipe.meal_times.set(meal_times[: i % 3 + 1])
+            recipe.diet_types.set(diet_types[: i % 2 + 1])
+        cls.recipe = recipe
+
+    def get(self, url, **params):
+        # Once to fill the caches and compile the templates, as the budgets are for a warm process.
+        self.client.get(url, params)
+        with within_budget(resolve(url).view_name, keys=COUNTS):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        self.get(reverse("recipes:list"))
+        self.get(reverse("recipes:list"), q="recipe", meal_times=MealTime.objects.first().pk)
+
+    def test_create_form(self):
+        self.get(reverse("recipes:create"))
+
+    def test_update_form(self):
+        self.get(reverse("recipes:update", args=(self.recipe.pk,)))
+
+    def test_create(self):
+        data = {
+            "name": "Soup",
+            "meal_times": [pk for pk in MealTime.objects.values_list("pk", flat=True)],
+            "is_diet_friendly": "True",
+        }
+        # The work enqueued on commit runs in the workers, so it's left out of the budget.
+        with self.captureOnCommitCallbacks(execute=True), within_budget("recipes:create", keys=COUNTS):
+            response = self.client.post(reverse("recipes:create"), data)
+        self.assertRedirects(response, reverse("recipes:list"), fetch_redirect_response=False)
+
+    def test_update(self):
+        data = {"name": "Soup", "diet_types": list(DietType.objects.values_list("pk", flat=True)[:2])}
+        url = reverse("recipes:update", args=(self.recipe.pk,))
+        with self.captureOnCommitCallbacks(execute=True), within_budget("recipes:update", keys=COUNTS):
+            response = self.client.post(url, data)
+        self.assertRedirects(response, reverse("recipes:list"), fetch_redirect_response=False)
+
+    def test_form_schema(self):
+        self.get(RecipeFormSchemaView.get_schema_url())
+
+    def test_api_list(self):
+        self.get(reverse("recipe-list"))
+
+    def test_user_api_list(self):
+        self.get(reverse("user-list"))
+
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(BudgetExceeded, "recipes:list is over budget: queries"):
+            with within_budget("recipes:list", queries=0):
+                self.client.get(reverse("recipes:list"))
+
+    def test_only_the_given_keys_are_checked(self):
+        with within_budget("recipes:list", keys=COUNTS, duration=0):
+            self.client.get(reverse("recipes:list"))
@@ -0,0 +1,17 @@
+import json
+
+from django.test import TestCase
+
+from apps.recipes.export import export_recipes
+from apps.recipes.models import Recipe
+
+
+class ExportTests(TestCase):
+    def test_rows_are_read_in_keyset_pages(self):
+        Recipe.objects.bulk_create([Recipe(name=f"Recipe {i}") for i in range(5)])
+        # The three lookup tables, then pages of 2, 2, 1 and the empty page that ends the export.
+        with self.assertNumQueries(7) as queries:
+            data = b"".join(export_recipes("ndjson", chunk_size=2))
+        self.assertIn('"id" > ', queries.captured_queries[-1]["sql"])
+        names = [json.loads(line)["name"] for line in data.decode().splitlines()]
+        self.assertEqual(names, [f"Recipe {i}" for i in range(5)])
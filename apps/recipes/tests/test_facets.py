@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.recipes import facets
+from apps.recipes.facets import SEQUENCE_KEY, FacetIndex, clear_facet_index, get_change_key, get_facet_index
+from apps.recipes.models import MealTime, Recipe
+
+
+class FacetIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = MealTime.objects.get(name="Breakfast")
+
+    def setUp(self):
+        cache.clear()
+        clear_facet_index()
+        self.addCleanup(clear_facet_index)
+
+    def create_recipe(self, name: str) -> Recipe:
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(name=name)
+            recipe.meal_times.add(self.breakfast)
+        return recipe
+
+    def reserve_sequence(self) -> int:
+        # What another process has done between reserving a sequence number and writing its change.
+        cache.add(SEQUENCE_KEY, 0, None)
+        return cache.incr(SEQUENCE_KEY)
+
+    def test_changes_are_replayed(self):
+        index = get_facet_index()
+        recipe = self.create_recipe("Toast")
+        with mock.patch.object(FacetIndex, "load") as load:
+            self.assertIs(get_facet_index(), index)
+        load.assert_not_called()
+        self.assertEqual(list(facets.iter_pks(index.get("meal_times", self.breakfast.pk))), [recipe.pk])
+
+    def test_missing_change_is_retried(self):
+        index = get_facet_index()
+        toast = self.create_recipe("Toast")
+        in_flight = self.reserve_sequence()
+        soup = self.create_recipe("Soup")
+        with mock.patch.object(FacetIndex, "load") as load:
+            self.assertIs(get_facet_index(), index)
+            self.assertEqual(index.sequence, in_flight - 1)
+            self.assertEqual(list(facets.iter_pks(index.get("meal_times", self.breakfast.pk))), [toast.pk])
+
+            cache.set(get_change_key(in_flight), [], None)
+            self.assertIs(get_facet_index(), index)
+        load.assert_not_called()
+        self.assertEqual(index.sequence, cache.get(SEQUENCE_KEY))
+        self.assertEqual(list(facets.iter_pks(index.get("meal_times", self.breakfast.pk))), [toast.pk, soup.pk])
+
+    def test_index_is_reloaded_when_a_change_stays_missing(self):
+        index = get_facet_index()
+        self.reserve_sequence()
+        with mock.patch("apps.recipes.facets.time.monotonic", return_value=100):
+            self.assertIs(get_facet_index(), index)
+        with mock.patch("apps.recipes.facets.time.monotonic", return_value=100 + facets.MISSING_CHANGE_TIMEOUT + 1):
+            reloaded = get_facet_index()
+        self.assertIsNot(reloaded, index)
+        self.assertEqual(reloaded.sequence, cache.get(SEQUENCE_KEY))
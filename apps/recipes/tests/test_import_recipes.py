@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.recipes.facets import clear_facet_index, get_facet_index, iter_pks
+from apps.recipes.management.commands.import_recipes import Command, InsertedRowsMismatch
+from apps.recipes.masks import get_bit
+from apps.recipes.models import MealTime, Recipe, RecipeSearchDocument
+
+
+class ImportRecipesTests(TestCase):
+    def import_lines(self, lines, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write("\n".join(lines) + "\n")
+        self.addCleanup(os.remove, f.name)
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_recipes", f.name, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_invalid_lines_are_reported_per_row(self):
+        lines = [
+            json.dumps({"name": "Toast", "meal_times": ["Breakfast"]}),
+            "[1, 2]",
+            "{not json",
+            json.dumps({"name": "Soup"}),
+        ]
+        stdout, stderr = self.import_lines(lines)
+        self.assertIn("Line 2: Expected a JSON object, got list", stderr)
+        self.assertIn("Line 3: Invalid JSON", stderr)
+        self.assertIn("2 imported, 2 invalid", stdout)
+        self.assertEqual(set(Recipe.objects.values_list("name", flat=True)), {"Toast", "Soup"})
+
+    def test_invalid_lines_stop_a_strict_import(self):
+        with self.assertRaisesMessage(CommandError, "Line 1: Expected a JSON object"):
+            self.import_lines(["[1, 2]"], "--strict")
+
+    def test_recipes_with_meal_times_are_bulk_inserted(self):
+        lines = [json.dumps({"name": f"Recipe {i}", "meal_times": ["Breakfast", "Dinner"][: i % 3]}) for i in range(30)]
+        with CaptureQueriesContext(connection) as queries:
+            self.import_lines(lines)
+        recipe_inserts = [q for q in queries if q["sql"].startswith(f'INSERT INTO "{Recipe._meta.db_table}"')]
+        self.assertEqual(len(recipe_inserts), 1)
+
+        breakfast = MealTime.objects.get(name="Breakfast")
+        for recipe in Recipe.objects.prefetch_related("meal_times"):
+            i = int(recipe.name.split()[1])
+            self.assertEqual([m.name for m in recipe.meal_times.all()], ["Breakfast", "Dinner"][: i % 3])
+            self.assertEqual(recipe.meal_times_mask & get_bit(breakfast.pk) != 0, i % 3 > 0)
+
+    def test_concurrent_inserts_fall_back_to_single_inserts(self):
+        def interleaved(command, recipes):
+            Recipe.objects.bulk_create(recipes)
+            raise InsertedRowsMismatch
+
+        lines = [json.dumps({"name": f"Recipe {i}", "meal_times": ["Lunch"]}) for i in range(3)]
+        with mock.patch.object(Command, "bulk_create_in_range", interleaved):
+            self.import_lines(lines)
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertEqual(Recipe.meal_times.through.objects.count(), 3)
+
+    def test_imported_recipes_are_indexed_on_commit(self):
+        lines = [json.dumps({"name": "Toast", "meal_times": ["Breakfast"]}), json.dumps({"name": "Soup"})]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_lines(lines, "--batch-size", "1")
+        breakfast = MealTime.objects.get(name="Breakfast")
+        documents = {document.name: document for document in RecipeSearchDocument.objects.all()}
+        self.assertEqual(set(documents), {"Toast", "Soup"})
+        self.assertEqual(documents["Toast"].meal_times_mask, get_bit(breakfast.pk))
+
+    def test_imported_recipes_are_logged_for_the_facet_index(self):
+        clear_facet_index()
+        self.addCleanup(clear_facet_index)
+        index = get_facet_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_lines([json.dumps({"name": "Toast", "meal_times": ["Breakfast"]})])
+        breakfast = MealTime.objects.get(name="Breakfast")
+        self.assertIs(get_facet_index(), index)
+        self.assertEqual(list(iter_pks(index.get("meal_times", breakfast.pk))), [Recipe.objects.get().pk])
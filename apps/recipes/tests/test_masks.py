@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.recipes.facets import clear_facet_index, get_facet_index, iter_pks
+from apps.recipes.masks import MASK_BITS, get_bit
+from apps.recipes.models import MealTime, Recipe, RecipeSearchDocument
+
+
+class MaskedListModelTests(TestCase):
+    def test_primary_keys_above_the_mask_are_refused(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            MealTime.objects.create(pk=MASK_BITS + 1, name="Midnight")
+
+    def test_clean_refuses_rows_once_the_mask_is_full(self):
+        MealTime(name="Supper").full_clean()
+        MealTime.objects.create(pk=MASK_BITS, name="Supper")
+        with self.assertRaisesMessage(ValidationError, f"No more than {MASK_BITS} meal times can be added."):
+            MealTime(name="Midnight").full_clean()
+        MealTime.objects.get(pk=MASK_BITS).full_clean()
+
+
+class ReverseClearTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.breakfast = MealTime.objects.get(name="Breakfast")
+        cls.recipes = [Recipe.objects.create(name=name) for name in ("Toast", "Porridge")]
+        for recipe in cls.recipes:
+            recipe.meal_times.add(cls.breakfast)
+
+    def setUp(self):
+        cache.clear()
+        clear_facet_index()
+        self.addCleanup(clear_facet_index)
+
+    def test_every_receiver_gets_the_recipes(self):
+        index = get_facet_index()
+        self.assertEqual(len(list(iter_pks(index.get("meal_times", self.breakfast.pk)))), 2)
+        updated_at = dict(Recipe.objects.values_list("pk", "updated_at"))
+
+        table = Recipe.meal_times.through._meta.db_table
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.breakfast.recipe_set.clear()
+        reads = [q for q in queries if q["sql"].startswith(f'SELECT "{table}"."recipe_id" FROM')]
+        self.assertEqual(len(reads), 1)
+
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.meal_times_mask & get_bit(self.breakfast.pk), 0)
+            self.assertGreater(recipe.updated_at, updated_at[recipe.pk])
+        self.assertEqual(RecipeSearchDocument.objects.filter(meal_times_mask__gt=0).count(), 0)
+        self.assertEqual(RecipeSearchDocument.objects.count(), 2)
+        self.assertEqual(list(iter_pks(get_facet_index().get("meal_times", self.breakfast.pk))), [])
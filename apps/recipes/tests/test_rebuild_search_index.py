@@ -0,0 +1,34 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.recipes.management.commands.rebuild_search_index import Command
+from apps.recipes.models import Recipe, RecipeSearchDocument
+
+
+class RebuildSearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Recipe.objects.bulk_create(Recipe(name=f"Recipe {i}") for i in range(5))
+        RecipeSearchDocument.objects.create(recipe=Recipe.objects.order_by("pk").first(), name="Stale")
+
+    def test_documents_are_replaced_per_batch(self):
+        counts = []
+        write_batch = Command.write_batch
+
+        def counting_write_batch(command, recipe_ids):
+            counts.append(RecipeSearchDocument.objects.count())
+            return write_batch(command, recipe_ids)
+
+        stdout = StringIO()
+        with mock.patch.object(Command, "write_batch", counting_write_batch):
+            call_command("rebuild_search_index", "--batch-size", "2", stdout=stdout)
+        self.assertIn("Indexed 5 recipes", stdout.getvalue())
+        # The old document stays searchable until its batch replaces it.
+        self.assertEqual(counts, [1, 2, 4])
+        self.assertEqual(
+            list(RecipeSearchDocument.objects.order_by("pk").values_list("name", flat=True)),
+            [f"Recipe {i}" for i in range(5)],
+        )
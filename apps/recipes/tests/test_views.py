@@ -0,0 +1,138 @@
+import json
+
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.base.choice_cache import get_versions
+from apps.recipes.forms import RecipeForm
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeSearchDocument, RecipeType
+from apps.recipes.search import MAX_PK, RecipeSearch, index_recipes
+
+
+class RecipeListETagTests(TestCase):
+    url = reverse("recipes:list")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(name="Pancakes")
+
+    def get_etag(self) -> str:
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def change(self, func):
+        etag = self.get_etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_not_modified_without_changes(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_does_not_read_the_recipes(self):
+        etag = self.get_etag()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_on_save(self):
+        self.change(lambda: Recipe.objects.create(name="Waffles"))
+        self.change(self.recipe.save)
+
+    def test_changes_on_delete(self):
+        self.change(self.recipe.delete)
+
+    def test_changes_on_m2m_changes(self):
+        breakfast = MealTime.objects.get(name="Breakfast")
+        self.change(lambda: self.recipe.meal_times.add(breakfast))
+        self.change(lambda: breakfast.recipe_set.clear())
+
+    def test_changes_when_the_search_index_or_lookups_change(self):
+        self.change(lambda: index_recipes([self.recipe.pk]))
+        diet_type = DietType.objects.first()
+        self.change(diet_type.save)
+
+    def test_version_is_bumped_on_commit(self):
+        version = get_versions(Recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+            self.assertEqual(get_versions(Recipe), version)
+        self.assertNotEqual(get_versions(Recipe), version)
+
+    def test_search_version_is_bumped_on_commit_of_a_delete(self):
+        version = get_versions(RecipeSearchDocument)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+            self.assertEqual(get_versions(RecipeSearchDocument), version)
+        self.assertNotEqual(get_versions(RecipeSearchDocument), version)
+
+
+class RecipeSearchParamsTests(TestCase):
+    def test_ids_are_parsed(self):
+        params = QueryDict("recipe_type=3&meal_times=2&meal_times=1&meal_times=2&diet_types=63")
+        search = RecipeSearch.from_query_params(params)
+        self.assertEqual((search.recipe_type, search.meal_times, search.diet_types), (3, (1, 2), (63,)))
+
+    def test_bad_and_huge_ids_are_dropped(self):
+        for value in ["²", "１²", "-1", "0", "1.5", "x", "", " 1", str(MAX_PK + 1), "9" * 30, "9" * 5000]:
+            with self.subTest(value=value):
+                params = QueryDict(mutable=True)
+                params.setlist("meal_times", [value, "1"])
+                params["recipe_type"] = value
+                search = RecipeSearch.from_query_params(params)
+                self.assertEqual((search.recipe_type, search.meal_times), (None, (1,)))
+        search = RecipeSearch.from_query_params(QueryDict("meal_times=64&diet_types=64"))
+        self.assertEqual((search.meal_times, search.diet_types), ((), ()))
+
+    def test_list_with_bad_and_huge_ids(self):
+        Recipe.objects.create(name="Pancakes")
+        for value in ["²", str(MAX_PK), str(MAX_PK + 1), "9" * 30]:
+            with self.subTest(value=value):
+                response = self.client.get(reverse("recipes:list"), {"recipe_type": value, "meal_times": value})
+                self.assertEqual(response.status_code, 200)
+
+
+class RecipeFormValidationTests(TestCase):
+    """
+    The validation endpoint gives the same errors as the form for the fields it's sent.
+    """
+
+    url = reverse("recipes:validate")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe_type = RecipeType.objects.create(name="Soup course")
+        cls.meal_time = MealTime.objects.create(name="Early")
+
+    def validate(self, fields):
+        response = self.client.post(self.url, json.dumps({"fields": fields}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["errors"]
+
+    def test_errors_match_the_form(self):
+        cases = {
+            "name": ["", None, "<b></b>", "x" * 101, "<b>Soup</b>"],
+            "instructions": ["", None, "<p></p>", "<p>Simmer</p>"],
+            "is_diet_friendly": ["unknown", "", None, "true", "false"],
+            "recipe_type": ["", None, "0", "soup", str(self.recipe_type.pk)],
+            "meal_times": [[], None, ["0"], ["early"], [str(self.meal_time.pk)]],
+        }
+        for name, values in cases.items():
+            for value in values:
+                with self.subTest(name=name, value=value):
+                    expected = RecipeForm(data={name: value}).errors.get(name, [])
+                    self.assertEqual(self.validate({name: value}).get(name, []), expected)
+
+    def test_empty_optional_fields_are_valid(self):
+        self.assertEqual(self.validate({"is_diet_friendly": "unknown", "instructions": "", "recipe_type": ""}), {})
+        self.assertEqual(self.validate({"name": "<b></b>"}), {"name": ["This field cannot be blank."]})
+
+    def test_bad_requests(self):
+        for body in ["", "[]", '{"fields": []}', '{"other": {}}']:
+            with self.subTest(body=body):
+                response = self.client.post(self.url, body, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
@@ -1,11 +1,30 @@
 from django.urls import path
 
-from .views import RecipeCreateView, RecipeDeleteView, RecipeListView, RecipeUpdateView
+from rest_framework import routers
+
+from apps.recipes import api
+
+from .views import (
+    RecipeCreateView,
+    RecipeDeleteView,
+    RecipeExportView,
+    RecipeFormSchemaView,
+    RecipeFormValidationView,
+    RecipeListView,
+    RecipeUpdateView,
+)
 
 app_name = "recipes"
 urlpatterns = [
     path("", RecipeListView.as_view(), name="list"),
     path("create/", RecipeCreateView.as_view(), name="create"),
+    path("export/", RecipeExportView.as_view(), name="export"),
+    path("schema/", RecipeFormSchemaView.as_view(), name="form_schema"),
+    path("schema/<str:version>/", RecipeFormSchemaView.as_view(), name="form_schema"),
+    path("validate/", RecipeFormValidationView.as_view(), name="validate"),
     path("<int:pk>/", RecipeUpdateView.as_view(), name="update"),
     path("<int:pk>/delete/", RecipeDeleteView.as_view(), name="delete"),
 ]
+
+recipes_router = routers.SimpleRouter()
+recipes_router.register(r"recipes", api.RecipeViewSet)
@@ -1,17 +1,53 @@
+from itertools import islice
+from typing import List
+
+from django.conf import settings
 from django.contrib import messages
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.urls import reverse
+from django.views import View
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
+from apps.base.choice_cache import get_versions
+from apps.base.hybrid_forms import get_form_data
+from apps.base.pagination import CURSOR_BEFORE, KeysetPaginationMixin
+from apps.base.views import ConditionalGetMixin, FormSchemaView, FormValidationView
+from apps.recipes.export import EXPORT_FORMATS, export_recipes
+from apps.recipes.facets import get_facet_index, iter_pks, match_search
 from apps.recipes.forms import RecipeForm
-from apps.recipes.models import Recipe
+from apps.recipes.fragments import get_row_queryset, render_rows
+from apps.recipes.models import DietType, MealTime, Recipe, RecipeSearchDocument, RecipeType
+from apps.recipes.search import RecipeSearch, filter_recipes, get_facets
 
 
 class FormSuccessMixin:
+    def form_valid(self, form):
+        # The recipe and its M2M rows are saved together, so the derived work is enqueued once with the commit.
+        with transaction.atomic():
+            return super().form_valid(form)
+
     def get_success_url(self) -> str:
         messages.success(self.request, "Recipe successfully saved.")
         return reverse("recipes:list")
 
 
+class FormSchemaMixin:
+    """
+    With `HYBRID_FORM_SCHEMA` on the form page only embeds the form values and errors and the Vue components are built
+    from the cached JSON schema of the form, instead of rendering every field with `hybrid_form`.
+    """
+
+    schema_view = None
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        if settings.HYBRID_FORM_SCHEMA:
+            data["form_schema_url"] = self.schema_view.get_schema_url()
+            data["form_data"] = get_form_data(data["form"])
+        return data
+
+
 class StaticContextMixin:
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
@@ -19,26 +55,81 @@ class StaticContextMixin:
         return data
 
 
-class RecipeListView(StaticContextMixin, ListView):
+class RecipeListView(ConditionalGetMixin, StaticContextMixin, KeysetPaginationMixin, ListView):
     model = Recipe
     static_context = {"page_title": "Recipes"}
 
+    def get_etag_parts(self):
+        # The recipe version is bumped by every change of a recipe or its M2M rows, the search document version when
+        # the facet counts change and the lookup versions catch renames.
+        return get_versions(Recipe, RecipeSearchDocument, RecipeType, MealTime, DietType)
+
     def get_queryset(self):
-        result = Recipe.objects.prefetch_related("recipe_type", "meal_times")
-        return result
+        result = get_row_queryset()
+        search = self.get_search()
+        if search.is_facet_only():
+            return result.filter(pk__in=self.get_facet_page_pks(search))
+        return filter_recipes(result, search)
+
+    def get_facet_page_pks(self, search: RecipeSearch) -> List[int]:
+        # The page is read from the bitsets of the facet index, so the database only gets a short list of keys.
+        bitmap = match_search(get_facet_index(), search.meal_times, search.diet_types)
+        direction, key = self.get_cursor()
+        pks = iter_pks(bitmap, before=key) if direction == CURSOR_BEFORE else iter_pks(bitmap, after=key)
+        return list(islice(pks, self.paginate_by + 1))
 
+    def get_search(self) -> RecipeSearch:
+        if not hasattr(self, "_search"):
+            self._search = RecipeSearch.from_query_params(self.request.GET)
+        return self._search
 
-class RecipeCreateView(StaticContextMixin, FormSuccessMixin, CreateView):
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        data["rendered_rows"] = render_rows(data["object_list"])
+        data["search"] = self.get_search()
+        data["facets"] = get_facets(data["search"])
+        return data
+
+
+class RecipeFormSchemaView(FormSchemaView):
+    form_class = RecipeForm
+    url_name = "recipes:form_schema"
+
+
+class RecipeFormValidationView(FormValidationView):
+    form_class = RecipeForm
+
+
+class RecipeCreateView(StaticContextMixin, FormSchemaMixin, FormSuccessMixin, CreateView):
     model = Recipe
     form_class = RecipeForm
+    schema_view = RecipeFormSchemaView
     static_context = {"page_title": "Create Recipe"}
 
 
-class RecipeUpdateView(StaticContextMixin, FormSuccessMixin, UpdateView):
+class RecipeUpdateView(ConditionalGetMixin, StaticContextMixin, FormSchemaMixin, FormSuccessMixin, UpdateView):
     model = Recipe
     form_class = RecipeForm
+    schema_view = RecipeFormSchemaView
     static_context = {"page_title": "Update Recipe"}
 
+    def get_updated_at(self):
+        if not hasattr(self, "_updated_at"):
+            self._updated_at = Recipe.objects.filter(pk=self.kwargs["pk"]).values_list("updated_at", flat=True).first()
+        return self._updated_at
+
+    def get_etag_parts(self):
+        updated_at = self.get_updated_at()
+        if updated_at is None:
+            return None
+        # The form embeds the CSRF token and the options of every lookup model.
+        csrf_cookie = self.request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+        return [updated_at, csrf_cookie, *get_versions(RecipeType, MealTime, DietType)]
+
+    def get_last_modified(self):
+        updated_at = self.get_updated_at()
+        return int(updated_at.timestamp()) if updated_at is not None else None
+
 
 class RecipeDeleteView(StaticContextMixin, DeleteView):
     model = Recipe
@@ -47,3 +138,19 @@ class RecipeDeleteView(StaticContextMixin, DeleteView):
     def get_success_url(self) -> str:
         messages.success(self.request, "Recipe successfully deleted.")
         return reverse("recipes:list")
+
+
+class RecipeExportView(View):
+    def get(self, request, *args, **kwargs):
+        file_format = request.GET.get("format", "csv")
+        if file_format not in EXPORT_FORMATS:
+            raise Http404("Unknown export format.")
+        gzip = request.GET.get("gzip") in ("1", "true")
+        filename = f"recipes.{file_format}"
+        content_type = EXPORT_FORMATS[file_format]
+        if gzip:
+            filename += ".gz"
+            content_type = "application/gzip"
+        response = StreamingHttpResponse(export_recipes(file_format, gzip=gzip), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,431 @@
+"""
+Streams a database from a server into the local database for `fab sync_database`, without intermediate files.
+
+The dump runs on the source over ssh (or locally when there's no host, which is how to try it against a local
+stand-in) and its output is piped straight into the local restore. With `jobs` above one, or when tables are excluded
+or sampled, the schema is restored first, then the data of each table is streamed by `jobs` parallel dump and restore
+pairs, largest tables first, and the indexes and constraints are created last. The tables are then dumped in separate
+transactions, so they aren't consistent with each other if the source is being written to.
+"""
+import os
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, List, Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class SyncError(Exception):
+    pass
+
+
+class Progress:
+    """
+    Counts the bytes streamed by every pipe and prints the total, the throughput and the items (tables by default)
+    done every `interval` seconds.
+    """
+
+    def __init__(self, interval: float = 2.0, out: IO[str] = sys.stderr, label: str = "tables"):
+        self.interval = interval
+        self.out = out
+        self.label = label
+        self.bytes = 0
+        self.items = 0
+        self.items_done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            self.bytes += size
+
+    def item_done(self) -> None:
+        with self._lock:
+            self.items_done += 1
+
+    def report(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        line = f"{self.bytes / 1e6:,.1f} MB in {elapsed:.0f}s, {self.bytes / 1e6 / elapsed:,.1f} MB/s"
+        if self.items:
+            line += f", {self.items_done}/{self.items} {self.label}"
+        return line
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            print(self.report(), file=self.out, flush=True)
+
+    def __enter__(self) -> "Progress":
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stopped.set()
+        print(self.report(), file=self.out, flush=True)
+
+
+class Runner:
+    """
+    Runs the dump commands on `host` over ssh, or locally when `host` is `None`, and the restore commands locally
+    with `env` added to the environment.
+    """
+
+    def __init__(self, host: Optional[str] = None, compress: bool = True, env: Optional[Dict[str, str]] = None):
+        self.host = host
+        self.compress = compress
+        self.env = {**os.environ, **(env or {})}
+
+    def source_args(self, command: str) -> List[str]:
+        if self.host is None:
+            return ["sh", "-c", command]
+        return ["ssh", *(["-C"] if self.compress else []), self.host, command]
+
+    def read(self, command: str) -> str:
+        """
+        Runs a command on the source and returns its output.
+        """
+        result = subprocess.run(self.source_args(command), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode:
+            raise SyncError(f"{command!r} failed on the source: {result.stderr.decode().strip()}")
+        return result.stdout.decode()
+
+    def run(self, command: str) -> None:
+        result = subprocess.run(["sh", "-c", command], env=self.env, stderr=subprocess.PIPE)
+        if result.returncode:
+            raise SyncError(f"{command!r} failed: {result.stderr.decode().strip()}")
+
+    def stream(
+        self,
+        source_command: str,
+        target_command: str,
+        progress: Progress,
+        transform: Optional[Callable[[bytes], bytes]] = None,
+    ) -> None:
+        """
+        Pipes the output of `source_command` into `target_command`. `transform` is given the whole output at once, so
+        only use it for small ones such as the post-data section of a dump.
+        """
+        source = subprocess.Popen(self.source_args(source_command), stdout=subprocess.PIPE)
+        target = subprocess.Popen(["sh", "-c", target_command], stdin=subprocess.PIPE, env=self.env)
+        assert source.stdout is not None and target.stdin is not None
+        try:
+            if transform is not None:
+                data = transform(source.stdout.read())
+                target.stdin.write(data)
+                progress.add(len(data))
+            else:
+                for chunk in iter(lambda: source.stdout.read(CHUNK_SIZE), b""):  # type: ignore
+                    target.stdin.write(chunk)
+                    progress.add(len(chunk))
+            target.stdin.close()
+        except BrokenPipeError:
+            source.kill()
+        source_code, target_code = source.wait(), target.wait()
+        if source_code or target_code:
+            raise SyncError(
+                f"{source_command!r} exited with {source_code} and {target_command!r} exited with {target_code}"
+            )
+
+
+class Engine:
+    """
+    Builds the dump commands run on the source and the restore commands run locally for one database vendor. The
+    source database has the same name as the local one and the dump tools connect with the defaults of the server.
+    """
+
+    supports_tables = True
+
+    def __init__(self, database: Dict[str, Any], bin_dir: str = ""):
+        self.database = database
+        self.name = database["NAME"]
+        self.bin_dir = bin_dir
+
+    def bin(self, name: str) -> str:
+        return os.path.join(self.bin_dir, name) if self.bin_dir else name
+
+    def env(self) -> Dict[str, str]:
+        return {}
+
+    def recreate(self) -> List[str]:
+        raise NotImplementedError
+
+    def dump(self) -> str:
+        raise NotImplementedError
+
+    def restore(self) -> str:
+        raise NotImplementedError
+
+    def list_tables(self) -> str:
+        """
+        A command that prints the tables of the source, one per line, largest first.
+        """
+        raise NotImplementedError
+
+    def dump_schema(self) -> str:
+        raise NotImplementedError
+
+    def dump_table(self, table: str, percent: Optional[float]) -> str:
+        raise NotImplementedError
+
+    def restore_table(self, table: str, percent: Optional[float]) -> str:
+        return self.restore()
+
+    def dump_post_data(self) -> Optional[str]:
+        return None
+
+    def finish(self, per_table: bool) -> List[str]:
+        return []
+
+    def transform_post_data(self, data: bytes, partial: bool) -> bytes:
+        """
+        Adjusts the post-data section, `partial` being set when the data of some tables was excluded or sampled.
+        """
+        return data
+
+
+class PostgresEngine(Engine):
+    # Sampled tables can reference rows that weren't sampled and any table can reference the rows of excluded ones, so
+    # their foreign keys are added without validation.
+    FOREIGN_KEY_RE = re.compile(rb"(ADD CONSTRAINT \S+ FOREIGN KEY [^;]*);")
+    # Moves every sequence past the largest value of its column, as the per table data doesn't restore them.
+    RESET_SEQUENCES = """DO $$
+DECLARE r record;
+BEGIN
+  FOR r IN
+    SELECT quote_ident(n.nspname) || '.' || quote_ident(s.relname) AS seq, n.nspname, t.relname, a.attname
+    FROM pg_class s
+    JOIN pg_namespace n ON n.oid = s.relnamespace
+    JOIN pg_depend d ON d.objid = s.oid AND d.deptype IN ('a', 'i')
+    JOIN pg_class t ON t.oid = d.refobjid
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = d.refobjsubid
+    WHERE s.relkind = 'S'
+  LOOP
+    EXECUTE format(
+      'SELECT setval(%L, COALESCE((SELECT max(%I) FROM %I.%I), 0) + 1, false)', r.seq, r.attname, r.nspname, r.relname
+    );
+  END LOOP;
+END $$;"""
+
+    def connection_args(self) -> str:
+        args = []
+        for option, key in (("-h", "HOST"), ("-p", "PORT"), ("-U", "USER")):
+            if self.database.get(key):
+                args += [option, shlex.quote(str(self.database[key]))]
+        return "".join(f" {arg}" for arg in args)
+
+    def env(self) -> Dict[str, str]:
+        return {"PGPASSWORD": self.database["PASSWORD"]} if self.database.get("PASSWORD") else {}
+
+    def psql(self, database: str = "") -> str:
+        return f"psql -X -q -v ON_ERROR_STOP=1{self.connection_args()} -d {shlex.quote(database or self.name)}"
+
+    def recreate(self) -> List[str]:
+        name = shlex.quote(self.name)
+        drop = f'DROP DATABASE IF EXISTS "{self.name}"'
+        owner = f" -O {shlex.quote(self.database['USER'])}" if self.database.get("USER") else ""
+        return [
+            f"{self.psql('template1')} -c {shlex.quote(drop)}",
+            f"createdb{self.connection_args()}{owner} {name}",
+        ]
+
+    def pg_dump(self, *args: str) -> str:
+        return " ".join([self.bin("pg_dump"), "--no-owner", "--no-privileges", *args, shlex.quote(self.name)])
+
+    def dump(self) -> str:
+        return self.pg_dump()
+
+    def restore(self) -> str:
+        return self.psql()
+
+    def list_tables(self) -> str:
+        query = (
+            "SELECT quote_ident(schemaname) || '.' || quote_ident(tablename) FROM pg_tables "
+            "WHERE schemaname NOT IN ('pg_catalog', 'information_schema') "
+            "ORDER BY pg_total_relation_size(quote_ident(schemaname) || '.' || quote_ident(tablename)) DESC"
+        )
+        return f"{self.bin('psql')} -X -A -t -d {shlex.quote(self.name)} -c {shlex.quote(query)}"
+
+    def dump_schema(self) -> str:
+        return self.pg_dump("--section=pre-data")
+
+    def dump_table(self, table: str, percent: Optional[float]) -> str:
+        if percent is None:
+            return self.pg_dump("--section=data", f"--table={shlex.quote(table)}")
+        query = f"COPY (SELECT * FROM {table} TABLESAMPLE BERNOULLI ({percent})) TO STDOUT"
+        return f"{self.bin('psql')} -X -d {shlex.quote(self.name)} -c {shlex.quote(query)}"
+
+    def restore_table(self, table: str, percent: Optional[float]) -> str:
+        if percent is None:
+            return self.restore()
+        return f"{self.psql()} -c {shlex.quote(f'COPY {table} FROM STDIN')}"
+
+    def dump_post_data(self) -> Optional[str]:
+        return self.pg_dump("--section=post-data")
+
+    def transform_post_data(self, data: bytes, partial: bool) -> bytes:
+        return self.FOREIGN_KEY_RE.sub(rb"\1 NOT VALID;", data) if partial else data
+
+    def finish(self, per_table: bool) -> List[str]:
+        return [f"{self.psql()} -c {shlex.quote(self.RESET_SEQUENCES)}"] if per_table else []
+
+
+class MySQLEngine(Engine):
+    def connection_args(self) -> str:
+        args = []
+        for option, key in (("-h", "HOST"), ("-P", "PORT"), ("-u", "USER")):
+            if self.database.get(key):
+                args += [option, shlex.quote(str(self.database[key]))]
+        return "".join(f" {arg}" for arg in args)
+
+    def env(self) -> Dict[str, str]:
+        return {"MYSQL_PWD": self.database["PASSWORD"]} if self.database.get("PASSWORD") else {}
+
+    def mysql(self) -> str:
+        return f"mysql{self.connection_args()}"
+
+    def recreate(self) -> List[str]:
+        statements = (
+            f"DROP DATABASE IF EXISTS `{self.name}`; "
+            f"CREATE DATABASE `{self.name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci"
+        )
+        return [f"{self.mysql()} -e {shlex.quote(statements)}"]
+
+    def mysqldump(self, *args: str) -> str:
+        return " ".join(
+            [
+                self.bin("mysqldump"),
+                "--single-transaction",
+                "--quick",
+                "--no-tablespaces",
+                *args,
+                shlex.quote(self.name),
+            ]
+        )
+
+    def dump(self) -> str:
+        return self.mysqldump("--routines", "--triggers")
+
+    def restore(self) -> str:
+        return f"{self.mysql()} {shlex.quote(self.name)}"
+
+    def list_tables(self) -> str:
+        query = (
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE() "
+            "AND table_type = 'BASE TABLE' ORDER BY data_length + index_length DESC"
+        )
+        return f"{self.bin('mysql')} -N -B -D {shlex.quote(self.name)} -e {shlex.quote(query)}"
+
+    def dump_schema(self) -> str:
+        # The triggers are created after the data so they don't fire for the restored rows.
+        return self.mysqldump("--no-data", "--routines", "--skip-triggers")
+
+    def dump_table(self, table: str, percent: Optional[float]) -> str:
+        # The dump turns the foreign key checks off, so sampled rows can reference rows that weren't sampled.
+        where = [f"--where={shlex.quote(f'RAND() < {percent / 100}')}"] if percent is not None else []
+        return self.mysqldump("--no-create-info", "--skip-triggers", *where) + f" {shlex.quote(table)}"
+
+    def dump_post_data(self) -> Optional[str]:
+        return self.mysqldump("--no-data", "--no-create-info", "--skip-routines", "--triggers")
+
+
+class SQLiteEngine(Engine):
+    supports_tables = False
+
+    def recreate(self) -> List[str]:
+        return [f"rm -f {shlex.quote(str(self.name))}"]
+
+    def dump(self) -> str:
+        return f"{self.bin('sqlite3')} {shlex.quote(str(self.name))} .dump"
+
+    def restore(self) -> str:
+        return f"sqlite3 {shlex.quote(str(self.name))}"
+
+
+ENGINES = {"postgresql": PostgresEngine, "mysql": MySQLEngine, "sqlite3": SQLiteEngine}
+
+
+def get_engine(database: Dict[str, Any], bin_dirs: Optional[Dict[str, str]] = None) -> Engine:
+    """
+    Returns the engine for the `ENGINE` of a `DATABASES` entry. `bin_dirs` maps vendors to where their dump tools are
+    installed on the source, when they aren't on its `PATH`.
+    """
+    vendor = database["ENGINE"].rsplit(".", 1)[-1].replace("postgresql_psycopg2", "postgresql")
+    if vendor not in ENGINES:
+        raise SyncError(f"Can't sync {database['ENGINE']} databases")
+    return ENGINES[vendor](database, (bin_dirs or {}).get(vendor, ""))
+
+
+def resolve_tables(tables: List[str], names: List[str]) -> Dict[str, str]:
+    """
+    Maps the given table names, with or without their schema, to the tables of the source.
+    """
+    resolved = {}
+    for name in names:
+        matches = [table for table in tables if name in (table, table.split(".", 1)[-1])]
+        if not matches:
+            raise SyncError(f"Unknown table {name}")
+        resolved[name] = matches[0]
+    return resolved
+
+
+def sync_database(
+    engine: Engine,
+    runner: Runner,
+    jobs: int = 1,
+    exclude: Optional[List[str]] = None,
+    sample: Optional[Dict[str, float]] = None,
+    progress: Optional[Progress] = None,
+) -> None:
+    """
+    Recreates the local database and streams the source into it. `exclude` lists tables whose data isn't synced,
+    their schema still is, and `sample` maps tables to the percentage of their rows to sync.
+    """
+    exclude = exclude or []
+    sample = sample or {}
+    progress = progress or Progress()
+    per_table = jobs > 1 or bool(exclude) or bool(sample)
+    if per_table and not engine.supports_tables:
+        raise SyncError(f"{type(engine).__name__} can't sync tables in parallel, exclude or sample them")
+
+    for command in engine.recreate():
+        runner.run(command)
+
+    with progress:
+        if not per_table:
+            runner.stream(engine.dump(), engine.restore(), progress)
+        else:
+            tables = [line.strip() for line in runner.read(engine.list_tables()).splitlines() if line.strip()]
+            excluded = set(resolve_tables(tables, exclude).values())
+            sample = {table: sample[name] for name, table in resolve_tables(tables, list(sample)).items()}
+            tables = [table for table in tables if table not in excluded]
+            progress.items = len(tables)
+            runner.stream(engine.dump_schema(), engine.restore(), progress)
+
+            def sync_table(table: str) -> None:
+                percent = sample.get(table)
+                runner.stream(engine.dump_table(table, percent), engine.restore_table(table, percent), progress)
+                progress.item_done()
+
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                # Consuming the results raises the first error.
+                list(executor.map(sync_table, tables))
+
+            post_data = engine.dump_post_data()
+            if post_data is not None:
+                partial = bool(excluded) or bool(sample)
+                runner.stream(
+                    post_data,
+                    engine.restore(),
+                    progress,
+                    transform=lambda data: engine.transform_post_data(data, partial),
+                )
+        for command in engine.finish(per_table):
+            runner.run(command)
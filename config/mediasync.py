@@ -0,0 +1,317 @@
+"""
+Pulls media from a server or S3 into the local media root for `fab sync_media`, transferring only what changed.
+
+A manifest in the media root records the size, mtime and MD5 of every local file and the version of the source
+object it was synced from: the ETag for S3, the size and mtime for SSH. Files whose source version and local size and
+mtime are unchanged since the last sync are skipped without reading them, files that changed locally are hashed and
+compared with the source checksum where there is one. The rest are downloaded by a pool of workers to `.part` files,
+which a later run resumes from where they stopped when the source object hasn't changed.
+"""
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, List, NamedTuple, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+from config.dbsync import Progress, SyncError
+
+MANIFEST_NAME = ".media-manifest.json"
+PART_SUFFIX = ".part"
+CHUNK_SIZE = 1024 * 1024
+# How many transfers to finish between saves of the manifest, so an interrupted sync doesn't redo them.
+SAVE_EVERY = 100
+
+
+class RemoteFile(NamedTuple):
+    size: int
+    mtime: float
+    # Changes whenever the source object does.
+    version: str
+    # The MD5 of the content when the source knows it.
+    checksum: Optional[str]
+
+
+class LocalFile(NamedTuple):
+    size: int
+    mtime: float
+    checksum: str
+    # The `RemoteFile.version` this file was synced from.
+    version: str
+
+
+def file_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    The local files as of the last sync, and the versions of the partial downloads, saved as JSON in the media root.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self.files: Dict[str, LocalFile] = {}
+        self.partial: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            self.files = {path: LocalFile(*entry) for path, entry in data["files"].items()}
+            self.partial = data["partial"]
+
+    def save(self) -> None:
+        with self._lock:
+            data = {"files": {path: list(entry) for path, entry in self.files.items()}, "partial": dict(self.partial)}
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def scan(self) -> Dict[str, LocalFile]:
+        """
+        Returns the files under the root, reusing the checksums of the manifest for files whose size and mtime didn't
+        change. Files that did change are hashed and lose their source version.
+        """
+        found = {}
+        for directory, _dirs, filenames in os.walk(self.root):
+            for filename in filenames:
+                full_path = os.path.join(directory, filename)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                if path in (MANIFEST_NAME, MANIFEST_NAME + ".tmp") or path.endswith(PART_SUFFIX):
+                    continue
+                stat = os.stat(full_path)
+                entry = self.files.get(path)
+                if entry is None or entry.size != stat.st_size or entry.mtime != stat.st_mtime:
+                    entry = LocalFile(stat.st_size, stat.st_mtime, file_md5(full_path), "")
+                found[path] = entry
+        return found
+
+    def start(self, path: str, version: str) -> None:
+        with self._lock:
+            self.partial[path] = version
+
+    def record(self, path: str, entry: LocalFile) -> None:
+        with self._lock:
+            self.files[path] = entry
+            self.partial.pop(path, None)
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            self.files.pop(path, None)
+            self.partial.pop(path, None)
+
+
+class Source:
+    """
+    Lists the media of a server or bucket and writes objects to local files, optionally from an offset.
+    """
+
+    def list(self) -> Dict[str, RemoteFile]:
+        raise NotImplementedError
+
+    def download(self, path: str, version: str, out: IO[bytes], offset: int, progress: Progress) -> None:
+        """
+        Writes the object from `offset` on, failing when it's no longer at `version` where the source can tell.
+        """
+        raise NotImplementedError
+
+
+class SSHSource(Source):
+    """
+    Media in a directory of a server, read over one multiplexed ssh connection. `host` `None` reads it locally.
+    """
+
+    def __init__(self, host: Optional[str], root: str):
+        self.host = host
+        self.root = root.rstrip("/")
+
+    def command(self, command: str) -> List[str]:
+        if self.host is None:
+            return ["sh", "-c", command]
+        control = [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            "ControlPath=~/.ssh/media-sync-%r@%h:%p",
+            "-o",
+            "ControlPersist=60",
+        ]
+        return ["ssh", *control, self.host, command]
+
+    def list(self) -> Dict[str, RemoteFile]:
+        command = f"cd {shlex.quote(self.root)} && find . -type f -printf '%P\\t%s\\t%T@\\n'"
+        result = subprocess.run(self.command(command), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode:
+            raise SyncError(f"Listing {self.root} failed: {result.stderr.decode().strip()}")
+        files = {}
+        for line in result.stdout.decode().splitlines():
+            path, size, mtime = line.rsplit("\t", 2)
+            files[path] = RemoteFile(int(size), float(mtime), f"{size}:{mtime}", None)
+        return files
+
+    def download(self, path: str, version: str, out: IO[bytes], offset: int, progress: Progress) -> None:
+        command = f"tail -c +{offset + 1} {shlex.quote(f'{self.root}/{path}')}"
+        process = subprocess.Popen(self.command(command), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        assert process.stdout is not None
+        for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b""):  # type: ignore
+            out.write(chunk)
+            progress.add(len(chunk))
+        if process.wait():
+            raise SyncError(f"Reading {path} failed: {process.stderr.read().decode().strip()}")  # type: ignore
+
+
+class S3Source(Source):
+    """
+    Media in an S3 bucket under `prefix`, as `apps.base.storage.MediaS3Storage` stores it.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "media", client: Any = None, **client_kwargs: Any):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix else ""
+        self.client = client or boto3.client("s3", **client_kwargs)
+
+    def list(self) -> Dict[str, RemoteFile]:
+        files = {}
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                etag = obj["ETag"].strip('"')
+                files[obj["Key"][len(self.prefix) :]] = RemoteFile(
+                    obj["Size"],
+                    obj["LastModified"].timestamp(),
+                    etag,
+                    # Multipart uploads have an ETag that isn't the MD5 of the content.
+                    None if "-" in etag else etag,
+                )
+        return files
+
+    def download(self, path: str, version: str, out: IO[bytes], offset: int, progress: Progress) -> None:
+        # A resumed download must continue the same object as the part that's already there.
+        kwargs = {"IfMatch": f'"{version}"'}
+        if offset:
+            kwargs["Range"] = f"bytes={offset}-"
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self.prefix + path, **kwargs)["Body"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "412"):
+                raise SyncError(f"{path} changed on the source during the sync, it will be downloaded again")
+            raise
+        for chunk in iter(lambda: body.read(CHUNK_SIZE), b""):
+            out.write(chunk)
+            progress.add(len(chunk))
+
+
+def get_changes(remote: Dict[str, RemoteFile], local: Dict[str, LocalFile]) -> List[str]:
+    """
+    Returns the paths to download: the source objects that are missing locally, changed since they were synced, or
+    that differ from a local file that was changed or never synced.
+    """
+    changes = []
+    for path, remote_file in remote.items():
+        local_file = local.get(path)
+        if local_file is None or local_file.size != remote_file.size:
+            changes.append(path)
+        elif local_file.version == remote_file.version:
+            continue
+        elif remote_file.checksum is None or remote_file.checksum != local_file.checksum:
+            changes.append(path)
+    return changes
+
+
+def transfer(source: Source, manifest: Manifest, path: str, remote_file: RemoteFile, progress: Progress) -> None:
+    full_path = os.path.join(manifest.root, *path.split("/"))
+    part_path = full_path + PART_SUFFIX
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    # Resume a partial download of the same version of the object.
+    offset = 0
+    if manifest.partial.get(path) == remote_file.version and os.path.exists(part_path):
+        offset = min(os.path.getsize(part_path), remote_file.size)
+    manifest.start(path, remote_file.version)
+    with open(part_path, "ab" if offset else "wb") as out:
+        if offset < remote_file.size:
+            source.download(path, remote_file.version, out, offset, progress)
+
+    size = os.path.getsize(part_path)
+    checksum = file_md5(part_path)
+    if size != remote_file.size or (remote_file.checksum is not None and checksum != remote_file.checksum):
+        os.remove(part_path)
+        manifest.forget(path)
+        raise SyncError(f"{path} doesn't match the source after the transfer, it will be downloaded again")
+    os.utime(part_path, (remote_file.mtime, remote_file.mtime))
+    os.replace(part_path, full_path)
+    manifest.record(path, LocalFile(size, os.stat(full_path).st_mtime, checksum, remote_file.version))
+
+
+def sync_media(
+    source: Source,
+    root: str,
+    workers: int = 8,
+    delete: bool = False,
+    progress: Optional[Progress] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Downloads the changed media into `root` and returns their paths. With `delete`, local files that are no longer
+    on the source are removed too.
+    """
+    progress = progress or Progress(label="files")
+    manifest = Manifest(root)
+    local = manifest.scan()
+    remote = source.list()
+    # Local files that match the source without having been synced with this manifest, such as files copied by the
+    # rsync this replaces, which kept the mtimes.
+    for path, local_file in local.items():
+        remote_file = remote.get(path)
+        if remote_file is None or local_file.version == remote_file.version or local_file.size != remote_file.size:
+            continue
+        if remote_file.checksum is not None:
+            matches = remote_file.checksum == local_file.checksum
+        else:
+            matches = abs(local_file.mtime - remote_file.mtime) < 1
+        if matches:
+            local[path] = local_file._replace(version=remote_file.version)
+    manifest.files = local
+    changes = get_changes(remote, local)
+    removed = sorted(set(local) - set(remote)) if delete else []
+    if dry_run:
+        return changes + removed
+
+    for path in removed:
+        os.remove(os.path.join(root, *path.split("/")))
+        manifest.forget(path)
+
+    progress.items = len(changes)
+    errors = []
+    completed = 0
+
+    def sync_file(path: str) -> None:
+        transfer(source, manifest, path, remote[path], progress)
+        progress.item_done()
+
+    try:
+        with progress, ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(path, executor.submit(sync_file, path)) for path in changes]
+            for path, future in futures:
+                try:
+                    future.result()
+                except (SyncError, OSError) as e:
+                    errors.append(f"{path}: {e}")
+                completed += 1
+                if completed % SAVE_EVERY == 0:
+                    manifest.save()
+    finally:
+        manifest.save()
+    if errors:
+        raise SyncError(f"{len(errors)} files failed to sync:\n" + "\n".join(errors))
+    return changes + removed
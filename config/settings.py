@@ -41,8 +41,9 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.sites",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    # Before staticfiles, so its `collectstatic` command is the one that runs.
     "apps.base",
+    "django.contrib.staticfiles",
     "django.forms",
     "apps.accounts",
     "allauth",
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.base.profiling.ProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -64,13 +66,46 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "config.urls"
 
+# REQUEST PROFILER
+# Share of the requests profiled by apps.base.profiling.ProfilerMiddleware, from 0 (off) to 1 (every request). The
+# profiles are logged to the apps.base.profiling logger and the last ones are kept at /admin/profiler/.
+PROFILER_SAMPLE_RATE = env.float("PROFILER_SAMPLE_RATE", default=0.0)
+PROFILER_BUFFER_SIZE = env.int("PROFILER_BUFFER_SIZE", default=200)
+# A statement run this many times in one request is reported as a repeated (N+1) query
+PROFILER_REPEATED_QUERY_THRESHOLD = 5
+# Limits per URL name on the values of a profile: queries, duplicate_queries, duration, query_time and render_time,
+# with the times in milliseconds. Profiled requests over budget are logged as warnings.
+PROFILER_BUDGETS = {
+    "recipes:list": {"queries": 10, "duplicate_queries": 0, "duration": 100},
+    # A save writes the recipe, both M2M fields and their masks.
+    "recipes:create": {"queries": 15, "duplicate_queries": 0, "duration": 100},
+    "recipes:update": {"queries": 15, "duplicate_queries": 0, "duration": 100},
+    "recipes:validate": {"queries": 5, "duration": 50},
+    "recipes:form_schema": {"queries": 5, "duration": 50},
+    "recipe-list": {"queries": 5, "duplicate_queries": 0, "duration": 100},
+    "user-list": {"queries": 2, "duplicate_queries": 0, "duration": 100},
+}
+
 FORM_RENDERER = "django.forms.renderers.TemplatesSetting"
 
+# Build the hybrid forms from their cached JSON schema in the browser instead of rendering every field on the server
+HYBRID_FORM_SCHEMA = env.bool("HYBRID_FORM_SCHEMA", default=False)
+
+# Production template mode: templates are compiled once per worker by the cached loader, preloaded and validated
+# when the worker starts (see config/wsgi.py) and the hybrid form widget templates are reused between renders
+PRODUCTION_TEMPLATES = env.bool("PRODUCTION_TEMPLATES", default=not DEBUG)
+
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if PRODUCTION_TEMPLATES is True:
+    TEMPLATE_LOADERS = [("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -78,7 +113,8 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "apps.base.context_processors.site_name",
-            ]
+            ],
+            "loaders": TEMPLATE_LOADERS,
         },
     }
 ]
@@ -148,9 +184,15 @@ if DEFAULT_FILE_STORAGE.endswith("MediaS3Storage") is True:
     AWS_S3_REGION = env("AWS_S3_REGION", default="us-east-2")
     AWS_S3_CUSTOM_DOMAIN = f"s3.{AWS_S3_REGION}.amazonaws.com/{AWS_STORAGE_BUCKET_NAME}"
     AWS_S3_OBJECT_PARAMETERS = {"CacheControl": "max-age=86400"}
+    # The MD5s of the static files in the bucket as of the last `collectstatic`, so unchanged files aren't uploaded.
+    STATICFILES_UPLOAD_CACHE = env(
+        "STATICFILES_UPLOAD_CACHE", default=str(BASE_DIR.joinpath(".staticfiles-cache.json"))
+    )
+    STATICFILES_UPLOAD_WORKERS = env.int("STATICFILES_UPLOAD_WORKERS", default=16)
     STATIC_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/static/"
     MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/media/"
     STATICFILES_DIRS = [str(BASE_DIR.joinpath("public", "static"))]
+    SERVE_STATIC = False
 
 else:
     # Local Storage
@@ -160,19 +202,56 @@ else:
     STATICFILES_DIRS = [str(BASE_DIR.joinpath("public", "static"))]
     MEDIA_URL = "/public/media/"
     STATIC_URL = "/public/static/"
+    # Collected with hashed names and precompressed siblings, served by apps.base.views.serve_static.
+    STATICFILES_STORAGE = env(
+        "STATICFILES_STORAGE",
+        default="django.contrib.staticfiles.storage.StaticFilesStorage"
+        if DEBUG
+        else "apps.base.storage.CompressedManifestStaticFilesStorage",
+    )
+    SERVE_STATIC = env.bool("SERVE_STATIC", default=not DEBUG)
 
 # CACHE SETTINGS
-CACHE_URL_DEFAULT = "redis://redis:6379/0"
+CACHE_URL_DEFAULT = "redis://redis:6379/0?tiered=true"
 CACHES = {"default": env.cache_url("CACHE_URL", default=CACHE_URL_DEFAULT)}
 
 # CRISPY-FORMS
 CRISPY_TEMPLATE_PACK = "bootstrap4"
 
 # CELERY SETTINGS
-CELERY_BROKER_URL = env("CACHE_URL", CACHE_URL_DEFAULT)
+# CACHE_URL without the options of the cache backend, which the broker doesn't understand
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default=env.broker_url("CACHE_URL", default=CACHE_URL_DEFAULT))
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", default=False)
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    "apps.recipes.tasks.*": {"queue": "derived"},
+    "apps.base.tasks.send_emails": {"queue": "email"},
+}
+# Acknowledge messages after the task ran, so tasks of a worker that dies are delivered again.
+CELERY_TASK_ACKS_LATE = env.bool("CELERY_TASK_ACKS_LATE", default=True)
+CELERY_TASK_REJECT_ON_WORKER_LOST = CELERY_TASK_ACKS_LATE
+CELERY_WORKER_PREFETCH_MULTIPLIER = env.int("CELERY_WORKER_PREFETCH_MULTIPLIER", default=1)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_EXPIRES = env.int("CELERY_RESULT_EXPIRES", default=60 * 60)
+# Worker processes of each queue, for `manage.py run_workers`
+TASK_QUEUE_CONCURRENCY = env.dict(
+    "TASK_QUEUE_CONCURRENCY", subcast_values=int, default={"default": 2, "derived": 2, "email": 1}
+)
+# Passed to the tasks that retry on errors, see https://docs.celeryq.dev/en/stable/userguide/tasks.html#retrying
+TASK_RETRY_POLICY = {
+    "max_retries": env.int("TASK_MAX_RETRIES", default=5),
+    "retry_backoff": True,
+    "retry_backoff_max": 60 * 10,
+    "retry_jitter": True,
+}
+# How long an id enqueued by apps.base.tasks.enqueue_on_commit keeps it from being enqueued again for the same task
+TASK_DEDUPLICATION_TIMEOUT = env.int("TASK_DEDUPLICATION_TIMEOUT", default=60 * 10)
 
-SESSION_ENGINE = "redis_sessions.session"
+SESSION_ENGINE = "apps.base.sessions"
 SESSION_REDIS = env.session_redis_url("CACHE_URL", default=CACHE_URL_DEFAULT)
+# Keeps the sessions of anonymous visitors in a signed cookie instead of redis, see apps.base.sessions
+SESSION_ANONYMOUS_SIGNED_COOKIE = env.bool("SESSION_ANONYMOUS_SIGNED_COOKIE", default=False)
 
 SITE_ID = 1
 SITE_NAME = "Hybrid Form Example"
@@ -201,8 +280,15 @@ EMAIL_PORT = email["EMAIL_PORT"]
 EMAIL_HOST_PASSWORD = email["EMAIL_HOST_PASSWORD"]
 EMAIL_HOST_USER = email["EMAIL_HOST_USER"]
 EMAIL_USE_TLS = email["EMAIL_USE_TLS"]
+# Email is queued for the workers, which send it with EMAIL_DELIVERY_BACKEND.
+EMAIL_BACKEND = env("EMAIL_BACKEND", default="apps.base.mail.CeleryEmailBackend")
+EMAIL_DELIVERY_BACKEND = email["EMAIL_BACKEND"]
+EMAIL_BATCH_SIZE = env.int("EMAIL_BATCH_SIZE", default=50)
+
+TESTING = "test" in sys.argv
+BENCHMARKING = "run_benchmarks" in sys.argv
 
-if "test" in sys.argv:
+if TESTING:
 
     PASSWORD_HASHERS = (
         "django.contrib.auth.hashers.MD5PasswordHasher",
@@ -211,4 +297,13 @@ if "test" in sys.argv:
 
     AUTHENTICATION_BACKENDS = ("django.contrib.auth.backends.ModelBackend",)
 
+if TESTING or BENCHMARKING:
+
+    # The tests and benchmarks use a throwaway SQLite database and need no outside services
     DATABASES["default"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+    CELERY_BROKER_URL = "memory://"
+    CELERY_TASK_ALWAYS_EAGER = True
+    # Pages render without a collected manifest
+    STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
@@ -0,0 +1,153 @@
+import os
+import shlex
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from typing import Callable, Dict, List, Optional
+from unittest import skipIf
+
+from django.test import SimpleTestCase
+
+from config import dbsync
+
+POST_DATA = b"""ALTER TABLE ONLY public.recipes_recipe
+    ADD CONSTRAINT recipes_recipe_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.recipes_recipe
+    ADD CONSTRAINT recipes_recipe_type_fk FOREIGN KEY (recipe_type_id) REFERENCES public.recipes_recipetype(id);
+"""
+
+
+class FakeRunner(dbsync.Runner):
+    """
+    Records the commands instead of running them, and streams canned output for the source commands.
+    """
+
+    def __init__(self, outputs: Dict[str, bytes]):
+        super().__init__()
+        self.outputs = outputs
+        self.commands: List[str] = []
+        self.streamed: Dict[str, bytes] = {}
+
+    def read(self, command: str) -> str:
+        return self.outputs[command].decode()
+
+    def run(self, command: str) -> None:
+        self.commands.append(command)
+
+    def stream(
+        self,
+        source_command: str,
+        target_command: str,
+        progress: dbsync.Progress,
+        transform: Optional[Callable[[bytes], bytes]] = None,
+    ) -> None:
+        data = self.outputs.get(source_command, b"")
+        if transform is not None:
+            data = transform(data)
+        progress.add(len(data))
+        self.commands.append(source_command)
+        self.streamed[source_command] = data
+
+
+class PostgresSyncTests(SimpleTestCase):
+    tables = ["public.recipes_recipe", "public.django_session", "public.recipes_recipetype"]
+
+    def setUp(self):
+        self.engine = dbsync.get_engine({"ENGINE": "django.db.backends.postgresql", "NAME": "app"})
+        self.runner = FakeRunner(
+            {
+                self.engine.list_tables(): "\n".join(self.tables).encode(),
+                self.engine.dump_post_data(): POST_DATA,
+            }
+        )
+
+    def sync(self, **kwargs) -> bytes:
+        dbsync.sync_database(self.engine, self.runner, progress=dbsync.Progress(out=StringIO()), **kwargs)
+        return self.runner.streamed[self.engine.dump_post_data()]
+
+    def test_tables_are_synced_in_order(self):
+        self.sync(jobs=1, exclude=["django_session"])
+        dump_tables = [self.engine.dump_table(table, None) for table in self.tables if "session" not in table]
+        self.assertEqual(
+            self.runner.commands,
+            [
+                *self.engine.recreate(),
+                self.engine.dump_schema(),
+                *dump_tables,
+                self.engine.dump_post_data(),
+                *self.engine.finish(True),
+            ],
+        )
+
+    def test_foreign_keys_stay_validated_for_full_tables(self):
+        post_data = self.sync(jobs=2)
+        self.assertEqual(post_data, POST_DATA)
+
+    def test_foreign_keys_are_not_validated_with_excluded_tables(self):
+        post_data = self.sync(exclude=["recipes_recipetype"])
+        self.assertIn(b"REFERENCES public.recipes_recipetype(id) NOT VALID;", post_data)
+        self.assertIn(b"PRIMARY KEY (id);", post_data)
+        self.assertNotIn(self.engine.dump_table("public.recipes_recipetype", None), self.runner.commands)
+
+    def test_foreign_keys_are_not_validated_with_sampled_tables(self):
+        post_data = self.sync(sample={"recipes_recipe": 10})
+        self.assertIn(b"NOT VALID;", post_data)
+        self.assertIn(self.engine.dump_table("public.recipes_recipe", 10), self.runner.commands)
+        self.assertIn("TABLESAMPLE BERNOULLI (10)", self.engine.dump_table("public.recipes_recipe", 10))
+
+    def test_unknown_tables_are_refused(self):
+        with self.assertRaisesMessage(dbsync.SyncError, "Unknown table missing"):
+            self.sync(exclude=["missing"])
+
+
+class LocalSourceRunner(dbsync.Runner):
+    """
+    Runs the source commands in another directory, as a stand-in for the server.
+    """
+
+    def __init__(self, source_dir: str):
+        super().__init__()
+        self.source_dir = source_dir
+
+    def source_args(self, command: str) -> List[str]:
+        return ["sh", "-c", f"cd {shlex.quote(self.source_dir)} 2>/dev/null && {command}"]
+
+
+@skipIf(shutil.which("sqlite3") is None, "the sqlite3 command line tool is not installed")
+class SQLiteSyncTests(SimpleTestCase):
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.target_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source_dir)
+        self.addCleanup(shutil.rmtree, self.target_dir)
+        cwd = os.getcwd()
+        os.chdir(self.target_dir)
+        self.addCleanup(os.chdir, cwd)
+        self.engine = dbsync.get_engine({"ENGINE": "django.db.backends.sqlite3", "NAME": "db.sqlite3"})
+
+    def test_database_is_streamed(self):
+        with sqlite3.connect(os.path.join(self.source_dir, "db.sqlite3")) as source:
+            source.execute("CREATE TABLE recipe (id INTEGER PRIMARY KEY, name TEXT)")
+            source.executemany("INSERT INTO recipe (name) VALUES (?)", [(f"Recipe {i}",) for i in range(100)])
+        with open("db.sqlite3", "w") as f:
+            f.write("stale")
+
+        progress = dbsync.Progress(out=StringIO())
+        dbsync.sync_database(self.engine, LocalSourceRunner(self.source_dir), progress=progress)
+
+        with sqlite3.connect(os.path.join(self.target_dir, "db.sqlite3")) as target:
+            self.assertEqual(target.execute("SELECT COUNT(*), MAX(name) FROM recipe").fetchone(), (100, "Recipe 99"))
+        self.assertGreater(progress.bytes, 0)
+
+    def test_tables_cant_be_synced_separately(self):
+        with self.assertRaisesMessage(dbsync.SyncError, "SQLiteEngine can't sync tables"):
+            dbsync.sync_database(self.engine, LocalSourceRunner(self.source_dir), jobs=2)
+
+    def test_failed_dump_raises(self):
+        with self.assertRaises(dbsync.SyncError):
+            dbsync.sync_database(
+                self.engine,
+                LocalSourceRunner(os.path.join(self.source_dir, "missing")),
+                progress=dbsync.Progress(out=StringIO()),
+            )
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+from typing import Dict
+from unittest import skipIf
+
+from django.test import SimpleTestCase
+
+from config import mediasync
+from config.dbsync import Progress, SyncError
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+def write(root: str, path: str, content: bytes) -> str:
+    full_path = os.path.join(root, *path.split("/"))
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "wb") as f:
+        f.write(content)
+    return full_path
+
+
+def read_tree(root: str) -> Dict[str, bytes]:
+    files = {}
+    for directory, _dirs, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, "/")
+            if path != mediasync.MANIFEST_NAME:
+                with open(os.path.join(directory, filename), "rb") as f:
+                    files[path] = f.read()
+    return files
+
+
+class MediaSyncTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def sync(self, source: mediasync.Source, **kwargs):
+        progress = Progress(out=StringIO(), label="files")
+        return mediasync.sync_media(source, self.root, workers=2, progress=progress, **kwargs), progress
+
+
+class LocalSourceTests(MediaSyncTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source_root)
+        self.source = mediasync.SSHSource(None, self.source_root)
+        write(self.source_root, "recipes/toast.jpg", b"toast" * 1000)
+        write(self.source_root, "avatar.png", b"avatar")
+
+    def test_only_changes_are_transferred(self):
+        changes, _ = self.sync(self.source)
+        self.assertEqual(sorted(changes), ["avatar.png", "recipes/toast.jpg"])
+        self.assertEqual(read_tree(self.root), read_tree(self.source_root))
+
+        changes, progress = self.sync(self.source)
+        self.assertEqual(changes, [])
+        self.assertEqual(progress.bytes, 0)
+
+        write(self.source_root, "avatar.png", b"new avatar")
+        changes, _ = self.sync(self.source)
+        self.assertEqual(changes, ["avatar.png"])
+        self.assertEqual(read_tree(self.root)["avatar.png"], b"new avatar")
+
+    def test_removed_files_are_deleted_on_request(self):
+        self.sync(self.source)
+        os.remove(os.path.join(self.source_root, "avatar.png"))
+        self.assertEqual(self.sync(self.source, dry_run=True)[0], [])
+        self.assertEqual(self.sync(self.source, delete=True, dry_run=True)[0], ["avatar.png"])
+        self.assertIn("avatar.png", read_tree(self.root))
+        self.sync(self.source, delete=True)
+        self.assertEqual(read_tree(self.root), read_tree(self.source_root))
+
+    def test_partial_downloads_are_resumed(self):
+        remote = self.source.list()["recipes/toast.jpg"]
+        write(self.root, "recipes/toast.jpg.part", b"toast" * 400)
+        manifest = mediasync.Manifest(self.root)
+        manifest.start("recipes/toast.jpg", remote.version)
+        manifest.save()
+
+        _, progress = self.sync(self.source)
+        self.assertEqual(progress.bytes, len(b"toast" * 600) + len(b"avatar"))
+        self.assertEqual(read_tree(self.root), read_tree(self.source_root))
+
+    def test_partial_downloads_of_another_version_start_over(self):
+        write(self.root, "recipes/toast.jpg.part", b"stale" * 400)
+        manifest = mediasync.Manifest(self.root)
+        manifest.start("recipes/toast.jpg", "1:1")
+        manifest.save()
+
+        self.sync(self.source)
+        self.assertEqual(read_tree(self.root), read_tree(self.source_root))
+
+
+@skipIf(mock_aws is None, "moto is not installed")
+class S3SourceTests(MediaSyncTestMixin, SimpleTestCase):
+    bucket = "media-bucket"
+
+    def setUp(self):
+        super().setUp()
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.client = boto3.client("s3", region_name="us-east-1")
+        self.client.create_bucket(Bucket=self.bucket)
+        self.source = mediasync.S3Source(self.bucket, client=self.client)
+        self.put("recipes/toast.jpg", b"toast" * 1000)
+
+    def put(self, path: str, content: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=f"media/{path}", Body=content)
+
+    def test_objects_are_listed_with_their_md5(self):
+        remote = self.source.list()
+        self.assertEqual(list(remote), ["recipes/toast.jpg"])
+        self.assertEqual(remote["recipes/toast.jpg"].checksum, hashlib.md5(b"toast" * 1000).hexdigest())
+
+    def test_only_changes_are_transferred(self):
+        self.assertEqual(self.sync(self.source)[0], ["recipes/toast.jpg"])
+        self.assertEqual(read_tree(self.root), {"recipes/toast.jpg": b"toast" * 1000})
+        self.assertEqual(self.sync(self.source)[0], [])
+        self.put("recipes/toast.jpg", b"bread")
+        self.assertEqual(self.sync(self.source)[0], ["recipes/toast.jpg"])
+        self.assertEqual(read_tree(self.root), {"recipes/toast.jpg": b"bread"})
+
+    def test_partial_downloads_are_resumed(self):
+        remote = self.source.list()["recipes/toast.jpg"]
+        write(self.root, "recipes/toast.jpg.part", b"toast" * 400)
+        manifest = mediasync.Manifest(self.root)
+        manifest.start("recipes/toast.jpg", remote.version)
+        manifest.save()
+
+        _, progress = self.sync(self.source)
+        self.assertEqual(progress.bytes, len(b"toast" * 600))
+        self.assertEqual(read_tree(self.root), {"recipes/toast.jpg": b"toast" * 1000})
+
+    def test_resume_fails_when_the_object_changed(self):
+        remote = self.source.list()["recipes/toast.jpg"]
+        write(self.root, "recipes/toast.jpg.part", b"toast" * 400)
+        manifest = mediasync.Manifest(self.root)
+        manifest.start("recipes/toast.jpg", remote.version)
+        # Replaced between the listing and the download, with the same size.
+        self.put("recipes/toast.jpg", b"bread" * 1000)
+
+        with self.assertRaisesMessage(SyncError, "recipes/toast.jpg changed on the source during the sync"):
+            mediasync.transfer(self.source, manifest, "recipes/toast.jpg", remote, Progress(out=StringIO()))
+        self.sync(self.source)
+        self.assertEqual(read_tree(self.root), {"recipes/toast.jpg": b"bread" * 1000})
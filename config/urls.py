@@ -3,10 +3,11 @@ from typing import List
 from django.conf import settings
 from django.contrib import admin
 from django.shortcuts import redirect
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 from apps.accounts.urls import accounts_router
-from apps.base.views import NameChange, http_404, http_500
+from apps.base.views import NameChange, ProfilerView, http_404, http_500, serve_static
+from apps.recipes.urls import recipes_router
 
 urlpatterns: List[path] = []
 
@@ -20,7 +21,10 @@ if settings.DEBUG is True:
     ]
 
 # Includes
-urlpatterns += [path(r"admin/", admin.site.urls)]
+urlpatterns += [
+    path("admin/profiler/", ProfilerView.as_view(), name="profiler"),
+    path(r"admin/", admin.site.urls),
+]
 
 
 def index(request):
@@ -32,8 +36,12 @@ urlpatterns += [
     path("", index, name="index"),
     path("recipes/", include("apps.recipes.urls", namespace="recipes")),
     path("api/accounts/", include(accounts_router.urls)),
+    path("api/recipes/", include(recipes_router.urls)),
     path("500/", http_500),
     path("404/", http_404),
     path("accounts/name/", NameChange.as_view(), name="account_change_name"),
     path("accounts/", include("allauth.urls")),
 ]
+
+if settings.SERVE_STATIC is True:
+    urlpatterns += [re_path(rf"^{settings.STATIC_URL.lstrip('/')}(?P<path>.*)$", serve_static)]
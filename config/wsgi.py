@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.PRODUCTION_TEMPLATES:
+    from apps.base.warmup import warm_worker  # noqa: E402
+
+    warm_worker()
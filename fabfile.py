@@ -1,13 +1,19 @@
+import os
+
 from django.conf import settings as dja_settings
 
-from fabric.api import cd, env, execute, local, roles, run, settings, sudo, task
+from fabric.api import abort, cd, env, execute, local, roles, settings, sudo, task
 from fabric.colors import green
 
+from config import dbsync, mediasync
+
 env.roledefs = {"db": ["db.example.com"], "web": ["appserv.example.com"]}
 env.code_dir = "/srv/sites/example"
 env.virtualenv = "/usr/local/virtualenvs/example"
 env.django_project_root = dja_settings.BASE_DIR
 env.django_settings_module = "config.settings"
+# Where the dump tools are installed on the database server, by vendor
+env.db_bin_dirs = {"postgresql": "/usr/local/pgsql/bin"}
 env.nginx_confs = ("example.com.conf",)
 env.upstart_confs = ("celeryd_example.com.conf", "gunicorn_example.com.conf")
 env.cron_config_files = ("example_task",)
@@ -15,35 +21,52 @@ env.cron_config_files = ("example_task",)
 
 @task
 @roles("db")
-def sync_database():
-    "Refreshes the local copy of the database passed in by pulling it from the server specified"
-
-    params = {"db_name": dja_settings.DATABASES["default"]["NAME"]}
-    params.update(env)
-
-    # dump the database and compress it on the remote server
-    run("/usr/local/pgsql/bin/pg_dump %(db_name)s | gzip > /tmp/%(db_name)s.sql.gz" % params)
-
-    # securely copy the compressed file to local temporary storage
-    local("scp %(host)s:/tmp/%(db_name)s.sql.gz /tmp/" % params)
-
-    print("Creating database...[%s]" % green(params["db_name"], True))
-
-    # drop it if it exists and re-create
-    local('psql -d template1 -c "drop database if exists %(db_name)s;" && createdb %(db_name)s -O %(db_name)s' % params)
-
-    # unzip the temp file and restore
-    local("gunzip -f /tmp/%(db_name)s.sql.gz" % params)
-    local("cat /tmp/%(db_name)s.sql | psql %(db_name)s" % params)
-    local("rm /tmp/%(db_name)s.sql" % params)
-    run("rm /tmp/%(db_name)s.sql.gz" % params)
+def sync_database(jobs=1, exclude="", sample="", compress=True):
+    """Streams the database from the server into a fresh local database, without temporary files
+    Usage: fab sync_database:jobs=4,exclude=django_session;recipes_recipesearchdocument,sample=recipes_recipe=10
+    `exclude` skips the data of tables, `sample` syncs a percentage of the rows of tables, see config/dbsync.py"""
+    engine = dbsync.get_engine(dja_settings.DATABASES["default"], env.db_bin_dirs)
+    runner = dbsync.Runner(env.host_string, compress=str(compress).lower() in ("1", "true", "yes"), env=engine.env())
+    sampled = dict(item.split("=", 1) for item in sample.split(";") if item)
+
+    print("Creating database...[%s]" % green(engine.name, True))
+    try:
+        dbsync.sync_database(
+            engine,
+            runner,
+            jobs=int(jobs),
+            exclude=[table for table in exclude.split(";") if table],
+            sample={table: float(percent) for table, percent in sampled.items()},
+        )
+    except dbsync.SyncError as e:
+        abort(str(e))
 
 
 @task
 @roles("web")
-def sync_media():
-    "Pulls and syncs photos from the production server your local dev instance"
-    local("rsync -avz -e ssh %s:%s/media/ %s/media/" % (env.host, env.code_dir, env.django_project_root))
+def sync_media(source="ssh", workers=8, delete=False, dry_run=False):
+    """Pulls the media changed since the last sync from the production server or its S3 bucket
+    Usage: fab sync_media:source=s3,workers=16,delete=true
+    The S3 source reads the bucket and credentials from the AWS_* environment variables, see config/mediasync.py"""
+    if source == "s3":
+        media_source = mediasync.S3Source(
+            os.environ["AWS_STORAGE_BUCKET_NAME"],
+            region_name=os.environ.get("AWS_S3_REGION", "us-east-2"),
+            endpoint_url=os.environ.get("AWS_S3_ENDPOINT_URL"),
+        )
+    else:
+        media_source = mediasync.SSHSource(env.host, "%s/media" % env.code_dir)
+    try:
+        changes = mediasync.sync_media(
+            media_source,
+            dja_settings.MEDIA_ROOT,
+            workers=int(workers),
+            delete=str(delete).lower() in ("1", "true", "yes"),
+            dry_run=str(dry_run).lower() in ("1", "true", "yes"),
+        )
+    except dbsync.SyncError as e:
+        abort(str(e))
+    print("Synced %s files" % green(len(changes), True))
 
 
 @task
@@ -1,20 +1,53 @@
-import {createApp} from 'vue';
+import {createApp, h} from 'vue';
 import SelectInput from '@/js/components/forms/SelectInput';
 import TextInput from '@/js/components/forms/TextInput';
 import NumberInput from '@/js/components/forms/NumberInput';
 import TextareaInput from '@/js/components/forms/TextareaInput';
 import RadioGroupInput from '@/js/components/forms/RadioGroupInput';
 
-window.SetupForms = ({csrfToken, conditional = true, urls = {}} = {}) => {
-  const app = createApp({}),
-        globalComponents = [
-          TextareaInput,
-          SelectInput,
-          TextInput,
-          NumberInput,
-          RadioGroupInput,
-        ];
+const globalComponents = [
+  TextareaInput,
+  SelectInput,
+  TextInput,
+  NumberInput,
+  RadioGroupInput,
+];
 
+/**
+ * Builds the props of a form component from a field of the JSON form schema, the same props the
+ * hybrid_forms/widgets templates render.
+ */
+const schemaFieldProps = (field, {values = {}, errors = {}}) => {
+  const props = {
+    ref: field.name,
+    name: field.name,
+    label: field.label,
+    helpText: field.help_text,
+    hideLabel: false,
+    modelValue: values[field.name] === undefined ? '' : values[field.name],
+    required: field.required,
+    disabled: field.disabled,
+    errors: errors[field.name] || [],
+  };
+
+  if (field.options) {
+    props.options = field.options;
+    props.optionLabel = 'name';
+    props.optionValue = 'value';
+  }
+  if (field.component === 'SelectInput') {
+    props.modelValue = props.modelValue || [];
+    props.clearable = true;
+    props.multiple = field.multiple;
+  } else if (field.component === 'TextAreaInput') {
+    props.rows = 5;
+  } else if (field.component === 'NumberInput') {
+    props.step = 1;
+  }
+  return props;
+};
+
+const setupApp = (app, el, {csrfToken, conditional, urls}) => {
   // Register global components
   globalComponents.forEach((component) => {
     app.component(component.name, component);
@@ -24,5 +57,35 @@ window.SetupForms = ({csrfToken, conditional = true, urls = {}} = {}) => {
   app.provide('conditional', conditional);
   app.provide('urls', urls);
 
-  app.mount('#vue-form');
+  app.mount(el);
+};
+
+/**
+ * Mounts the form components. By default the components are already rendered into the `#vue-form` markup by the
+ * hybrid_form template tag. When a `schemaUrl` is given, the components are built into `#vue-form-fields` from the
+ * cached JSON form schema and the `formData` values and errors instead.
+ */
+window.SetupForms = ({csrfToken, conditional = true, urls = {}, schemaUrl = '', formData = {}} = {}) => {
+  const options = {csrfToken, conditional, urls};
+
+  if (!schemaUrl) {
+    setupApp(createApp({}), '#vue-form', options);
+    return Promise.resolve();
+  }
+
+  const components = Object.fromEntries(globalComponents.map((component) => [component.name, component]));
+
+  return fetch(schemaUrl, {credentials: 'same-origin'})
+    .then((response) => response.json())
+    .then((schema) => {
+      const app = createApp({
+        render() {
+          return schema.fields.map((field) => h(
+            components[field.component] || TextInput,
+            schemaFieldProps(field, formData),
+          ));
+        },
+      });
+      setupApp(app, '#vue-form-fields', options);
+    });
 };
@@ -1,10 +1,18 @@
 import {isString, toTitleCase} from '@/js/utils/stringUtil';
+import {queueValidation} from '@/js/utils/validation';
 
 export default {
+  inject: {
+    urls: {default: () => ({})},
+    csrfToken: {default: ''},
+  },
   data() {
     return {
       isFocused: false,
       localValue: null,
+      // Errors from the validate endpoint, these replace the errors prop once the field was validated
+      validationErrors: null,
+      validationCount: 0,
     };
   },
   emits: ['blur', 'focus', 'update:modelValue', 'enterKeydown', 'click', 'inputEvent'],
@@ -133,7 +141,7 @@ export default {
         'is-focused': this.isFocused,
         'is-label-hidden': this.hideLabel,
         'has-value': this.hasValue,
-        'has-invalid-feedback': this.errors.length > 0,
+        'has-invalid-feedback': this.currentErrors.length > 0,
         'd-none': this.showConditionalField === false, // should this be somewhere else? like on conditional mixin
       };
     },
@@ -145,9 +153,12 @@ export default {
     },
     inputClass() {
       return {
-        'is-invalid': this.errors.length > 0,
+        'is-invalid': this.currentErrors.length > 0,
       };
     },
+    currentErrors() {
+      return this.validationErrors === null ? this.errors : this.validationErrors;
+    },
   },
   methods: {
     /**
@@ -189,6 +200,7 @@ export default {
       this.updateLocalValue($event.target.value);
       this.$emit('update:modelValue', $event.target.value);
       this.fireInputEvent($event);
+      this.validate($event.target.value);
     },
     /**
      * "input" event is used by v-model by default.
@@ -199,6 +211,7 @@ export default {
     onInputValue(value) {
       this.updateLocalValue(value);
       this.$emit('update:modelValue', value);
+      this.validate(value);
     },
     /**
      * "input" event is used by v-model by default.
@@ -209,6 +222,27 @@ export default {
       this.updateLocalValue($event.target.checked);
       this.$emit('update:modelValue', $event.target.checked);
       this.fireInputEvent($event);
+      this.validate($event.target.checked);
+    },
+    /**
+     * Validates the value on the server when the form provides a `validate` url. Requests from all the fields of the
+     * form are debounced and batched, and only the response to the latest value of this field is used.
+     */
+    validate(value) {
+      if (!this.urls.validate) {
+        return;
+      }
+      this.validationCount += 1;
+      const count = this.validationCount;
+      queueValidation({url: this.urls.validate, csrfToken: this.csrfToken, name: this.name, value})
+        .then((errors) => {
+          if (count === this.validationCount) {
+            this.validationErrors = errors;
+          }
+        })
+        .catch(() => {
+          // Keep showing the current errors, the form is still validated when it's submitted.
+        });
     },
 
     /**
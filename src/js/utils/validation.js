@@ -0,0 +1,58 @@
+/**
+ * Batches field validation requests to the server. Fields queued within `delay` ms of each other are sent in a single
+ * request to the form's validate endpoint, e.g. `recipes:validate`, and each caller gets back the errors of its field.
+ */
+const DEFAULT_DELAY = 300,
+      queues = new Map();
+
+const flush = (url) => {
+  const queue = queues.get(url);
+  queues.delete(url);
+
+  const fields = {};
+  Object.entries(queue.fields).forEach(([name, {value}]) => {
+    fields[name] = value;
+  });
+
+  fetch(url, {
+    method: 'POST',
+    credentials: 'same-origin',
+    headers: {'Content-Type': 'application/json', 'X-CSRFToken': queue.csrfToken},
+    body: JSON.stringify({fields}),
+  })
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error(`Validation request failed with ${response.status}`);
+      }
+      return response.json();
+    })
+    .then(({errors}) => {
+      Object.entries(queue.fields).forEach(([name, {resolvers}]) => {
+        resolvers.forEach(({resolve}) => resolve(errors[name] || []));
+      });
+    })
+    .catch((error) => {
+      Object.values(queue.fields).forEach(({resolvers}) => {
+        resolvers.forEach(({reject}) => reject(error));
+      });
+    });
+};
+
+// eslint-disable-next-line import/prefer-default-export
+export function queueValidation({url, csrfToken, name, value, delay = DEFAULT_DELAY}) {
+  return new Promise((resolve, reject) => {
+    let queue = queues.get(url);
+    if (!queue) {
+      queue = {csrfToken, fields: {}, timer: null};
+      queues.set(url, queue);
+    }
+    const field = queue.fields[name] || {resolvers: []};
+    // Only the latest value of a field is sent, every caller gets its errors.
+    field.value = value;
+    field.resolvers.push({resolve, reject});
+    queue.fields[name] = field;
+
+    clearTimeout(queue.timer);
+    queue.timer = setTimeout(() => flush(url), delay);
+  });
+}